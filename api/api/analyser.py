@@ -4,24 +4,38 @@ import sys
 import logging
 import subprocess
 import uuid
+from bisect import bisect_right
 from pathlib import Path
 from datetime import time
+from time import perf_counter
 from typing import List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Body
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Body, Query, Request, Response
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session, selectinload
 from database import get_db
-from models.analyser import Analyser, AnnotationAnalyser, CroppedVideo
+from models.analyser import Analyser, AnnotationAnalyser, CroppedVideo, annotation_range
+from models.exercise import Exercise
 from schemas.analyser import (
     AnalyserResponse, AnalyserCreate, AnalyserUpdate, 
-    AnnotationResponse, AnnotationCreate, AnnotationUpdate,
+    AnnotationResponse, AnnotationCreate, AnnotationUpdate, AnnotationBulk, AnnotationBulkResult,
     CroppedVideoResponse, CroppedVideoCreate, CroppedVideoUpdate
 )
+from services.annotation_buffer import FIELDS as BUFFERED_FIELDS, annotation_buffer
+from services.annotation_index import annotation_index
+from services.cache import response_cache
+from services.deletion import delete_analysers, delete_annotations
+from services.serialization import ANALYSER_FIELDS, dumps
+from services.versioning import bump_version, check_etag, conditional, parent_version
+from utils.fieldsets import FieldParams
+from utils.pagination import PageParams, paginate, estimate_count
 
-# Konfiguracja logowania
-logging.basicConfig(level=logging.INFO)
+# Logowanie konfiguruje services/logs.py przy starcie aplikacji
 logger = logging.getLogger(__name__)
 
+# Ile ostatnich znaków wyjścia FFmpeg trafia do logu przy błędzie
+FFMPEG_LOG_TAIL = 2000
+
 # Funkcja pomocnicza do sprawdzania, czy FFmpeg jest zainstalowany
 def check_ffmpeg_installed():
     """Sprawdza, czy FFmpeg jest zainstalowany i dostępny w PATH."""
@@ -45,10 +59,33 @@ router = APIRouter()
 
 # Analyser endpoints
 @router.get("/", response_model=List[AnalyserResponse])
-def get_analysers(db: Session = Depends(get_db)):
+def get_analysers(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    fields: FieldParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    names = ANALYSER_FIELDS.select(fields) if fields.sparse else None
+    cached, generation = response_cache.lookup(request)
+    if cached is not None:
+        return cached
     try:
-        analysers = db.query(Analyser).all()
-        return analysers
+        if names:
+            # Bez adnotacji i przyciętych wideo - same kolumny i liczniki
+            rows = paginate(ANALYSER_FIELDS.query(db, names), Analyser.id, page, response, count=lambda: estimate_count(db, Analyser))
+            analysers = ANALYSER_FIELDS.dicts(db, names, rows)
+            return response_cache.store_body(request, dumps(analysers), ["analysers"], generation, response)
+        
+        query = db.query(Analyser).options(
+            selectinload(Analyser.annotations).selectinload(AnnotationAnalyser.cropped_videos)
+        )
+        analysers = paginate(query, Analyser.id, page, response, count=lambda: estimate_count(db, Analyser))
+        # Zbuforowane edycje adnotacji tylko z analizatorów tej strony; po zapisie odczytujemy je ponownie
+        ids = [analyser.id for analyser in analysers]
+        if annotation_buffer.flush(ids):
+            query.filter(Analyser.id.in_(ids)).populate_existing().all()
+        return response_cache.store(request, List[AnalyserResponse], analysers, ["analysers"], generation, response)
     except Exception as e:
         raise HTTPException(status_code=500, detail="Nie udało się pobrać analizatorów")
 
@@ -68,6 +105,7 @@ def create_analyser(analyser: AnalyserCreate, db: Session = Depends(get_db)):
         db.add(db_analyser)
         db.commit()
         db.refresh(db_analyser)
+        response_cache.invalidate("analysers")
         return db_analyser
     except HTTPException as e:
         db.rollback()
@@ -77,12 +115,19 @@ def create_analyser(analyser: AnalyserCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Nie udało się utworzyć analizatora: {str(e)}")
 
 @router.get("/{analyser_id}", response_model=AnalyserResponse)
-def get_analyser(analyser_id: int, db: Session = Depends(get_db)):
+def get_analyser(analyser_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     try:
+        annotation_buffer.flush([analyser_id])
+        not_modified = check_etag(request, response, db, Analyser, analyser_id)
+        if not_modified is not None:
+            return not_modified
+        cached, generation = response_cache.lookup(request)
+        if cached is not None:
+            return cached
         analyser = db.query(Analyser).filter(Analyser.id == analyser_id).first()
         if not analyser:
             raise HTTPException(status_code=404, detail="Analizator nie został znaleziony")
-        return analyser
+        return response_cache.store(request, AnalyserResponse, analyser, [f"analyser:{analyser_id}"], generation, response)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -103,8 +148,10 @@ def update_analyser(analyser_id: int, analyser: AnalyserUpdate, db: Session = De
         db_analyser.name = analyser.name
         db_analyser.video_url = analyser.video_url
         
+        bump_version(db, Analyser, [analyser_id])
         db.commit()
         db.refresh(db_analyser)
+        response_cache.invalidate("analysers", f"analyser:{analyser_id}")
         return db_analyser
     except HTTPException as e:
         db.rollback()
@@ -116,23 +163,77 @@ def update_analyser(analyser_id: int, analyser: AnalyserUpdate, db: Session = De
 @router.delete("/{analyser_id}")
 def delete_analyser(analyser_id: int, db: Session = Depends(get_db)):
     try:
-        db_analyser = db.query(Analyser).filter(Analyser.id == analyser_id).first()
-        if not db_analyser:
+        annotation_buffer.flush([analyser_id])
+        if db.query(Analyser.id).filter(Analyser.id == analyser_id).first() is None:
             raise HTTPException(status_code=404, detail="Analizator nie został znaleziony")
         
-        db.delete(db_analyser)
+        # Adnotacje z przyciętymi wideo i wyciętymi z nich ćwiczeniami - jak przy usuwaniu adnotacji
+        deletion = delete_analysers(db, [analyser_id])
+        deletion.apply(db)
         db.commit()
+        deletion.finish("analysers", f"analyser:{analyser_id}")
         return {"message": "Analizator został usunięty"}
+    except HTTPException as e:
+        db.rollback()
+        raise e
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Nie udało się usunąć analizatora: {str(e)}")
 
 # Annotation endpoints
 @router.get("/{analyser_id}/annotations", response_model=List[AnnotationResponse])
-def get_annotations(analyser_id: int, db: Session = Depends(get_db)):
+def get_annotations(
+    analyser_id: int,
+    request: Request,
+    response: Response,
+    from_ms: Optional[int] = Query(None, alias="from", ge=0, description="Początek okna osi czasu (ms)"),
+    to_ms: Optional[int] = Query(None, alias="to", ge=0, description="Koniec okna osi czasu (ms)"),
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+):
+    if from_ms is not None and to_ms is not None and from_ms > to_ms:
+        raise HTTPException(status_code=400, detail="Parametr 'from' nie może być większy niż 'to'")
     try:
-        annotations = db.query(AnnotationAnalyser).filter(AnnotationAnalyser.analyser_id == analyser_id).all()
-        return annotations
+        annotation_buffer.flush([analyser_id])
+        version = db.query(Analyser.version).filter(Analyser.id == analyser_id).scalar()
+        not_modified = conditional(request, response, Analyser, analyser_id, version)
+        if not_modified is not None:
+            return not_modified
+        cached, generation = response_cache.lookup(request)
+        if cached is not None:
+            return cached
+        query = db.query(AnnotationAnalyser).filter(
+            AnnotationAnalyser.analyser_id == analyser_id
+        ).options(selectinload(AnnotationAnalyser.cropped_videos))
+        # Filtr po analizatorze - liczymy dokładnie, korzystając z indeksu na analyser_id
+        def count():
+            return db.query(func.count(AnnotationAnalyser.id)).filter(
+                AnnotationAnalyser.analyser_id == analyser_id
+            ).scalar()
+
+        if from_ms is not None or to_ms is not None:
+            window_from = from_ms if from_ms is not None else 0
+            window_to = to_ms if to_ms is not None else sys.maxsize
+            if annotation_index.size and version is not None:
+                # Adnotacje nachodzące na okno z indeksu przedziałów w pamięci,
+                # z bazy pobieramy tylko wiersze bieżącej strony po kluczu głównym
+                ids = annotation_index.overlapping(db, analyser_id, version, window_from, window_to)
+                start = bisect_right(ids, page.after_id) if page.after_id is not None else 0
+                end = start + page.fetch_limit if page.fetch_limit is not None else None
+                query = query.filter(AnnotationAnalyser.id.in_(ids[start:end]))
+                count = lambda: len(ids)
+            else:
+                # Nachodzenie przedziałów - zakres po indeksie (analyser_id, start_ms, end_ms)
+                overlap = (AnnotationAnalyser.start_ms <= window_to, AnnotationAnalyser.end_ms >= window_from)
+                query = query.filter(*overlap)
+                count = lambda: db.query(func.count(AnnotationAnalyser.id)).filter(
+                    AnnotationAnalyser.analyser_id == analyser_id, *overlap
+                ).scalar()
+
+        annotations = paginate(query, AnnotationAnalyser.id, page, response, count=count)
+        return response_cache.store(
+            request, List[AnnotationResponse], annotations, [f"analyser:{analyser_id}"], generation, response
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail="Nie udało się pobrać adnotacji")
 
@@ -156,8 +257,10 @@ def create_annotation(analyser_id: int, annotation: AnnotationCreate, db: Sessio
         )
         
         db.add(db_annotation)
+        bump_version(db, Analyser, [analyser_id])
         db.commit()
         db.refresh(db_annotation)
+        response_cache.invalidate("analysers", f"analyser:{analyser_id}")
         return db_annotation
     except HTTPException as e:
         db.rollback()
@@ -166,13 +269,116 @@ def create_annotation(analyser_id: int, annotation: AnnotationCreate, db: Sessio
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Nie udało się utworzyć adnotacji: {str(e)}")
 
+@router.post("/{analyser_id}/annotations/bulk", response_model=AnnotationBulkResult)
+def bulk_annotations(analyser_id: int, bulk: AnnotationBulk, db: Session = Depends(get_db)):
+    """Zapis osi czasu analizatora naraz: tworzenie, zmiany i usuwanie adnotacji w jednej transakcji.
+
+    Wszystkie zakresy czasu i id są sprawdzane z góry (błędy zwracane razem),
+    potem zmiany idą zbiorczo: nowe adnotacje jednym flushem (wielowierszowy
+    INSERT, gdzie silnik zwraca id przez RETURNING), zmiany jednym UPDATE-em
+    po kluczu głównym (executemany), usunięcia - DELETE po liście id.
+    Usunięcie adnotacji usuwa też jej przycięte wideo i ich ćwiczenia, jak
+    `DELETE /annotations/{id}`. Zwraca mapowanie `ref` (albo pozycji na liście
+    `create`) na nadane id.
+    """
+    try:
+        if not (bulk.create or bulk.update or bulk.delete):
+            raise HTTPException(status_code=400, detail="Brak operacji do wykonania")
+        annotation_buffer.flush([analyser_id])
+        if db.query(Analyser.id).filter(Analyser.id == analyser_id).first() is None:
+            raise HTTPException(status_code=404, detail="Analizator nie został znaleziony")
+
+        # Walidacja w jednym przebiegu
+        errors = []
+        for kind, items in (("create", bulk.create), ("update", bulk.update)):
+            for position, item in enumerate(items):
+                if item.analyser_id is not None and item.analyser_id != analyser_id:
+                    errors.append(f"{kind}[{position}]: adnotacja należy do innego analizatora")
+                if item.time_to is not None and item.time_to < item.time_from:
+                    errors.append(f"{kind}[{position}]: time_to jest wcześniejsze niż time_from")
+        refs = [item.ref if item.ref is not None else str(position) for position, item in enumerate(bulk.create)]
+        if len(set(refs)) != len(refs):
+            errors.append("create: powtórzone wartości ref")
+        update_ids = [item.id for item in bulk.update]
+        delete_ids = set(bulk.delete)
+        if len(set(update_ids)) != len(update_ids):
+            errors.append("update: powtórzone id adnotacji")
+        if delete_ids & set(update_ids):
+            errors.append(f"Adnotacje jednocześnie zmieniane i usuwane: {sorted(delete_ids & set(update_ids))}")
+        if errors:
+            raise HTTPException(status_code=400, detail=errors)
+
+        touched = set(update_ids) | delete_ids
+        owner = dict(db.query(AnnotationAnalyser.id, AnnotationAnalyser.analyser_id).filter(
+            AnnotationAnalyser.id.in_(touched)
+        )) if touched else {}
+        missing = sorted(annotation_id for annotation_id in touched if owner.get(annotation_id) != analyser_id)
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Adnotacje analizatora nie zostały znalezione: {missing}")
+
+        # Usunięcia - przycięte wideo i ćwiczenia z nich wycięte usuwa kaskada
+        deletion = delete_annotations(db, delete_ids)
+
+        # Zmiany - UPDATE po kluczu głównym omija zdarzenia ORM, więc start_ms/end_ms liczymy tutaj
+        if bulk.update:
+            rows = []
+            for item in bulk.update:
+                start_ms, end_ms = annotation_range(item.time_from, item.time_to)
+                rows.append({
+                    "id": item.id, "time_from": item.time_from, "time_to": item.time_to,
+                    "start_ms": start_ms, "end_ms": end_ms, "title": item.title,
+                    "description": item.description, "color": item.color, "saved": item.saved,
+                })
+            db.execute(update(AnnotationAnalyser), rows)
+
+        created = [
+            AnnotationAnalyser(
+                analyser_id=analyser_id, time_from=item.time_from, time_to=item.time_to, title=item.title,
+                description=item.description, color=item.color, saved=item.saved,
+            )
+            for item in bulk.create
+        ]
+        db.add_all(created)
+        db.flush()
+
+        deletion.analysers.add(analyser_id)
+        deletion.apply(db)
+        db.commit()
+        deletion.finish()
+
+        ids = [annotation.id for annotation in created] + update_ids
+        annotations = db.query(AnnotationAnalyser).filter(AnnotationAnalyser.id.in_(ids)).options(
+            selectinload(AnnotationAnalyser.cropped_videos)
+        ).order_by(AnnotationAnalyser.id).all() if ids else []
+        return {
+            "created": {ref: annotation.id for ref, annotation in zip(refs, created)},
+            "annotations": annotations,
+            "deleted": sorted(delete_ids),
+        }
+    except HTTPException as e:
+        db.rollback()
+        raise e
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Nie udało się zapisać adnotacji: {str(e)}")
+
 @router.get("/annotations/{annotation_id}", response_model=AnnotationResponse)
-def get_annotation(annotation_id: int, db: Session = Depends(get_db)):
+def get_annotation(annotation_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     try:
+        annotation_buffer.flush_annotation(annotation_id)
+        analyser_id, version = parent_version(db, Analyser, AnnotationAnalyser.analyser_id, annotation_id)
+        not_modified = conditional(request, response, Analyser, analyser_id, version)
+        if not_modified is not None:
+            return not_modified
+        cached, generation = response_cache.lookup(request)
+        if cached is not None:
+            return cached
         annotation = db.query(AnnotationAnalyser).filter(AnnotationAnalyser.id == annotation_id).first()
         if not annotation:
             raise HTTPException(status_code=404, detail="Adnotacja nie została znaleziona")
-        return annotation
+        return response_cache.store(
+            request, AnnotationResponse, annotation, [f"analyser:{annotation.analyser_id}"], generation, response
+        )
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -181,10 +387,17 @@ def get_annotation(annotation_id: int, db: Session = Depends(get_db)):
 @router.put("/annotations/{annotation_id}", response_model=AnnotationResponse)
 def update_annotation(annotation_id: int, annotation: AnnotationUpdate, db: Session = Depends(get_db)):
     try:
+        if annotation_buffer.enabled:
+            buffered = _buffer_annotation_edit(db, annotation_id, annotation)
+            if buffered is not None:
+                return buffered
+        annotation_buffer.flush_annotation(annotation_id)
         db_annotation = db.query(AnnotationAnalyser).filter(AnnotationAnalyser.id == annotation_id).first()
         if not db_annotation:
             raise HTTPException(status_code=404, detail="Adnotacja nie została znaleziona")
         
+        previous_analyser_id = db_annotation.analyser_id
+        
         # Update annotation fields
         if annotation.analyser_id is not None:
             db_annotation.analyser_id = annotation.analyser_id
@@ -195,8 +408,12 @@ def update_annotation(annotation_id: int, annotation: AnnotationUpdate, db: Sess
         db_annotation.color = annotation.color
         db_annotation.saved = annotation.saved
         
+        bump_version(db, Analyser, [previous_analyser_id, db_annotation.analyser_id])
         db.commit()
         db.refresh(db_annotation)
+        response_cache.invalidate(
+            "analysers", f"analyser:{previous_analyser_id}", f"analyser:{db_annotation.analyser_id}"
+        )
         return db_annotation
     except HTTPException as e:
         db.rollback()
@@ -205,67 +422,52 @@ def update_annotation(annotation_id: int, annotation: AnnotationUpdate, db: Sess
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Nie udało się zaktualizować adnotacji: {str(e)}")
 
+def _buffer_annotation_edit(db: Session, annotation_id: int, annotation: AnnotationUpdate) -> Optional[dict]:
+    """Edycja przez bufor zapisu; None, gdy musi iść synchronicznie.
+
+    Synchronicznie idzie przeniesienie do innego analizatora i edycja, której
+    baza by nie przyjęła - ta kończy się błędem we własnym żądaniu.
+    """
+    current = annotation_buffer.pending(annotation_id)
+    if current is None:
+        db_annotation = db.query(AnnotationAnalyser).options(
+            selectinload(AnnotationAnalyser.cropped_videos)
+        ).filter(AnnotationAnalyser.id == annotation_id).first()
+        if not db_annotation:
+            raise HTTPException(status_code=404, detail="Adnotacja nie została znaleziona")
+        current = AnnotationResponse.model_validate(db_annotation).model_dump()
+    analyser_id = current["analyser_id"]
+    if annotation.analyser_id is not None and annotation.analyser_id != analyser_id:
+        return None
+
+    start_ms, end_ms = annotation_range(annotation.time_from, annotation.time_to)
+    values = {
+        "time_from": annotation.time_from, "time_to": annotation.time_to, "start_ms": start_ms, "end_ms": end_ms,
+        "title": annotation.title, "description": annotation.description, "color": annotation.color,
+        "saved": annotation.saved,
+    }
+    if not annotation_buffer.accepts(values):
+        return None
+    base = {key: value for key, value in current.items() if key not in BUFFERED_FIELDS}
+    return annotation_buffer.put(annotation_id, analyser_id, base, values)
+
 @router.delete("/annotations/{annotation_id}")
 def delete_annotation(annotation_id: int, db: Session = Depends(get_db)):
-    import os
-    import logging
-    from pathlib import Path
-    
-    logger = logging.getLogger(__name__)
-    
     try:
-        # 1. Find the annotation
-        db_annotation = db.query(AnnotationAnalyser).filter(AnnotationAnalyser.id == annotation_id).first()
-        if not db_annotation:
+        annotation_buffer.flush_annotation(annotation_id)
+        if db.query(AnnotationAnalyser.id).filter(AnnotationAnalyser.id == annotation_id).first() is None:
             raise HTTPException(status_code=404, detail="Adnotacja nie została znaleziona")
         
-        # 2. Find any cropped videos associated with this annotation
-        cropped_videos = db.query(CroppedVideo).filter(CroppedVideo.anno_id == annotation_id).all()
-        
-        for cropped_video in cropped_videos:
-            # 3. Delete the associated exercise if it exists
-            if cropped_video.crop_id:
-                try:
-                    from models.exercise import Exercise
-                    exercise = db.query(Exercise).filter(Exercise.id == cropped_video.crop_id).first()
-                    if exercise:
-                        logger.info(f"Usuwanie powiązanego ćwiczenia: {exercise.id}")
-                        db.delete(exercise)
-                except Exception as exercise_error:
-                    logger.error(f"Błąd podczas usuwania powiązanego ćwiczenia: {str(exercise_error)}")
-            
-            # 4. Delete the video file if it exists
-            if cropped_video.video_url:
-                try:
-                    video_path = None
-                    
-                    # Handle relative paths starting with /uploads/
-                    if cropped_video.video_url.startswith('/uploads/'):
-                        project_root = Path(__file__).resolve().parents[2]  # api/api/analyser.py -> api/api -> api -> root
-                        public_uploads_path = project_root / "public" / "uploads"
-                        filename = cropped_video.video_url.replace('/uploads/', '')
-                        video_path = public_uploads_path / filename
-                    else:
-                        # Try to use the path as is
-                        video_path = Path(cropped_video.video_url)
-                    
-                    if video_path and video_path.exists() and video_path.is_file():
-                        os.remove(video_path)
-                        logger.info(f"Usunięto plik wideo: {video_path}")
-                    else:
-                        logger.warning(f"Nie znaleziono pliku wideo do usunięcia: {cropped_video.video_url}")
-                except Exception as file_error:
-                    logger.error(f"Błąd podczas usuwania pliku wideo: {str(file_error)}")
-            
-            # 5. Delete the cropped video record
-            db.delete(cropped_video)
-            logger.info(f"Usunięto rekord przyciętego wideo: {cropped_video.id}")
-        
-        # 6. Finally delete the annotation
-        db.delete(db_annotation)
+        # Przycięte wideo i wycięte z nich ćwiczenia (z ich użyciami w treningach) usuwa kaskada
+        deletion = delete_annotations(db, [annotation_id])
+        deletion.apply(db)
         db.commit()
+        deletion.finish()
         
         return {"message": "Adnotacja została usunięta wraz z powiązanymi plikami wideo i ćwiczeniami"}
+    except HTTPException as e:
+        db.rollback()
+        raise e
     except Exception as e:
         db.rollback()
         logger.error(f"Błąd podczas usuwania adnotacji: {str(e)}")
@@ -285,7 +487,7 @@ def check_ffmpeg():
 @router.get("/check-file")
 def check_file(file_path: str):
     """Sprawdza, czy plik istnieje i jest dostępny."""
-    logger.info(f"Sprawdzanie pliku: {file_path}")
+    logger.debug("Sprawdzanie pliku: %s", file_path)
     
     try:
         # Sprawdź, czy to ścieżka względna zaczynająca się od /uploads
@@ -293,23 +495,23 @@ def check_file(file_path: str):
             # Ścieżka względna - musimy ją przekształcić na bezwzględną
             # Znajdź katalog główny projektu (gdzie znajduje się katalog public)
             project_root = Path(__file__).resolve().parents[2]  # api/api/analyser.py -> api/api -> api -> root
-            logger.info(f"Katalog główny projektu: {project_root}")
+            logger.debug("Katalog główny projektu: %s", project_root)
             
             # Ścieżka do katalogu public/uploads
             public_uploads_path = project_root / "public" / "uploads"
-            logger.info(f"Ścieżka do katalogu public/uploads: {public_uploads_path}")
+            logger.debug("Ścieżka do katalogu public/uploads: %s", public_uploads_path)
             
             # Nazwa pliku (bez /uploads/)
             filename = file_path.replace('/uploads/', '')
-            logger.info(f"Nazwa pliku: {filename}")
+            logger.debug("Nazwa pliku: %s", filename)
             
             # Pełna ścieżka do pliku
             file_path_full = public_uploads_path / filename
-            logger.info(f"Pełna ścieżka do pliku: {file_path_full}")
+            logger.debug("Pełna ścieżka do pliku: %s", file_path_full)
         else:
             # Zakładamy, że to już ścieżka bezwzględna
             file_path_full = Path(file_path).resolve()
-            logger.info(f"Ścieżka pliku (znormalizowana): {file_path_full}")
+            logger.debug("Ścieżka pliku (znormalizowana): %s", file_path_full)
         
         # Sprawdź, czy plik istnieje
         if not file_path_full.exists():
@@ -323,15 +525,15 @@ def check_file(file_path: str):
             
             found = False
             for alt_path in alternative_paths:
-                logger.info(f"Próba alternatywnej ścieżki: {alt_path}")
+                logger.debug("Próba alternatywnej ścieżki: %s", alt_path)
                 if alt_path.exists():
                     file_path_full = alt_path
                     found = True
-                    logger.info(f"Znaleziono plik w alternatywnej lokalizacji: {file_path_full}")
+                    logger.debug("Znaleziono plik w alternatywnej lokalizacji: %s", file_path_full)
                     break
             
             if not found:
-                logger.error(f"Plik nie istnieje w żadnej z lokalizacji. Ostatnia sprawdzona: {file_path_full}")
+                logger.error("Plik nie istnieje w żadnej z lokalizacji. Ostatnia sprawdzona: %s", file_path_full)
                 return {
                     "status": "error", 
                     "message": f"Plik nie istnieje: {file_path}",
@@ -340,7 +542,7 @@ def check_file(file_path: str):
         
         # Sprawdź, czy to plik (a nie katalog)
         if not file_path_full.is_file():
-            logger.error(f"Ścieżka nie jest plikiem: {file_path_full}")
+            logger.error("Ścieżka nie jest plikiem: %s", file_path_full)
             return {"status": "error", "message": f"Ścieżka nie jest plikiem: {file_path}"}
         
         # Sprawdź, czy mamy uprawnienia do odczytu pliku
@@ -348,7 +550,7 @@ def check_file(file_path: str):
             with open(file_path_full, 'rb') as f:
                 # Przeczytaj tylko pierwsze kilka bajtów, aby sprawdzić dostęp
                 f.read(10)
-            logger.info(f"Plik jest dostępny do odczytu: {file_path_full}")
+            logger.debug("Plik jest dostępny do odczytu: %s", file_path_full)
             
             # Zwróć informacje o pliku
             file_size = file_path_full.stat().st_size
@@ -362,13 +564,13 @@ def check_file(file_path: str):
                 "modified": file_modified
             }
         except PermissionError:
-            logger.error(f"Brak uprawnień do odczytu pliku: {file_path_full}")
+            logger.error("Brak uprawnień do odczytu pliku: %s", file_path_full)
             return {"status": "error", "message": f"Brak uprawnień do odczytu pliku: {file_path}"}
         except Exception as e:
-            logger.error(f"Błąd podczas próby odczytu pliku: {str(e)}")
+            logger.error("Błąd podczas próby odczytu pliku: %s", e)
             return {"status": "error", "message": f"Błąd podczas próby odczytu pliku: {str(e)}"}
     except Exception as e:
-        logger.error(f"Błąd podczas przetwarzania ścieżki pliku: {str(e)}")
+        logger.error("Błąd podczas przetwarzania ścieżki pliku: %s", e)
         return {"status": "error", "message": f"Błąd podczas przetwarzania ścieżki pliku: {str(e)}"}
 
 # Cropped Video endpoints
@@ -396,8 +598,10 @@ def create_cropped_video(annotation_id: int, cropped_video: CroppedVideoCreate,
         )
         
         db.add(db_cropped_video)
+        bump_version(db, Analyser, [annotation.analyser_id])
         db.commit()
         db.refresh(db_cropped_video)
+        response_cache.invalidate("analysers", f"analyser:{annotation.analyser_id}")
         return db_cropped_video
     except HTTPException as e:
         db.rollback()
@@ -412,60 +616,60 @@ def crop_video(annotation_id: int, exercise_data: dict = Body(None), db: Session
     Wycina fragment wideo na podstawie czasów z adnotacji i zapisuje go jako nowy plik.
     Aktualizuje status adnotacji na 'saved' i tworzy nowy rekord CroppedVideo.
     """
-    import os
-    import subprocess
-    import uuid
-    import logging
-    from pathlib import Path
-    
-    # Skonfiguruj logowanie
-    logging.basicConfig(level=logging.INFO)
-    logger = logging.getLogger(__name__)
-    
+    started = perf_counter()
     try:
+        # Przycięte wideo należy do ćwiczenia (crop_id -> exercises.id, usuwane razem z nim),
+        # więc ćwiczenie musi istnieć, zanim uruchomimy FFmpeg
+        exercise_id = (exercise_data or {}).get("exercise_id")
+        if isinstance(exercise_id, bool) or not isinstance(exercise_id, int):
+            raise HTTPException(status_code=400, detail="Wymagane jest exercise_id (ID ćwiczenia)")
+        if db.get(Exercise, exercise_id) is None:
+            raise HTTPException(status_code=404, detail="Nie znaleziono ćwiczenia")
+        
+        annotation_buffer.flush_annotation(annotation_id)
         # Pobierz adnotację
-        logger.info(f"Pobieranie adnotacji o ID: {annotation_id}")
+        logger.debug("Pobieranie adnotacji o ID: %s", annotation_id)
         annotation = db.query(AnnotationAnalyser).filter(AnnotationAnalyser.id == annotation_id).first()
         if not annotation:
-            logger.error(f"Adnotacja o ID {annotation_id} nie została znaleziona")
+            logger.error("Adnotacja o ID %s nie została znaleziona", annotation_id)
             raise HTTPException(status_code=404, detail="Adnotacja nie została znaleziona")
         
-        logger.info(f"Znaleziono adnotację: {annotation.id}, time_from: {annotation.time_from}, time_to: {annotation.time_to}")
+        logger.debug("Znaleziono adnotację: %s, time_from: %s, time_to: %s", annotation.id, annotation.time_from, annotation.time_to)
         
         # Sprawdź, czy adnotacja ma określone czasy
         if not annotation.time_from:
-            logger.error(f"Adnotacja {annotation_id} nie ma określonego czasu początkowego")
+            logger.error("Adnotacja %s nie ma określonego czasu początkowego", annotation_id)
             raise HTTPException(status_code=400, detail="Adnotacja musi mieć określony czas początkowy")
         
         if not annotation.time_to:
-            logger.error(f"Adnotacja {annotation_id} nie ma określonego czasu końcowego")
+            logger.error("Adnotacja %s nie ma określonego czasu końcowego", annotation_id)
             raise HTTPException(status_code=400, detail="Adnotacja musi mieć określony czas końcowy")
         
         # Pobierz analizator, aby uzyskać URL wideo
-        logger.info(f"Pobieranie analizatora o ID: {annotation.analyser_id}")
+        logger.debug("Pobieranie analizatora o ID: %s", annotation.analyser_id)
         analyser = db.query(Analyser).filter(Analyser.id == annotation.analyser_id).first()
         if not analyser:
-            logger.error(f"Analizator o ID {annotation.analyser_id} nie został znaleziony")
+            logger.error("Analizator o ID %s nie został znaleziony", annotation.analyser_id)
             raise HTTPException(status_code=404, detail="Nie znaleziono analizatora")
         
         if not analyser.video_url:
-            logger.error(f"Analizator {analyser.id} nie ma określonego URL wideo")
+            logger.error("Analizator %s nie ma określonego URL wideo", analyser.id)
             raise HTTPException(status_code=404, detail="Analizator nie ma określonego URL wideo")
         
         # Przygotuj ścieżki plików
         video_url = analyser.video_url
-        logger.info(f"URL wideo: {video_url}")
+        logger.debug("URL wideo: %s", video_url)
         
         # Sprawdź, czy URL jest lokalną ścieżką pliku
         if video_url.startswith(('http://', 'https://')):
-            logger.error(f"URL wideo jest zewnętrzny: {video_url}")
+            logger.error("URL wideo jest zewnętrzny: %s", video_url)
             raise HTTPException(status_code=400, detail="Obsługa zewnętrznych URL nie jest jeszcze zaimplementowana")
         
         # Zakładamy, że video_url to ścieżka względna lub bezwzględna
         try:
             # Sprawdź, czy ścieżka jest poprawna
             if not video_url or not isinstance(video_url, str):
-                logger.error(f"Nieprawidłowy URL wideo: {video_url}")
+                logger.error("Nieprawidłowy URL wideo: %s", video_url)
                 raise HTTPException(status_code=400, detail=f"Nieprawidłowy URL wideo: {video_url}")
             
             # Sprawdź, czy to ścieżka względna zaczynająca się od /uploads
@@ -473,23 +677,23 @@ def crop_video(annotation_id: int, exercise_data: dict = Body(None), db: Session
                 # Ścieżka względna - musimy ją przekształcić na bezwzględną
                 # Znajdź katalog główny projektu (gdzie znajduje się katalog public)
                 project_root = Path(__file__).resolve().parents[2]  # api/api/analyser.py -> api/api -> api -> root
-                logger.info(f"Katalog główny projektu: {project_root}")
+                logger.debug("Katalog główny projektu: %s", project_root)
                 
                 # Ścieżka do katalogu public/uploads
                 public_uploads_path = project_root / "public" / "uploads"
-                logger.info(f"Ścieżka do katalogu public/uploads: {public_uploads_path}")
+                logger.debug("Ścieżka do katalogu public/uploads: %s", public_uploads_path)
                 
                 # Nazwa pliku (bez /uploads/)
                 filename = video_url.replace('/uploads/', '')
-                logger.info(f"Nazwa pliku: {filename}")
+                logger.debug("Nazwa pliku: %s", filename)
                 
                 # Pełna ścieżka do pliku
                 video_path = public_uploads_path / filename
-                logger.info(f"Pełna ścieżka do pliku: {video_path}")
+                logger.debug("Pełna ścieżka do pliku: %s", video_path)
             else:
                 # Zakładamy, że to już ścieżka bezwzględna
                 video_path = Path(video_url).resolve()
-                logger.info(f"Ścieżka wideo (znormalizowana): {video_path}")
+                logger.debug("Ścieżka wideo (znormalizowana): %s", video_path)
             
             # Sprawdź, czy plik istnieje
             if not video_path.exists():
@@ -503,15 +707,15 @@ def crop_video(annotation_id: int, exercise_data: dict = Body(None), db: Session
                 
                 found = False
                 for alt_path in alternative_paths:
-                    logger.info(f"Próba alternatywnej ścieżki: {alt_path}")
+                    logger.debug("Próba alternatywnej ścieżki: %s", alt_path)
                     if alt_path.exists():
                         video_path = alt_path
                         found = True
-                        logger.info(f"Znaleziono plik w alternatywnej lokalizacji: {video_path}")
+                        logger.debug("Znaleziono plik w alternatywnej lokalizacji: %s", video_path)
                         break
                 
                 if not found:
-                    logger.error(f"Plik wideo nie istnieje w żadnej z lokalizacji. Ostatnia sprawdzona: {video_path}")
+                    logger.error("Plik wideo nie istnieje w żadnej z lokalizacji. Ostatnia sprawdzona: %s", video_path)
                     raise HTTPException(
                         status_code=404, 
                         detail=f"Plik wideo nie istnieje: {video_url}. Sprawdzone lokalizacje: {[str(p) for p in alternative_paths]}"
@@ -519,7 +723,7 @@ def crop_video(annotation_id: int, exercise_data: dict = Body(None), db: Session
             
             # Sprawdź, czy to plik (a nie katalog)
             if not video_path.is_file():
-                logger.error(f"Ścieżka nie jest plikiem: {video_path}")
+                logger.error("Ścieżka nie jest plikiem: %s", video_path)
                 raise HTTPException(status_code=400, detail=f"Ścieżka nie jest plikiem: {video_url}")
             
             # Sprawdź, czy mamy uprawnienia do odczytu pliku
@@ -527,17 +731,17 @@ def crop_video(annotation_id: int, exercise_data: dict = Body(None), db: Session
                 with open(video_path, 'rb') as f:
                     # Przeczytaj tylko pierwsze kilka bajtów, aby sprawdzić dostęp
                     f.read(10)
-                logger.info(f"Plik wideo jest dostępny do odczytu: {video_path}")
+                logger.debug("Plik wideo jest dostępny do odczytu: %s", video_path)
             except PermissionError:
-                logger.error(f"Brak uprawnień do odczytu pliku: {video_path}")
+                logger.error("Brak uprawnień do odczytu pliku: %s", video_path)
                 raise HTTPException(status_code=403, detail=f"Brak uprawnień do odczytu pliku: {video_url}")
             except Exception as e:
-                logger.error(f"Błąd podczas próby odczytu pliku: {str(e)}")
+                logger.error("Błąd podczas próby odczytu pliku: %s", e)
                 raise HTTPException(status_code=500, detail=f"Błąd podczas próby odczytu pliku: {str(e)}")
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Błąd podczas przetwarzania ścieżki pliku: {str(e)}")
+            logger.error("Błąd podczas przetwarzania ścieżki pliku: %s", e)
             raise HTTPException(status_code=400, detail=f"Błąd podczas przetwarzania ścieżki pliku: {str(e)}")
         
         # Utwórz nazwę dla przyciętego wideo
@@ -545,11 +749,11 @@ def crop_video(annotation_id: int, exercise_data: dict = Body(None), db: Session
         try:
             # Użyj tego samego katalogu, co plik wejściowy
             output_dir = video_path.parent
-            logger.info(f"Katalog wyjściowy (oryginalny): {output_dir}")
+            logger.debug("Katalog wyjściowy (oryginalny): %s", output_dir)
             
             # Sprawdź, czy mamy uprawnienia do zapisu w tym katalogu
             if not os.access(output_dir, os.W_OK):
-                logger.warning(f"Brak uprawnień do zapisu w katalogu: {output_dir}")
+                logger.warning("Brak uprawnień do zapisu w katalogu: %s", output_dir)
                 
                 # Spróbuj użyć katalogu public/uploads jako alternatywy
                 project_root = Path(__file__).resolve().parents[2]  # api/api/analyser.py -> api/api -> api -> root
@@ -557,12 +761,12 @@ def crop_video(annotation_id: int, exercise_data: dict = Body(None), db: Session
                 
                 if os.access(alt_output_dir, os.W_OK):
                     output_dir = alt_output_dir
-                    logger.info(f"Użyto alternatywnego katalogu wyjściowego: {output_dir}")
+                    logger.debug("Użyto alternatywnego katalogu wyjściowego: %s", output_dir)
                 else:
                     # Spróbuj użyć katalogu tymczasowego
                     import tempfile
                     output_dir = Path(tempfile.gettempdir())
-                    logger.info(f"Użyto katalogu tymczasowego jako wyjściowego: {output_dir}")
+                    logger.debug("Użyto katalogu tymczasowego jako wyjściowego: %s", output_dir)
             
             # Upewnij się, że katalog istnieje
             output_dir.mkdir(parents=True, exist_ok=True)
@@ -570,32 +774,32 @@ def crop_video(annotation_id: int, exercise_data: dict = Body(None), db: Session
             # Utwórz nazwę pliku wyjściowego
             output_filename = f"{video_path.stem}_clip_{annotation_id}_{uuid.uuid4().hex[:8]}{video_path.suffix}"
             output_path = output_dir / output_filename
-            logger.info(f"Ścieżka wyjściowa: {output_path}")
+            logger.debug("Ścieżka wyjściowa: %s", output_path)
             
             # Sprawdź, czy możemy utworzyć plik w tym miejscu
             try:
                 with open(output_path, 'w') as f:
                     pass
                 os.remove(output_path)  # Usuń pusty plik testowy
-                logger.info(f"Test zapisu do pliku wyjściowego zakończony powodzeniem")
+                logger.debug("Test zapisu do pliku wyjściowego zakończony powodzeniem")
             except Exception as e:
-                logger.error(f"Nie można utworzyć pliku wyjściowego: {str(e)}")
+                logger.error("Nie można utworzyć pliku wyjściowego: %s", e)
                 raise HTTPException(status_code=500, detail=f"Nie można utworzyć pliku wyjściowego: {str(e)}")
                 
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Błąd podczas tworzenia ścieżki wyjściowej: {str(e)}")
+            logger.error("Błąd podczas tworzenia ścieżki wyjściowej: %s", e)
             raise HTTPException(status_code=500, detail=f"Błąd podczas tworzenia ścieżki wyjściowej: {str(e)}")
         
         # Konwertuj czas z formatu time na string w formacie HH:MM:SS
         try:
             # Sprawdź, czy time_from i time_to są obiektami time
-            logger.info(f"Typ time_from: {type(annotation.time_from)}, Typ time_to: {type(annotation.time_to)}")
+            logger.debug("Typ time_from: %s, Typ time_to: %s", type(annotation.time_from), type(annotation.time_to))
             
             # Jeśli to stringi, spróbuj je sparsować
             if isinstance(annotation.time_from, str):
-                logger.info(f"time_from jest stringiem: {annotation.time_from}")
+                logger.debug("time_from jest stringiem: %s", annotation.time_from)
                 time_parts = annotation.time_from.split(':')
                 if len(time_parts) == 3:
                     time_from_str = annotation.time_from
@@ -612,7 +816,7 @@ def crop_video(annotation_id: int, exercise_data: dict = Body(None), db: Session
                 time_from_seconds = annotation.time_from.second
             
             if isinstance(annotation.time_to, str):
-                logger.info(f"time_to jest stringiem: {annotation.time_to}")
+                logger.debug("time_to jest stringiem: %s", annotation.time_to)
                 time_parts = annotation.time_to.split(':')
                 if len(time_parts) == 3:
                     time_to_str = annotation.time_to
@@ -628,7 +832,7 @@ def crop_video(annotation_id: int, exercise_data: dict = Body(None), db: Session
                 time_to_minutes = annotation.time_to.minute
                 time_to_seconds = annotation.time_to.second
             
-            logger.info(f"Czas od: {time_from_str}, czas do: {time_to_str}")
+            logger.debug("Czas od: %s, czas do: %s", time_from_str, time_to_str)
             
             # Oblicz czas trwania
             duration_seconds = (
@@ -641,14 +845,17 @@ def crop_video(annotation_id: int, exercise_data: dict = Body(None), db: Session
                 time_from_seconds
             )
         except Exception as e:
-            logger.error(f"Błąd podczas przetwarzania czasu: {str(e)}")
+            logger.error("Błąd podczas przetwarzania czasu: %s", e)
             raise HTTPException(status_code=400, detail=f"Błąd podczas przetwarzania czasu: {str(e)}")
         
-        logger.info(f"Czas trwania: {duration_seconds} sekund")
+        logger.info("Wycinanie fragmentu wideo", extra={
+            "job": "crop_video", "annotation_id": annotation_id, "analyser_id": annotation.analyser_id,
+            "clip_from": time_from_str, "clip_seconds": duration_seconds,
+        })
         
         # Sprawdź, czy czas trwania jest dodatni
         if duration_seconds <= 0:
-            logger.error(f"Nieprawidłowy czas trwania: {duration_seconds} sekund")
+            logger.error("Nieprawidłowy czas trwania: %s sekund", duration_seconds)
             raise HTTPException(status_code=400, detail="Czas końcowy musi być późniejszy niż czas początkowy")
         
         # Sprawdź, czy FFmpeg jest zainstalowany
@@ -662,7 +869,7 @@ def crop_video(annotation_id: int, exercise_data: dict = Body(None), db: Session
                     text=True,
                     check=True
                 )
-                logger.info(f"FFmpeg jest zainstalowany: {ffmpeg_version.stdout.splitlines()[0]}")
+                logger.debug("FFmpeg jest zainstalowany: %s", ffmpeg_version.stdout.splitlines()[0])
             except FileNotFoundError:
                 logger.error("FFmpeg nie jest dostępny w PATH")
                 
@@ -678,14 +885,14 @@ def crop_video(annotation_id: int, exercise_data: dict = Body(None), db: Session
                 for path in common_paths:
                     if os.path.exists(path):
                         ffmpeg_path = path
-                        logger.info(f"Znaleziono FFmpeg w: {ffmpeg_path}")
+                        logger.debug("Znaleziono FFmpeg w: %s", ffmpeg_path)
                         break
                 
                 if not ffmpeg_path:
                     logger.error("FFmpeg nie został znaleziony w żadnej z typowych lokalizacji")
                     raise HTTPException(status_code=500, detail="FFmpeg nie jest zainstalowany na serwerze")
             except subprocess.CalledProcessError as e:
-                logger.error(f"Błąd podczas sprawdzania wersji FFmpeg: {e.stderr}")
+                logger.error("Błąd podczas sprawdzania wersji FFmpeg: %s", e.stderr)
                 raise HTTPException(status_code=500, detail=f"Błąd podczas sprawdzania wersji FFmpeg: {e.stderr}")
             
             # Sprawdź, czy FFmpeg obsługuje wymagane kodeki
@@ -697,15 +904,15 @@ def crop_video(annotation_id: int, exercise_data: dict = Body(None), db: Session
                     text=True,
                     check=True
                 )
-                logger.info("FFmpeg obsługuje wymagane kodeki")
+                logger.debug("FFmpeg obsługuje wymagane kodeki")
             except subprocess.CalledProcessError as e:
-                logger.error(f"Błąd podczas sprawdzania kodeków FFmpeg: {e.stderr}")
+                logger.error("Błąd podczas sprawdzania kodeków FFmpeg: %s", e.stderr)
                 raise HTTPException(status_code=500, detail=f"Błąd podczas sprawdzania kodeków FFmpeg: {e.stderr}")
             
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Nieoczekiwany błąd podczas sprawdzania FFmpeg: {str(e)}")
+            logger.error("Nieoczekiwany błąd podczas sprawdzania FFmpeg: %s", e)
             raise HTTPException(status_code=500, detail=f"Nieoczekiwany błąd podczas sprawdzania FFmpeg: {str(e)}")
         
         # Użyj FFmpeg do wycięcia fragmentu wideo
@@ -726,9 +933,10 @@ def crop_video(annotation_id: int, exercise_data: dict = Body(None), db: Session
                 str(output_path)
             ]
             
-            logger.info(f"Uruchamianie komendy FFmpeg: {' '.join(ffmpeg_cmd)}")
+            logger.debug("Uruchamianie komendy FFmpeg: %s", ' '.join(ffmpeg_cmd))
             
             # Uruchom komendę FFmpeg
+            ffmpeg_started = perf_counter()
             process = subprocess.run(
                 ffmpeg_cmd, 
                 stdout=subprocess.PIPE, 
@@ -737,17 +945,22 @@ def crop_video(annotation_id: int, exercise_data: dict = Body(None), db: Session
                 check=True
             )
             
-            logger.info(f"Komenda FFmpeg zakończona: {process.stdout}")
+            ffmpeg_ms = round((perf_counter() - ffmpeg_started) * 1000, 1)
+            logger.debug("Komenda FFmpeg zakończona: %s", process.stdout)
             
             # Sprawdź, czy plik wyjściowy został utworzony
             if not output_path.exists():
-                logger.error(f"Nie udało się utworzyć pliku wyjściowego: {output_path}")
+                logger.error("Nie udało się utworzyć pliku wyjściowego: %s", output_path)
                 raise Exception(f"Nie udało się utworzyć pliku wyjściowego: {output_path}")
             
-            logger.info(f"Plik wyjściowy utworzony: {output_path}")
+            logger.debug("Plik wyjściowy utworzony: %s", output_path)
             
         except subprocess.CalledProcessError as e:
-            logger.error(f"Błąd FFmpeg: {e.stderr}")
+            # Z wyjścia FFmpeg tylko koniec - tam jest przyczyna błędu
+            logger.error("Błąd FFmpeg", extra={
+                "job": "crop_video", "annotation_id": annotation_id, "returncode": e.returncode,
+                "ffmpeg_stderr": (e.stderr or "")[-FFMPEG_LOG_TAIL:],
+            })
             raise Exception(f"Błąd FFmpeg: {e.stderr}")
         
         # Utwórz względny URL dla przyciętego wideo
@@ -761,53 +974,54 @@ def crop_video(annotation_id: int, exercise_data: dict = Body(None), db: Session
                 relative_to_public = output_path.relative_to(public_uploads_path)
                 # Jeśli tak, to utwórz URL względny do /uploads
                 relative_output_path = f"/uploads/{relative_to_public}".replace('\\', '/')
-                logger.info(f"Ścieżka względna do /uploads: {relative_output_path}")
+                logger.debug("Ścieżka względna do /uploads: %s", relative_output_path)
             except ValueError:
                 # Jeśli nie, to użyj pełnej ścieżki
                 relative_output_path = str(output_path).replace('\\', '/')
-                logger.info(f"Pełna ścieżka jako URL: {relative_output_path}")
+                logger.debug("Pełna ścieżka jako URL: %s", relative_output_path)
             
-            logger.info(f"Względny URL wyjściowy: {relative_output_path}")
+            logger.debug("Względny URL wyjściowy: %s", relative_output_path)
         except Exception as e:
-            logger.error(f"Błąd podczas tworzenia względnego URL: {str(e)}")
+            logger.error("Błąd podczas tworzenia względnego URL: %s", e)
             # Użyj pełnej ścieżki jako fallback
             relative_output_path = str(output_path).replace('\\', '/')
-            logger.info(f"Fallback URL wyjściowy: {relative_output_path}")
+            logger.debug("Fallback URL wyjściowy: %s", relative_output_path)
         
         # Aktualizuj status adnotacji
         annotation.saved = True
-        logger.info(f"Status adnotacji zaktualizowany na 'saved'")
+        logger.debug("Status adnotacji zaktualizowany na 'saved'")
         
         # Utwórz nowy rekord CroppedVideo
-        crop_id = 1  # Domyślne ID przycięcia
-        
-        # Jeśli przekazano ID ćwiczenia, użyj go
-        if exercise_data and 'exercise_id' in exercise_data:
-            crop_id = exercise_data['exercise_id']
-            logger.info(f"Użyto ID ćwiczenia z żądania: {crop_id}")
-        
         db_cropped_video = CroppedVideo(
             anno_id=annotation_id,
             video_url=relative_output_path,
-            crop_id=crop_id
+            crop_id=exercise_id
         )
         
-        logger.info(f"Tworzenie rekordu CroppedVideo: anno_id={annotation_id}, video_url={relative_output_path}")
+        logger.debug("Tworzenie rekordu CroppedVideo: anno_id=%s, video_url=%s", annotation_id, relative_output_path)
         
         db.add(db_cropped_video)
+        bump_version(db, Analyser, [annotation.analyser_id])
         db.commit()
         db.refresh(db_cropped_video)
         
-        logger.info(f"Rekord CroppedVideo utworzony: id={db_cropped_video.id}")
+        logger.info("Fragment wideo wycięty", extra={
+            "job": "crop_video", "annotation_id": annotation_id, "cropped_video_id": db_cropped_video.id,
+            "ffmpeg_ms": ffmpeg_ms, "elapsed_ms": round((perf_counter() - started) * 1000, 1),
+            "output_bytes": output_path.stat().st_size if output_path.exists() else None,
+        })
+        response_cache.invalidate("analysers", f"analyser:{annotation.analyser_id}")
         
         return db_cropped_video
     except HTTPException as e:
-        logger.error(f"HTTPException: {e.detail}")
+        logger.warning("Wycinanie przerwane: %s", e.detail, extra={
+            "job": "crop_video", "annotation_id": annotation_id, "status": e.status_code,
+        })
         if 'db' in locals():
             db.rollback()
         raise e
     except Exception as e:
-        logger.error(f"Exception: {str(e)}")
+        logger.exception("Wycinanie nie powiodło się", extra={"job": "crop_video", "annotation_id": annotation_id})
         if 'db' in locals():
             db.rollback()
         raise HTTPException(status_code=500, detail=f"Nie udało się wyciąć fragmentu wideo: {str(e)}")
@@ -831,16 +1045,27 @@ def update_cropped_video(cropped_video_id: int, cropped_video: CroppedVideoUpdat
         if not db_cropped_video:
             raise HTTPException(status_code=404, detail="Przycięty film nie został znaleziony")
         
+        previous_analyser_id = db_cropped_video.annotation.analyser_id
+        
         # Update cropped video fields
+        analyser_ids = [previous_analyser_id]
         if cropped_video.anno_id is not None:
             db_cropped_video.anno_id = cropped_video.anno_id
+            analyser_ids += [
+                analyser_id for analyser_id, in db.query(AnnotationAnalyser.analyser_id)
+                .filter(AnnotationAnalyser.id == cropped_video.anno_id)
+            ]
         if cropped_video.video_url is not None:
             db_cropped_video.video_url = cropped_video.video_url
         if cropped_video.crop_id is not None:
             db_cropped_video.crop_id = cropped_video.crop_id
         
+        bump_version(db, Analyser, analyser_ids)
         db.commit()
         db.refresh(db_cropped_video)
+        response_cache.invalidate(
+            "analysers", f"analyser:{previous_analyser_id}", f"analyser:{db_cropped_video.annotation.analyser_id}"
+        )
         return db_cropped_video
     except HTTPException as e:
         db.rollback()
@@ -856,8 +1081,11 @@ def delete_cropped_video(cropped_video_id: int, db: Session = Depends(get_db)):
         if not db_cropped_video:
             raise HTTPException(status_code=404, detail="Przycięty film nie został znaleziony")
         
+        analyser_id = db_cropped_video.annotation.analyser_id
         db.delete(db_cropped_video)
+        bump_version(db, Analyser, [analyser_id])
         db.commit()
+        response_cache.invalidate("analysers", f"analyser:{analyser_id}")
         return {"message": "Przycięty film został usunięty"}
     except Exception as e:
         db.rollback()
@@ -0,0 +1,108 @@
+# api/batch.py
+import os
+from contextlib import nullcontext
+from typing import Optional, Tuple
+from fastapi import APIRouter, HTTPException, Request
+from sqlalchemy.engine import Connection, Transaction
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from database import engine, SessionLocal, batch_session
+from schemas.batch import BatchRequest, BatchResponse
+from services.annotation_buffer import annotation_buffer
+from services.batch import UnresolvedReference, call, resolve
+from services.cache import response_cache
+from services.deletion import deferred_file_removal, remove_video_files
+from services.search import exercise_index
+from services.tag_index import tag_index
+
+router = APIRouter()
+
+MAX_OPERATIONS = int(os.environ.get("BATCH_MAX_OPERATIONS", "100"))
+
+@router.post("", response_model=BatchResponse)
+async def run_batch(batch: BatchRequest, request: Request):
+    """Uporządkowana lista podżądań do istniejących endpointów `/api/...` w jednej sesji bazy.
+
+    Bez `atomic` każda operacja zatwierdza się sama, a błąd jednej nie
+    przerywa pozostałych (operacje odwołujące się do nieudanej dostają 424).
+    Z `atomic` wszystko dzieje się w jednej transakcji: commit endpointu
+    zwalnia tylko savepoint, pierwszy błąd zatrzymuje batch i wycofuje
+    wszystkie operacje (`committed: false`). Pliki wideo usuwanych
+    adnotacji i ćwiczeń znikają dopiero po commicie całego batcha.
+    """
+    operations = batch.operations
+    if not operations:
+        raise HTTPException(status_code=400, detail="Operations must be provided")
+    if len(operations) > MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"Batch is limited to {MAX_OPERATIONS} operations")
+    for operation in operations:
+        if not operation.path.startswith("/api/") or operation.path.split("?")[0].rstrip("/") == "/api/batch":
+            raise HTTPException(status_code=400, detail=f"Unsupported batch path: {operation.path}")
+
+    # Podżądania zapisują adnotacje z pominięciem bufora - najpierw zapisujemy to, co w nim czeka
+    await run_in_threadpool(annotation_buffer.flush)
+
+    # Połączenie z puli i BEGIN mogą czekać (pula, blokada SQLite) - poza pętlą zdarzeń
+    connection, outer, db = await run_in_threadpool(_open_session, batch.atomic)
+
+    results = []
+    produced = {}
+    committed = True
+    removed_files = []
+    token = batch_session.set(db)
+    try:
+        with response_cache.deferred() if batch.atomic else nullcontext(), \
+                deferred_file_removal() if batch.atomic else nullcontext([]) as removed_files:
+            for operation in operations:
+                try:
+                    path = resolve(operation.path, produced, in_path=True)
+                    body = resolve(operation.body, produced)
+                except UnresolvedReference as e:
+                    status, headers, payload = 424, {}, {"detail": str(e)}
+                else:
+                    status, headers, payload = await call(
+                        request.app, request.scope, operation.method.value, path, body, operation.headers
+                    )
+                results.append({"id": operation.id, "status": status, "headers": headers, "body": payload})
+
+                if status < 400:
+                    if operation.id is not None:
+                        produced[operation.id] = payload
+                elif batch.atomic:
+                    committed = False
+                    break
+
+            if batch.atomic:
+                await run_in_threadpool(outer.commit if committed else outer.rollback)
+    finally:
+        batch_session.reset(token)
+        await run_in_threadpool(_close_session, connection, db)
+
+    if committed and removed_files:
+        # Pliki usuniętych przyciętych wideo - dopiero gdy usunięcie jest trwałe
+        await run_in_threadpool(remove_video_files, removed_files)
+    if not committed:
+        # Endpointy aktualizują indeksy w pamięci zaraz po (pozornym) commicie
+        await run_in_threadpool(_rebuild_indexes)
+    return {"committed": committed, "results": results}
+
+
+def _open_session(atomic: bool) -> Tuple[Optional[Connection], Optional[Transaction], Session]:
+    if not atomic:
+        return None, None, SessionLocal()
+    # Zewnętrzna transakcja na połączeniu; commit() sesji zwalnia tylko savepoint
+    connection = engine.connect()
+    outer = connection.begin()
+    return connection, outer, SessionLocal(bind=connection, join_transaction_mode="create_savepoint")
+
+
+def _close_session(connection: Optional[Connection], db: Session):
+    db.close()
+    if connection is not None:
+        connection.close()
+
+
+def _rebuild_indexes():
+    with SessionLocal() as db:
+        exercise_index.build(db)
+        tag_index.build(db)
@@ -1,22 +1,135 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session, selectinload
 from database import get_db
 from models.exercise import Exercise
 from models.tag import Tag
-from schemas.exercise import ExerciseResponse, ExerciseCreate, ExerciseUpdate
-from typing import List
+from models.workout import Workout
+from schemas.exercise import (
+    ExerciseResponse, ExerciseCreate, ExerciseUpdate,
+    ExerciseSearchHit, ExerciseSearchResponse
+)
+from schemas.tag import TagCount
+from services.annotation_buffer import annotation_buffer
+from services.search import exercise_index
+from services.tag_index import tag_index, ids_from_bits
+from services.cache import response_cache
+from services.deletion import delete_exercises
+from services.serialization import EXERCISE, EXERCISE_FIELDS, attach_exercise_tags, dumps
+from services.snapshot import refresh_snapshots, workouts_using_exercises
+from services.versioning import bump_version, check_etag
+from typing import List, Optional
+from utils.fieldsets import FieldParams
+from utils.pagination import (
+    NEXT_CURSOR_HEADER, PageParams, decode_cursor, decode_ranked_cursor, encode_cursor, estimate_count, paginate
+)
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Exercises endpoints
 @router.get("/", response_model=List[ExerciseResponse])
-def get_exercises(db: Session = Depends(get_db)):
+def get_exercises(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    tags_all: List[int] = Query([], description="Ćwiczenie ma wszystkie tagi"),
+    tags_any: List[int] = Query([], description="Ćwiczenie ma co najmniej jeden z tagów"),
+    tags_not: List[int] = Query([], description="Ćwiczenie nie ma żadnego z tagów"),
+    fast: bool = Query(False, description="Szybka serializacja (projekcje kolumn + orjson)"),
+    fields: FieldParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    names = EXERCISE_FIELDS.select(fields) if fields.sparse else None
+    cached, generation = response_cache.lookup(request)
+    if cached is not None:
+        return cached
     try:
-        exercises = db.query(Exercise).all()
-        return exercises
+        if names:
+            query = EXERCISE_FIELDS.query(db, names)
+        elif fast:
+            query = db.query(*EXERCISE.columns)
+        else:
+            query = db.query(Exercise).options(selectinload(Exercise.tags))
+        count = lambda: estimate_count(db, Exercise)
+        
+        if tags_all or tags_any or tags_not:
+            # Filtr tagów liczony na bitmapach - do bazy idą tylko id z bieżącej strony
+            tag_index.ensure_built(db)
+            bits = tag_index.query(tags_all, tags_any, tags_not)
+            page_ids = ids_from_bits(bits, after=page.after_id, limit=page.fetch_limit)
+            query = query.filter(Exercise.id.in_(page_ids))
+            count = bits.bit_count
+        
+        exercises = paginate(query, Exercise.id, page, response, count=count)
+        if names:
+            exercises = EXERCISE_FIELDS.dicts(db, names, exercises)
+            return response_cache.store_body(request, dumps(exercises), ["exercises"], generation, response)
+        if fast:
+            exercises = attach_exercise_tags(db, EXERCISE.dicts(exercises))
+            return response_cache.store_body(request, dumps(exercises), ["exercises"], generation, response)
+        return response_cache.store(request, List[ExerciseResponse], exercises, ["exercises"], generation, response)
     except Exception as e:
         raise HTTPException(status_code=500, detail="Nie udało się pobrać ćwiczeń")
 
+@router.get("/search", response_model=ExerciseSearchResponse)
+def search_exercises(
+    response: Response,
+    q: str = "",
+    tags_any: List[int] = Query([], description="Ćwiczenie ma co najmniej jeden z tagów"),
+    tags_all: List[int] = Query([], description="Ćwiczenie ma wszystkie tagi"),
+    tags_not: List[int] = Query([], description="Ćwiczenie nie ma żadnego z tagów"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Kursor zwrócony w nagłówku X-Next-Cursor"),
+    db: Session = Depends(get_db)
+):
+    # Kursor z frazą to (score, id) ostatniego wyniku, bez frazy - samo id
+    after = None
+    if cursor:
+        after = decode_ranked_cursor(cursor) if q.strip() else decode_cursor(cursor)
+    try:
+        exercise_index.ensure_built(db)
+        tag_index.ensure_built(db)
+        
+        has_tag_filter = bool(tags_all or tags_any or tags_not)
+        allowed = tag_index.query(tags_all, tags_any, tags_not) if has_tag_filter else None
+        
+        if q.strip():
+            ranked, matched = exercise_index.search(q, allowed, limit + 1, after)
+        else:
+            # Bez frazy przeglądamy ćwiczenia spełniające filtr tagów w kolejności id
+            matched = allowed if has_tag_filter else tag_index.all
+            ranked = [(ex_id, 0.0) for ex_id in ids_from_bits(matched, after=after, limit=limit + 1)]
+        
+        if len(ranked) > limit:
+            ranked = ranked[:limit]
+            last_id, last_score = ranked[-1]
+            response.headers[NEXT_CURSOR_HEADER] = (
+                encode_cursor(last_id, last_score) if q.strip() else encode_cursor(last_id)
+            )
+        
+        # Dociągamy z bazy tylko ćwiczenia z bieżącej strony
+        ids = [ex_id for ex_id, _ in ranked]
+        exercises = {
+            exercise.id: exercise
+            for exercise in db.query(Exercise).options(selectinload(Exercise.tags)).filter(Exercise.id.in_(ids))
+        } if ids else {}
+        items = [
+            ExerciseSearchHit(**ExerciseResponse.model_validate(exercises[ex_id]).model_dump(), score=round(score, 4))
+            for ex_id, score in ranked if ex_id in exercises
+        ]
+        
+        facet_counts = tag_index.counts(matched)
+        tag_names = dict(db.query(Tag.id, Tag.name).filter(Tag.id.in_(facet_counts))) if facet_counts else {}
+        facets = sorted(
+            (TagCount(tag_id=tag_id, name=tag_names[tag_id], count=count)
+             for tag_id, count in facet_counts.items() if tag_id in tag_names),
+            key=lambda facet: (-facet.count, facet.name)
+        )
+        return ExerciseSearchResponse(total=matched.bit_count(), items=items, facets=facets)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Nie udało się wyszukać ćwiczeń: {str(e)}")
+
 @router.post("/", response_model=ExerciseResponse, status_code=201)
 def create_exercise(exercise: ExerciseCreate, db: Session = Depends(get_db)):
     try:
@@ -44,6 +157,9 @@ def create_exercise(exercise: ExerciseCreate, db: Session = Depends(get_db)):
         
         db.commit()
         db.refresh(db_exercise)
+        exercise_index.upsert(db_exercise)
+        tag_index.set_tags(db_exercise.id, [tag.id for tag in db_exercise.tags])
+        response_cache.invalidate("exercises", f"exercise:{db_exercise.id}")
         return db_exercise
     except HTTPException as e:
         db.rollback()
@@ -53,12 +169,18 @@ def create_exercise(exercise: ExerciseCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Nie udało się utworzyć ćwiczenia: {str(e)}")
 
 @router.get("/{exercise_id}", response_model=ExerciseResponse)
-def get_exercise(exercise_id: int, db: Session = Depends(get_db)):
+def get_exercise(exercise_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    not_modified = check_etag(request, response, db, Exercise, exercise_id)
+    if not_modified is not None:
+        return not_modified
+    cached, generation = response_cache.lookup(request)
+    if cached is not None:
+        return cached
     try:
         exercise = db.query(Exercise).filter(Exercise.id == exercise_id).first()
         if not exercise:
             raise HTTPException(status_code=404, detail="Ćwiczenie nie zostało znalezione")
-        return exercise
+        return response_cache.store(request, ExerciseResponse, exercise, [f"exercise:{exercise_id}"], generation, response)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -75,6 +197,9 @@ def update_exercise(exercise_id: int, exercise: ExerciseUpdate, db: Session = De
         if not db_exercise:
             raise HTTPException(status_code=404, detail="Ćwiczenie nie zostało znalezione")
         
+        # Snapshoty treningów zawierają nazwę i wideo ćwiczenia
+        display_changed = (db_exercise.name, db_exercise.videoUrl) != (exercise.name, exercise.videoUrl)
+        
         # Update exercise basic fields
         db_exercise.name = exercise.name
         db_exercise.instructions = exercise.instructions
@@ -93,8 +218,18 @@ def update_exercise(exercise_id: int, exercise: ExerciseUpdate, db: Session = De
                 if tag:
                     db_exercise.tags.append(tag)
         
+        bump_version(db, Exercise, [exercise_id])
+        affected_workouts = workouts_using_exercises(db, [exercise_id]) if display_changed else set()
+        bump_version(db, Workout, affected_workouts)
+        refresh_snapshots(db, affected_workouts)
         db.commit()
         db.refresh(db_exercise)
+        exercise_index.upsert(db_exercise)
+        tag_index.set_tags(db_exercise.id, [tag.id for tag in db_exercise.tags])
+        stale = ["exercises", f"exercise:{db_exercise.id}"]
+        if affected_workouts:
+            stale += ["workouts"] + [f"workout:{workout_id}" for workout_id in affected_workouts]
+        response_cache.invalidate(*stale)
         return db_exercise
     except HTTPException as e:
         db.rollback()
@@ -105,63 +240,23 @@ def update_exercise(exercise_id: int, exercise: ExerciseUpdate, db: Session = De
 
 @router.delete("/{exercise_id}")
 def delete_exercise(exercise_id: int, db: Session = Depends(get_db)):
-    import os
-    import logging
-    from pathlib import Path
-    from models.analyser import CroppedVideo, AnnotationAnalyser
-    
-    logger = logging.getLogger(__name__)
-    
     try:
-        # 1. Find the exercise
-        db_exercise = db.query(Exercise).filter(Exercise.id == exercise_id).first()
-        if not db_exercise:
-            raise HTTPException(status_code=404, detail="Ćwiczenie nie zostało znalezione")
+        # Zbuforowane edycje adnotacji mogłyby nadpisać reset 'saved' poniżej
+        annotation_buffer.flush()
         
-        # 2. Find any cropped videos associated with this exercise
-        cropped_videos = db.query(CroppedVideo).filter(CroppedVideo.crop_id == exercise_id).all()
-        
-        for cropped_video in cropped_videos:
-            # 3. Find the annotation associated with this cropped video
-            annotation = db.query(AnnotationAnalyser).filter(AnnotationAnalyser.id == cropped_video.anno_id).first()
-            
-            if annotation:
-                # 4. Set the annotation's saved status to false
-                annotation.saved = False
-                logger.info(f"Resetowanie statusu 'saved' dla adnotacji {annotation.id}")
-            
-            # 5. Delete the video file if it exists
-            if cropped_video.video_url:
-                try:
-                    video_path = None
-                    
-                    # Handle relative paths starting with /uploads/
-                    if cropped_video.video_url.startswith('/uploads/'):
-                        project_root = Path(__file__).resolve().parents[2]  # api/api/exercise.py -> api/api -> api -> root
-                        public_uploads_path = project_root / "public" / "uploads"
-                        filename = cropped_video.video_url.replace('/uploads/', '')
-                        video_path = public_uploads_path / filename
-                    else:
-                        # Try to use the path as is
-                        video_path = Path(cropped_video.video_url)
-                    
-                    if video_path and video_path.exists() and video_path.is_file():
-                        os.remove(video_path)
-                        logger.info(f"Usunięto plik wideo: {video_path}")
-                    else:
-                        logger.warning(f"Nie znaleziono pliku wideo do usunięcia: {cropped_video.video_url}")
-                except Exception as file_error:
-                    logger.error(f"Błąd podczas usuwania pliku wideo: {str(file_error)}")
-            
-            # 6. Delete the cropped video record
-            db.delete(cropped_video)
-            logger.info(f"Usunięto rekord przyciętego wideo: {cropped_video.id}")
+        if db.query(Exercise.id).filter(Exercise.id == exercise_id).first() is None:
+            raise HTTPException(status_code=404, detail="Ćwiczenie nie zostało znalezione")
         
-        # 7. Finally delete the exercise
-        db.delete(db_exercise)
+        # Tagi, użycia w treningach i przycięte wideo usuwa kaskada; adnotacje tracą status 'saved'
+        deletion = delete_exercises(db, [exercise_id])
+        deletion.apply(db)
         db.commit()
+        deletion.finish()
         
         return {"message": "Ćwiczenie zostało usunięte wraz z powiązanymi plikami wideo"}
+    except HTTPException as e:
+        db.rollback()
+        raise e
     except Exception as e:
         db.rollback()
         logger.error(f"Błąd podczas usuwania ćwiczenia: {str(e)}")
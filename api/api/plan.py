@@ -1,14 +1,26 @@
 # api/plan.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
 from database import get_db
 from models.plan import Plan, WeekPlan, WorkoutPlan
+from models.workout import Workout
 from schemas.plan import (
-    PlanCreate, PlanResponse, PlanUpdate,
+    PlanClone, PlanCreate, PlanResponse, PlanUpdate,
     WeekPlanCreate, WeekPlanResponse, WeekPlanUpdate,
-    WorkoutPlanCreate, WorkoutPlanResponse, WorkoutPlanUpdate
+    WorkoutPlanCreate, WorkoutPlanResponse, WorkoutPlanUpdate,
+    BulkAction, WorkoutPlanBulk, WorkoutPlanBulkResult,
+    PlanLoad
 )
+from services.analytics import scheduled_workouts, training_load
+from services.cache import response_cache
+from services.deletion import delete_plans, delete_weeks
+from services.plan_clone import clone_plan
+from services.serialization import PLAN, PLAN_FIELDS, attach_plan_weeks, dumps
+from services.versioning import bump_version, check_etag, conditional, parent_version
 from typing import List
+from utils.fieldsets import FieldParams
+from utils.pagination import PageParams, paginate, estimate_count
 import datetime
 
 router = APIRouter()
@@ -19,31 +31,105 @@ def create_plan(plan: PlanCreate, db: Session = Depends(get_db)):
     try:
         db_plan = Plan(
             name=plan.name,
-            event_date=plan.event_date
+            event_date=plan.event_date,
+            is_template=plan.is_template
         )
         db.add(db_plan)
         db.commit()
         db.refresh(db_plan)
+        response_cache.invalidate("plans")
         return db_plan
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create plan: {str(e)}")
 
 @router.get("/", response_model=List[PlanResponse])
-def get_plans(db: Session = Depends(get_db)):
+def get_plans(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    templates: bool = Query(False, description="Szablony planów zamiast planów"),
+    fast: bool = Query(False, description="Szybka serializacja (projekcje kolumn + orjson)"),
+    fields: FieldParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    names = PLAN_FIELDS.select(fields) if fields.sparse else None
+    cached, generation = response_cache.lookup(request)
+    if cached is not None:
+        return cached
     try:
-        plans = db.query(Plan).all()
-        return plans
+        kind = lambda query: query.filter(Plan.is_template.is_(templates))
+        # Szablonów jest niewiele - liczymy je dokładnie
+        count = lambda: kind(db.query(func.count(Plan.id))).scalar() if templates else estimate_count(db, Plan)
+        
+        if names:
+            rows = paginate(kind(PLAN_FIELDS.query(db, names)), Plan.id, page, response, count=count)
+            plans = PLAN_FIELDS.dicts(db, names, rows)
+            return response_cache.store_body(request, dumps(plans), ["plans"], generation, response)
+        
+        if fast:
+            rows = paginate(kind(db.query(*PLAN.columns)), Plan.id, page, response, count=count)
+            plans = attach_plan_weeks(db, PLAN.dicts(rows))
+            return response_cache.store_body(request, dumps(plans), ["plans"], generation, response)
+        
+        query = kind(db.query(Plan)).options(selectinload(Plan.weeks).selectinload(WeekPlan.workouts))
+        plans = paginate(query, Plan.id, page, response, count=count)
+        return response_cache.store(request, List[PlanResponse], plans, ["plans"], generation, response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch plans: {str(e)}")
 
+# Analityka obciążenia - przed /{plan_id}, żeby "load" nie trafiło do parametru
+@router.get("/load", response_model=List[PlanLoad])
+def get_training_load(
+    request: Request,
+    plan_ids: List[int] = Query([], description="Plany do zestawienia (domyślnie wszystkie)"),
+    tags: bool = Query(False, description="Rozbicie tygodni na tagi (kolumnowo)"),
+    db: Session = Depends(get_db)
+):
+    cached, generation = response_cache.lookup(request)
+    if cached is not None:
+        return cached
+    try:
+        loads = training_load(db, plan_ids or None, tags=tags)
+        # Zestawienie wielu planów zależy od każdego planu, treningu i tagów ćwiczeń
+        return response_cache.store_body(request, dumps(loads), ["plans", "workouts", "exercises"], generation)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compute training load: {str(e)}")
+
+@router.get("/{plan_id}/load", response_model=PlanLoad)
+def get_plan_load(
+    plan_id: int,
+    request: Request,
+    tags: bool = Query(True, description="Rozbicie tygodni na tagi (kolumnowo)"),
+    db: Session = Depends(get_db)
+):
+    cached, generation = response_cache.lookup(request)
+    if cached is not None:
+        return cached
+    try:
+        loads = training_load(db, [plan_id], tags=tags)
+        if not loads:
+            raise HTTPException(status_code=404, detail="Plan not found")
+        keys = [f"plan:{plan_id}", "exercises"] + [f"workout:{workout_id}" for workout_id in scheduled_workouts(db, plan_id)]
+        return response_cache.store_body(request, dumps(loads[0]), keys, generation)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compute plan load: {str(e)}")
+
 @router.get("/{plan_id}", response_model=PlanResponse)
-def get_plan(plan_id: int, db: Session = Depends(get_db)):
+def get_plan(plan_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    not_modified = check_etag(request, response, db, Plan, plan_id)
+    if not_modified is not None:
+        return not_modified
+    cached, generation = response_cache.lookup(request)
+    if cached is not None:
+        return cached
     try:
         plan = db.query(Plan).filter(Plan.id == plan_id).first()
         if not plan:
             raise HTTPException(status_code=404, detail="Plan not found")
-        return plan
+        return response_cache.store(request, PlanResponse, plan, [f"plan:{plan_id}"], generation, response)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -62,8 +148,10 @@ def update_plan(plan_id: int, plan: PlanUpdate, db: Session = Depends(get_db)):
         if plan.event_date is not None:
             db_plan.event_date = plan.event_date
         
+        bump_version(db, Plan, [plan_id])
         db.commit()
         db.refresh(db_plan)
+        response_cache.invalidate("plans", f"plan:{plan_id}")
         return db_plan
     except HTTPException as e:
         db.rollback()
@@ -72,16 +160,40 @@ def update_plan(plan_id: int, plan: PlanUpdate, db: Session = Depends(get_db)):
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to update plan: {str(e)}")
 
+@router.post("/{plan_id}/clone", response_model=PlanResponse, status_code=201)
+def clone_plan_endpoint(plan_id: int, clone: PlanClone, db: Session = Depends(get_db)):
+    """Kopia planu (lub szablonu) na nowy termin; z `is_template` zapisuje kopię jako szablon."""
+    try:
+        source = db.query(Plan).filter(Plan.id == plan_id).first()
+        if not source:
+            raise HTTPException(status_code=404, detail="Plan not found")
+        
+        db_plan = clone_plan(db, source, clone.event_date, name=clone.name, is_template=clone.is_template)
+        db.commit()
+        db.refresh(db_plan)
+        response_cache.invalidate("plans")
+        return db_plan
+    except HTTPException as e:
+        db.rollback()
+        raise e
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to clone plan: {str(e)}")
+
 @router.delete("/{plan_id}")
 def delete_plan(plan_id: int, db: Session = Depends(get_db)):
     try:
-        db_plan = db.query(Plan).filter(Plan.id == plan_id).first()
-        if not db_plan:
+        if db.query(Plan.id).filter(Plan.id == plan_id).first() is None:
             raise HTTPException(status_code=404, detail="Plan not found")
         
-        db.delete(db_plan)
+        # Weeks and their workouts go through ON DELETE CASCADE
+        deletion = delete_plans(db, [plan_id])
         db.commit()
+        deletion.finish("plans", f"plan:{plan_id}")
         return {"message": "Plan deleted successfully"}
+    except HTTPException as e:
+        db.rollback()
+        raise e
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete plan: {str(e)}")
@@ -101,8 +213,10 @@ def create_week_plan(week: WeekPlanCreate, db: Session = Depends(get_db)):
             notes=week.notes
         )
         db.add(db_week)
+        bump_version(db, Plan, [week.plan_id])
         db.commit()
         db.refresh(db_week)
+        response_cache.invalidate("plans", f"plan:{db_week.plan_id}")
         return db_week
     except HTTPException as e:
         db.rollback()
@@ -112,12 +226,19 @@ def create_week_plan(week: WeekPlanCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Failed to create week plan: {str(e)}")
 
 @router.get("/weeks/{week_id}", response_model=WeekPlanResponse)
-def get_week_plan(week_id: int, db: Session = Depends(get_db)):
+def get_week_plan(week_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    plan_id, version = parent_version(db, Plan, WeekPlan.plan_id, week_id)
+    not_modified = conditional(request, response, Plan, plan_id, version)
+    if not_modified is not None:
+        return not_modified
+    cached, generation = response_cache.lookup(request)
+    if cached is not None:
+        return cached
     try:
         week = db.query(WeekPlan).filter(WeekPlan.id == week_id).first()
         if not week:
             raise HTTPException(status_code=404, detail="Week plan not found")
-        return week
+        return response_cache.store(request, WeekPlanResponse, week, [f"plan:{week.plan_id}"], generation, response)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -136,8 +257,10 @@ def update_week_plan(week_id: int, week: WeekPlanUpdate, db: Session = Depends(g
         if week.notes is not None:
             db_week.notes = week.notes
         
+        bump_version(db, Plan, [db_week.plan_id])
         db.commit()
         db.refresh(db_week)
+        response_cache.invalidate("plans", f"plan:{db_week.plan_id}")
         return db_week
     except HTTPException as e:
         db.rollback()
@@ -149,13 +272,18 @@ def update_week_plan(week_id: int, week: WeekPlanUpdate, db: Session = Depends(g
 @router.delete("/weeks/{week_id}")
 def delete_week_plan(week_id: int, db: Session = Depends(get_db)):
     try:
-        db_week = db.query(WeekPlan).filter(WeekPlan.id == week_id).first()
-        if not db_week:
+        if db.query(WeekPlan.id).filter(WeekPlan.id == week_id).first() is None:
             raise HTTPException(status_code=404, detail="Week plan not found")
         
-        db.delete(db_week)
+        # Workouts of the week go through ON DELETE CASCADE
+        deletion = delete_weeks(db, [week_id])
+        deletion.apply(db)
         db.commit()
+        deletion.finish()
         return {"message": "Week plan deleted successfully"}
+    except HTTPException as e:
+        db.rollback()
+        raise e
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete week plan: {str(e)}")
@@ -184,8 +312,10 @@ def create_workout_plan(workout: WorkoutPlanCreate, db: Session = Depends(get_db
             work_id=workout.work_id
         )
         db.add(db_workout)
+        bump_version(db, Plan, [workout.plan_id])
         db.commit()
         db.refresh(db_workout)
+        response_cache.invalidate("plans", f"plan:{db_workout.plan_id}")
         return db_workout
     except HTTPException as e:
         db.rollback()
@@ -194,13 +324,102 @@ def create_workout_plan(workout: WorkoutPlanCreate, db: Session = Depends(get_db
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create workout plan: {str(e)}")
 
+@router.post("/workouts/bulk", response_model=WorkoutPlanBulkResult)
+def bulk_workout_plans(bulk: WorkoutPlanBulk, db: Session = Depends(get_db)):
+    """Operacje na wielu treningach planu naraz, w jednej transakcji.
+
+    Operacje są wykonywane po kolei; każda to jeden UPDATE/DELETE po liście id.
+    Istnienie treningów, tygodni docelowych i podpinanych treningów oraz
+    przynależność do planu są sprawdzane z góry, po jednym zapytaniu na tabelę.
+    """
+    try:
+        operations = bulk.operations
+        if not operations:
+            raise HTTPException(status_code=400, detail="Operations must be provided")
+        for operation in operations:
+            if not operation.workout_ids:
+                raise HTTPException(status_code=400, detail=f"Operation '{operation.action.value}' has no workout_ids")
+            if operation.action == BulkAction.MOVE and operation.week_id is None:
+                raise HTTPException(status_code=400, detail="Move requires week_id")
+            if operation.action == BulkAction.SET_DAY and operation.day_of_week is None:
+                raise HTTPException(status_code=400, detail="Set day requires day_of_week")
+        
+        # Walidacja zbiorcza
+        workout_ids = {workout_id for operation in operations for workout_id in operation.workout_ids}
+        plan_of_workout = dict(db.query(WorkoutPlan.id, WorkoutPlan.plan_id).filter(WorkoutPlan.id.in_(workout_ids)))
+        missing = sorted(workout_ids - set(plan_of_workout))
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Workout plans not found: {missing}")
+        
+        week_ids = {operation.week_id for operation in operations if operation.action == BulkAction.MOVE}
+        plan_of_week = dict(db.query(WeekPlan.id, WeekPlan.plan_id).filter(WeekPlan.id.in_(week_ids))) if week_ids else {}
+        missing = sorted(week_ids - set(plan_of_week))
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Target weeks not found: {missing}")
+        
+        work_ids = {operation.work_id for operation in operations if operation.action == BulkAction.ATTACH} - {None}
+        existing = {work_id for work_id, in db.query(Workout.id).filter(Workout.id.in_(work_ids))} if work_ids else set()
+        missing = sorted(work_ids - existing)
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Workouts not found: {missing}")
+        
+        for operation in operations:
+            if operation.action == BulkAction.MOVE:
+                target_plan = plan_of_week[operation.week_id]
+                if any(plan_of_workout[workout_id] != target_plan for workout_id in operation.workout_ids):
+                    raise HTTPException(status_code=400, detail="Cannot move workout to a week in a different plan")
+        
+        # Zapis - jeden UPDATE/DELETE na operację
+        deleted = set()
+        for operation in operations:
+            rows = db.query(WorkoutPlan).filter(WorkoutPlan.id.in_(operation.workout_ids))
+            if operation.action == BulkAction.DELETE:
+                rows.delete(synchronize_session=False)
+                deleted.update(operation.workout_ids)
+                continue
+            if operation.action == BulkAction.MOVE:
+                values = {WorkoutPlan.week_id: operation.week_id}
+                if operation.day_of_week is not None:
+                    values[WorkoutPlan.day_of_week] = operation.day_of_week
+            elif operation.action == BulkAction.SET_DAY:
+                values = {WorkoutPlan.day_of_week: operation.day_of_week}
+            elif operation.action == BulkAction.ATTACH:
+                values = {WorkoutPlan.work_id: operation.work_id}
+            else:
+                values = {WorkoutPlan.completed: operation.action == BulkAction.COMPLETE}
+            rows.update(values, synchronize_session=False)
+        
+        plan_ids = set(plan_of_workout.values())
+        bump_version(db, Plan, plan_ids)
+        db.commit()
+        response_cache.invalidate("plans", *[f"plan:{plan_id}" for plan_id in plan_ids])
+        
+        workouts = (
+            db.query(WorkoutPlan).filter(WorkoutPlan.id.in_(workout_ids - deleted)).order_by(WorkoutPlan.id).all()
+            if workout_ids - deleted else []
+        )
+        return {"workouts": workouts, "deleted": sorted(deleted)}
+    except HTTPException as e:
+        db.rollback()
+        raise e
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to apply bulk operations: {str(e)}")
+
 @router.get("/workouts/{workout_id}", response_model=WorkoutPlanResponse)
-def get_workout_plan(workout_id: int, db: Session = Depends(get_db)):
+def get_workout_plan(workout_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    plan_id, version = parent_version(db, Plan, WorkoutPlan.plan_id, workout_id)
+    not_modified = conditional(request, response, Plan, plan_id, version)
+    if not_modified is not None:
+        return not_modified
+    cached, generation = response_cache.lookup(request)
+    if cached is not None:
+        return cached
     try:
         workout = db.query(WorkoutPlan).filter(WorkoutPlan.id == workout_id).first()
         if not workout:
             raise HTTPException(status_code=404, detail="Workout plan not found")
-        return workout
+        return response_cache.store(request, WorkoutPlanResponse, workout, [f"plan:{workout.plan_id}"], generation, response)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -238,8 +457,10 @@ def update_workout_plan(workout_id: int, workout: WorkoutPlanUpdate, db: Session
         if workout.work_id is not None:
             db_workout.work_id = workout.work_id
         
+        bump_version(db, Plan, [db_workout.plan_id])
         db.commit()
         db.refresh(db_workout)
+        response_cache.invalidate("plans", f"plan:{db_workout.plan_id}")
         return db_workout
     except HTTPException as e:
         db.rollback()
@@ -255,15 +476,24 @@ def delete_workout_plan(workout_id: int, db: Session = Depends(get_db)):
         if not db_workout:
             raise HTTPException(status_code=404, detail="Workout plan not found")
         
+        plan_id = db_workout.plan_id
         db.delete(db_workout)
+        bump_version(db, Plan, [plan_id])
         db.commit()
+        response_cache.invalidate("plans", f"plan:{plan_id}")
         return {"message": "Workout plan deleted successfully"}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete workout plan: {str(e)}")
 
 @router.get("/{plan_id}/weeks", response_model=List[WeekPlanResponse])
-def get_plan_weeks(plan_id: int, db: Session = Depends(get_db)):
+def get_plan_weeks(plan_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    not_modified = check_etag(request, response, db, Plan, plan_id)
+    if not_modified is not None:
+        return not_modified
+    cached, generation = response_cache.lookup(request)
+    if cached is not None:
+        return cached
     try:
         # Check if plan exists
         plan = db.query(Plan).filter(Plan.id == plan_id).first()
@@ -271,14 +501,21 @@ def get_plan_weeks(plan_id: int, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Plan not found")
         
         weeks = db.query(WeekPlan).filter(WeekPlan.plan_id == plan_id).order_by(WeekPlan.position).all()
-        return weeks
+        return response_cache.store(request, List[WeekPlanResponse], weeks, [f"plan:{plan_id}"], generation, response)
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch plan weeks: {str(e)}")
 
 @router.get("/weeks/{week_id}/workouts", response_model=List[WorkoutPlanResponse])
-def get_week_workouts(week_id: int, db: Session = Depends(get_db)):
+def get_week_workouts(week_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    plan_id, version = parent_version(db, Plan, WeekPlan.plan_id, week_id)
+    not_modified = conditional(request, response, Plan, plan_id, version)
+    if not_modified is not None:
+        return not_modified
+    cached, generation = response_cache.lookup(request)
+    if cached is not None:
+        return cached
     try:
         # Check if week exists
         week = db.query(WeekPlan).filter(WeekPlan.id == week_id).first()
@@ -286,7 +523,7 @@ def get_week_workouts(week_id: int, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Week plan not found")
         
         workouts = db.query(WorkoutPlan).filter(WorkoutPlan.week_id == week_id).all()
-        return workouts
+        return response_cache.store(request, List[WorkoutPlanResponse], workouts, [f"plan:{week.plan_id}"], generation, response)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -1,21 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from database import get_db
 from models.tag import Tag
-from schemas.tag import TagBase, TagResponse
+from schemas.tag import TagBase, TagResponse, TagCount
+from services.tag_index import tag_index
+from services.cache import response_cache
 from typing import List
+from utils.pagination import PageParams, paginate, estimate_count
 
 router = APIRouter()
 
 # Tags endpoints
 @router.get("/", response_model=List[TagResponse])
-def get_tags(db: Session = Depends(get_db)):
+def get_tags(request: Request, response: Response, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    cached, generation = response_cache.lookup(request)
+    if cached is not None:
+        return cached
     try:
-        tags = db.query(Tag).all()
-        return tags
+        tags = paginate(db.query(Tag), Tag.id, page, response, count=lambda: estimate_count(db, Tag))
+        return response_cache.store(request, List[TagResponse], tags, ["tags"], generation, response)
     except Exception as e:
         raise HTTPException(status_code=500, detail="Nie udało się pobrać tagów")
 
+@router.get("/counts", response_model=List[TagCount])
+def get_tag_counts(
+    tags_all: List[int] = Query([], description="Licz tylko ćwiczenia mające wszystkie tagi"),
+    tags_any: List[int] = Query([], description="Licz tylko ćwiczenia mające co najmniej jeden z tagów"),
+    tags_not: List[int] = Query([], description="Pomiń ćwiczenia mające którykolwiek z tagów"),
+    db: Session = Depends(get_db)
+):
+    try:
+        tag_index.ensure_built(db)
+        bits = tag_index.query(tags_all, tags_any, tags_not) if (tags_all or tags_any or tags_not) else None
+        counts = tag_index.counts(bits)
+        tags = db.query(Tag.id, Tag.name).order_by(Tag.id).all()
+        return [TagCount(tag_id=tag_id, name=name, count=counts.get(tag_id, 0)) for tag_id, name in tags]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Nie udało się pobrać liczby ćwiczeń dla tagów")
+
 @router.post("/", response_model=TagBase, status_code=201)
 def create_tag(tag: TagBase, db: Session = Depends(get_db)):
     try:
@@ -23,6 +45,7 @@ def create_tag(tag: TagBase, db: Session = Depends(get_db)):
         db.add(db_tag)
         db.commit()
         db.refresh(db_tag)
+        response_cache.invalidate("tags")
         return db_tag
     except Exception as e:
         raise HTTPException(status_code=500, detail="Nie udało się utworzyć tagu")
\ No newline at end of file
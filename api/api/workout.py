@@ -1,36 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
 from database import get_db
 from schemas.workout import WorkoutResponse, WorkoutCreate
 from models.workout import Workout, WorkoutSection, WorkoutExercise, SectionExercise
-from typing import List
+from services.cache import response_cache
+from services.deletion import delete_workouts
+from services.serialization import WORKOUT, WORKOUT_FIELDS, attach_workout_sections, dumps
+from services.snapshot import read_snapshot, refresh_snapshots
+from services.duration import estimate
+from services.versioning import bump_version, check_etag
+from typing import List, Optional
+from utils.fieldsets import FieldParams
+from utils.pagination import PageParams, paginate, estimate_count
 import datetime
 
 router = APIRouter()
 
 # Workouts endpoints
 @router.get("/", response_model=List[WorkoutResponse])
-def get_workouts(db: Session = Depends(get_db)):
+def get_workouts(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    min_minutes: Optional[int] = Query(None, ge=0, description="Szacowany czas co najmniej (minuty)"),
+    max_minutes: Optional[int] = Query(None, ge=0, description="Szacowany czas co najwyżej (minuty)"),
+    fast: bool = Query(False, description="Szybka serializacja (projekcje kolumn + orjson)"),
+    fields: FieldParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    names = WORKOUT_FIELDS.select(fields) if fields.sparse else None
+    cached, generation = response_cache.lookup(request)
+    if cached is not None:
+        return cached
     try:
-        workouts = db.query(Workout).all()
-        return workouts
+        # Filtr po zapisanym szacunku - zakres na indeksie ix_workouts_estimated_duration
+        def by_duration(query):
+            if min_minutes is not None:
+                query = query.filter(Workout.estimated_duration >= min_minutes * 60)
+            if max_minutes is not None:
+                query = query.filter(Workout.estimated_duration <= max_minutes * 60)
+            return query
+        
+        count = lambda: estimate_count(db, Workout)
+        if min_minutes is not None or max_minutes is not None:
+            count = lambda: by_duration(db.query(func.count(Workout.id))).scalar()
+        
+        if names:
+            rows = paginate(by_duration(WORKOUT_FIELDS.query(db, names)), Workout.id, page, response, count=count)
+            workouts = WORKOUT_FIELDS.dicts(db, names, rows)
+            return response_cache.store_body(request, dumps(workouts), ["workouts"], generation, response)
+        
+        if fast:
+            rows = paginate(by_duration(db.query(*WORKOUT.columns)), Workout.id, page, response, count=count)
+            workouts = attach_workout_sections(db, WORKOUT.dicts(rows))
+            return response_cache.store_body(request, dumps(workouts), ["workouts"], generation, response)
+        
+        query = by_duration(db.query(Workout)).options(
+            selectinload(Workout.sections).selectinload(WorkoutSection.exercises).selectinload(WorkoutExercise.exercise)
+        )
+        workouts = paginate(query, Workout.id, page, response, count=count)
+        return response_cache.store(request, List[WorkoutResponse], workouts, ["workouts"], generation, response)
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to fetch workouts")
 
 @router.get("/{workout_id}", response_model=WorkoutResponse)
-def get_workout(workout_id: int, db: Session = Depends(get_db)):
+def get_workout(workout_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    not_modified = check_etag(request, response, db, Workout, workout_id)
+    if not_modified is not None:
+        return not_modified
+    cached, generation = response_cache.lookup(request)
+    if cached is not None:
+        return cached
     try:
-        workout = db.query(Workout).filter(Workout.id == workout_id).first()
-        if not workout:
+        # Cały trening z jednego wiersza snapshotu
+        body = read_snapshot(db, workout_id)
+        if body is None:
             raise HTTPException(status_code=404, detail="Workout not found")
-        
-        # Load sections with exercises
-        for section in workout.sections:
-            section.exercises = db.query(WorkoutExercise).join(
-                SectionExercise, SectionExercise.work_exercise_id == WorkoutExercise.id
-            ).filter(SectionExercise.section_id == section.id).all()
-        
-        return workout
+        return response_cache.store_body(request, body.encode(), [f"workout:{workout_id}"], generation, response)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -46,22 +93,27 @@ def create_workout(workout: WorkoutCreate, db: Session = Depends(get_db)):
         if not hasattr(workout, 'sections') or not workout.sections:
             raise HTTPException(status_code=400, detail="Sections must be provided")
         
+        # Szacowany czas liczony z przesłanych danych, bez ponownego czytania drzewa
+        estimated_duration, section_durations = estimate(workout.sections)
+        
         # Create workout
         db_workout = Workout(
             title=workout.title,
             description=workout.description,
             duration=workout.duration,
+            estimated_duration=estimated_duration,
             created_at=datetime.date.today()
         )
         db.add(db_workout)
         db.flush()  # To get workout ID
         
         # Create sections with exercises
-        for section in workout.sections:
+        for section, section_duration in zip(workout.sections, section_durations):
             db_section = WorkoutSection(
                 work_id=db_workout.id,
                 name=section.name,
-                position=section.position
+                position=section.position,
+                estimated_duration=section_duration
             )
             db.add(db_section)
             db.flush()  # To get section ID
@@ -89,9 +141,10 @@ def create_workout(workout: WorkoutCreate, db: Session = Depends(get_db)):
                 )
                 db.add(section_exercise)
         
+        body = refresh_snapshots(db, [db_workout.id])[db_workout.id]
         db.commit()
-        db.refresh(db_workout)
-        return db_workout
+        response_cache.invalidate("workouts")
+        return Response(content=body, media_type="application/json", status_code=201)
     except HTTPException as e:
         db.rollback()
         raise e
@@ -115,6 +168,8 @@ def update_workout(workout_id: int, workout: WorkoutCreate, db: Session = Depend
         db_workout.title = workout.title
         db_workout.description = workout.description
         db_workout.duration = workout.duration
+        estimated_duration, section_durations = estimate(workout.sections)
+        db_workout.estimated_duration = estimated_duration
         
         # Get all section IDs for this workout
         section_ids = [section.id for section in db_workout.sections]
@@ -135,11 +190,12 @@ def update_workout(workout_id: int, workout: WorkoutCreate, db: Session = Depend
         db.query(WorkoutSection).filter(WorkoutSection.work_id == workout_id).delete(synchronize_session=False)
         
         # Create new sections with exercises
-        for section in workout.sections:
+        for section, section_duration in zip(workout.sections, section_durations):
             db_section = WorkoutSection(
                 work_id=db_workout.id,
                 name=section.name,
-                position=section.position
+                position=section.position,
+                estimated_duration=section_duration
             )
             db.add(db_section)
             db.flush()  # To get section ID
@@ -167,9 +223,11 @@ def update_workout(workout_id: int, workout: WorkoutCreate, db: Session = Depend
                 )
                 db.add(section_exercise)
         
+        bump_version(db, Workout, [workout_id])
+        body = refresh_snapshots(db, [workout_id])[workout_id]
         db.commit()
-        db.refresh(db_workout)
-        return db_workout
+        response_cache.invalidate("workouts", f"workout:{workout_id}")
+        return Response(content=body, media_type="application/json")
     except HTTPException as e:
         db.rollback()
         raise e
@@ -180,31 +238,19 @@ def update_workout(workout_id: int, workout: WorkoutCreate, db: Session = Depend
 @router.delete("/{workout_id}")
 def delete_workout(workout_id: int, db: Session = Depends(get_db)):
     try:
-        db_workout = db.query(Workout).filter(Workout.id == workout_id).first()
-        if not db_workout:
+        if db.query(Workout.id).filter(Workout.id == workout_id).first() is None:
             raise HTTPException(status_code=404, detail="Workout not found")
         
-        # The cascade delete should handle the removal of related sections
-        # which should in turn delete section_exercises relationships
-        # But let's handle workout exercises manually to be safe
-        
-        # Get all section IDs for this workout
-        section_ids = [section.id for section in db_workout.sections]
-        
-        # Get all workout_exercise IDs associated with these sections
-        workout_exercise_ids = db.query(SectionExercise.work_exercise_id).filter(
-            SectionExercise.section_id.in_(section_ids)
-        ).all() if section_ids else []
-        workout_exercise_ids = [id[0] for id in workout_exercise_ids]
-        
-        # Delete workout exercises if any found
-        if workout_exercise_ids:
-            db.query(WorkoutExercise).filter(WorkoutExercise.id.in_(workout_exercise_ids)).delete(synchronize_session=False)
-        
-        # Now delete workout (this will cascade delete sections and section_exercises)
-        db.delete(db_workout)
+        # Sections, their exercise links and the snapshot go through ON DELETE CASCADE;
+        # plans referencing this workout get work_id set to NULL (ON DELETE SET NULL)
+        deletion = delete_workouts(db, [workout_id])
+        deletion.apply(db)
         db.commit()
+        deletion.finish("workouts", f"workout:{workout_id}")
         return {"message": "Workout deleted successfully"}
+    except HTTPException as e:
+        db.rollback()
+        raise e
     except Exception as e:
         db.rollback()
-        raise HTTPException(status_code=500, detail=f"Failed to delete workout: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to delete workout: {str(e)}")
@@ -0,0 +1,358 @@
+"""Test obciążeniowy HTTP: współbieżni klienci na uruchomionym serwerze API.
+
+Uruchamiane z katalogu `api`:
+
+    python -m benchmarks.load [--scale small|medium|large] [--concurrency 8] [--requests 200]
+                              [--database-url URL] [--url http://host:port] [--output wynik.json]
+
+Bez `--url` benchmark zakłada bazę (domyślnie plik SQLite w katalogu
+tymczasowym; `--database-url` wskazuje inną, pustą bazę), tworzy schemat
+migracjami, ładuje dane z `utils/synthetic.py` w wybranej skali i uruchamia
+uvicorn w tle na wolnym porcie. Z `--url` mierzy już działający serwer
+(dane muszą w nim już być).
+
+Scenariusze są wykonywane po kolei, każdy przez `--concurrency` wątków
+z własnym połączeniem keep-alive: odczyt drzewa treningu, odczyt planu,
+lista ćwiczeń (losowe strony po kursorach), tworzenie i edycja treningów
+oraz tworzenie, edycja i usuwanie adnotacji. Wynik (JSON) zawiera
+p50/p95/p99, średnią, maksimum, liczbę błędów i przepustowość dla każdego
+scenariusza.
+"""
+import argparse
+import datetime
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from utils import synthetic
+
+# Scenariusz: (metoda, ścieżka, ciało) dla danego losowania; ciało None = bez treści
+Request = Tuple[str, str, Optional[dict]]
+
+
+class Client:
+    """Połączenie keep-alive jednego wątku."""
+
+    def __init__(self, base_url: str):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        self.headers = None  # nagłówki ostatniej odpowiedzi
+
+    def request(self, method: str, path: str, body: Optional[dict] = None) -> Tuple[int, bytes]:
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        try:
+            self.connection.request(method, path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+        except (http.client.HTTPException, OSError):
+            # Serwer zamknął połączenie - jedno ponowienie na nowym
+            self.connection.close()
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self.connection.request(method, path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+        self.headers = response.headers
+        return response.status, response.read()
+
+    def close(self):
+        self.connection.close()
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentyl metodą najbliższej rangi."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-fraction * len(sorted_values) // 1)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_scenario(base_url: str, build: Callable[[random.Random, int], Request], requests: int,
+                 concurrency: int, seed: int, collect: Optional[list] = None) -> dict:
+    """Wykonuje `requests` żądań z `concurrency` wątków; zwraca statystyki czasu (ms)."""
+    latencies: List[float] = []
+    errors = []
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker(index: int):
+        rng = random.Random(seed * 1000 + index)
+        client = Client(base_url)
+        local, local_errors = [], []
+        try:
+            while True:
+                with lock:
+                    number = next(counter, None)
+                if number is None:
+                    break
+                method, path, body = build(rng, number)
+                start = time.perf_counter()
+                status, content = client.request(method, path, body)
+                local.append((time.perf_counter() - start) * 1000)
+                if status >= 400:
+                    local_errors.append(f"{method} {path} -> {status}")
+                elif collect is not None and content:
+                    collect.append(json.loads(content))
+        finally:
+            client.close()
+            with lock:
+                latencies.extend(local)
+                errors.extend(local_errors)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+    }
+
+
+def _ids(client: Client, path: str) -> List[int]:
+    status, content = client.request("GET", f"{path}?fields=id&limit=500")
+    if status != 200:
+        raise RuntimeError(f"GET {path} -> {status}")
+    return [item["id"] for item in json.loads(content)]
+
+
+def _cursors(client: Client, path: str, limit: int, pages: int) -> List[Optional[str]]:
+    """Kursory kolejnych stron listy (None = pierwsza strona) - lista stronicuje tylko po `X-Next-Cursor`."""
+    cursors: List[Optional[str]] = [None]
+    while len(cursors) < pages:
+        cursor = cursors[-1]
+        status, _ = client.request("GET", f"{path}?fields=id&limit={limit}" + (f"&cursor={cursor}" if cursor else ""))
+        if status != 200:
+            raise RuntimeError(f"GET {path} -> {status}")
+        next_cursor = client.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        cursors.append(next_cursor)
+    return cursors
+
+
+def _workout_body(rng: random.Random, exercise_ids: List[int], number: int) -> dict:
+    return {
+        "title": f"Benchmark {number}",
+        "description": "Trening z testu obciążeniowego",
+        "duration": 60,
+        "sections": [
+            {
+                "name": f"Sekcja {position + 1}",
+                "position": position,
+                "exercises": [
+                    {
+                        "ex_id": rng.choice(exercise_ids), "sets": rng.randint(1, 5), "quantity": rng.randint(5, 15),
+                        "unit": "ILOŚĆ", "duration": None, "rest": 60, "position": ex_position,
+                    }
+                    for ex_position in range(5)
+                ],
+            }
+            for position in range(3)
+        ],
+    }
+
+
+def _annotation_body(rng: random.Random, analyser_id: int, number: int) -> dict:
+    start = datetime.time(0, rng.randint(0, 50), rng.randint(0, 59))
+    end = datetime.time(0, start.minute + 1, start.second)
+    return {
+        "analyser_id": analyser_id,
+        "time_from": start.isoformat(),
+        "time_to": end.isoformat(),
+        "title": f"Benchmark {number}",
+        "description": None,
+        "color": rng.choice(synthetic.COLORS),
+        "saved": False,
+    }
+
+
+def run(base_url: str, requests: int, concurrency: int, warmup: int, seed: int) -> Dict[str, dict]:
+    client = Client(base_url)
+    try:
+        workout_ids = _ids(client, "/api/workouts/")
+        plan_ids = _ids(client, "/api/plans/")
+        exercise_ids = _ids(client, "/api/exercises/")
+        analyser_ids = _ids(client, "/api/analysers/")
+        exercise_cursors = _cursors(client, "/api/exercises/", 50, 11)
+    finally:
+        client.close()
+    if not (workout_ids and plan_ids and exercise_ids and analyser_ids):
+        raise RuntimeError("Baza nie zawiera danych - uruchom benchmark bez --url albo załaduj dane")
+
+    created_workouts: List[dict] = []
+    created_annotations: List[dict] = []
+    results: Dict[str, dict] = {}
+
+    def scenario(name: str, build, count: int = requests, collect: Optional[list] = None, warm: bool = True):
+        if warm and warmup:
+            run_scenario(base_url, build, min(warmup, count), concurrency, seed, collect)
+        results[name] = run_scenario(base_url, build, count, concurrency, seed, collect)
+        print(f"{name:<20}{results[name]['throughput_rps']:>10.1f} req/s  p50 {results[name]['p50_ms']:>8.2f} ms"
+              f"  p95 {results[name]['p95_ms']:>8.2f} ms  p99 {results[name]['p99_ms']:>8.2f} ms"
+              f"  błędy {results[name]['errors']}")
+
+    scenario("workout_get", lambda rng, n: ("GET", f"/api/workouts/{rng.choice(workout_ids)}", None))
+    scenario("plan_get", lambda rng, n: ("GET", f"/api/plans/{rng.choice(plan_ids)}", None))
+    scenario("exercise_list", lambda rng, n: (
+        "GET", "/api/exercises/?limit=50" + (f"&cursor={cursor}" if (cursor := rng.choice(exercise_cursors)) else ""), None,
+    ))
+    scenario(
+        "workout_create", lambda rng, n: ("POST", "/api/workouts/", _workout_body(rng, exercise_ids, n)),
+        collect=created_workouts,
+    )
+    if created_workouts:
+        scenario("workout_update", lambda rng, n: (
+            "PUT", f"/api/workouts/{created_workouts[n % len(created_workouts)]['id']}",
+            _workout_body(rng, exercise_ids, n),
+        ), count=min(requests, len(created_workouts)))
+    scenario(
+        "annotation_create",
+        lambda rng, n: ("POST", f"/api/analysers/{(analyser_id := rng.choice(analyser_ids))}/annotations",
+                        _annotation_body(rng, analyser_id, n)),
+        collect=created_annotations,
+    )
+    # Edycja i usuwanie tylko adnotacji z pomiaru (rozgrzewka też je tworzy, więc każda jest usuwana raz)
+    annotations = [annotation for annotation in created_annotations if annotation.get("id")]
+    if annotations:
+        scenario("annotation_update", lambda rng, n: (
+            "PUT", f"/api/analysers/annotations/{annotations[n % len(annotations)]['id']}",
+            _annotation_body(rng, annotations[n % len(annotations)]["analyser_id"], n),
+        ), count=min(requests, len(annotations)))
+        scenario("annotation_delete", lambda rng, n: (
+            "DELETE", f"/api/analysers/annotations/{annotations[n]['id']}", None,
+        ), count=len(annotations), warm=False)
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def prepare_database(database_url: str, scale: synthetic.Scale, seed: int) -> Dict[str, int]:
+    """Podmienia silnik aplikacji, tworzy schemat i ładuje dane; zwraca liczbę wierszy per tabela."""
+    from sqlalchemy.orm import sessionmaker
+
+    import database
+    from services.snapshot import rebuild_all
+    from utils.migrate import upgrade
+
+    # Ta sama konfiguracja silnika co w aplikacji (dla SQLite: WAL, pragmy, połączenie na wątek)
+    engine = database.create_database_engine(database_url)
+    upgrade(engine)
+    with engine.begin() as conn:
+        counts = synthetic.load(conn, scale, seed)
+    # Snapshoty treningów jak w działającej bazie (inaczej pierwsze odczyty budują je w trakcie pomiaru)
+    with sessionmaker(bind=engine)() as session:
+        rebuild_all(session)
+
+    # Przed importem `main` - aplikacja i usługi pobierają silnik z modułu `database`
+    database.engine = engine
+    database.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return counts
+
+
+def start_server(no_cache: bool) -> Tuple[str, Callable[[], None]]:
+    """Uruchamia uvicorn w wątku w tle; zwraca adres i funkcję zatrzymującą."""
+    import uvicorn
+
+    import main as app_module
+    from services.cache import response_cache
+
+    if no_cache:
+        response_cache.ttl = 0
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("Serwer nie wystartował")
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    return f"http://127.0.0.1:{port}", stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(synthetic.SCALES), default="small")
+    parser.add_argument("--factor", type=float, default=1.0, help="mnożnik liczby rekordów skali")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", help="pusta baza na dane testowe (domyślnie plik SQLite w katalogu tymczasowym)")
+    parser.add_argument("--url", help="adres działającego serwera (bez ładowania danych i startu serwera)")
+    parser.add_argument("--concurrency", type=int, default=8, help="liczba współbieżnych klientów")
+    parser.add_argument("--requests", type=int, default=200, help="liczba żądań na scenariusz")
+    parser.add_argument("--warmup", type=int, default=20, help="żądania rozgrzewkowe na scenariusz (poza pomiarem)")
+    parser.add_argument("--no-cache", action="store_true", help="wyłącza cache odpowiedzi (tylko dla wbudowanego serwera)")
+    parser.add_argument("--output", help="plik na wynik JSON (domyślnie standardowe wyjście)")
+    args = parser.parse_args()
+
+    meta = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "seed": args.seed,
+    }
+    stop = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+        meta["url"] = base_url
+    else:
+        workdir = None
+        database_url = args.database_url
+        if database_url is None:
+            workdir = tempfile.mkdtemp(prefix="trainhub-load-")
+            database_url = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+        scale = synthetic.scale_by_name(args.scale, args.factor)
+        start = time.perf_counter()
+        counts = prepare_database(database_url, scale, args.seed)
+        meta.update({
+            "scale": args.scale, "factor": args.factor, "database": database_url.split("@")[-1],
+            "rows": counts, "seed_seconds": round(time.perf_counter() - start, 2), "cache": not args.no_cache,
+        })
+        print(f"Załadowano {sum(counts.values())} wierszy w {meta['seed_seconds']} s")
+        base_url, stop = start_server(args.no_cache)
+
+    try:
+        results = run(base_url, args.requests, args.concurrency, args.warmup, args.seed)
+    finally:
+        if stop is not None:
+            stop()
+
+    report = json.dumps({"meta": meta, "endpoints": results}, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
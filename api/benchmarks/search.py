@@ -0,0 +1,107 @@
+"""Czas wyszukiwania ćwiczeń (`/api/exercises/search`) przy 50 tys. ćwiczeń.
+
+Uruchamiane z katalogu `api`:
+
+    python -m benchmarks.search [--scale large] [--factor 2.5] [--seed 1]
+                                [--database-url URL] [--repeat 50]
+
+Bez `--database-url` benchmark zakłada plik SQLite w katalogu tymczasowym
+i ładuje dane z `utils/synthetic.py` (domyślnie `large` x 2.5, czyli 50 tys.
+ćwiczeń); z `--database-url` mierzy istniejącą bazę.
+
+Dla fraz o różnej selektywności mierzone są: samo `exercise_index.search`
+(punktacja + wybór strony), funkcja endpointu wywołana bezpośrednio z sesją
+(wyszukiwanie, strona z bazy, facety, schematy odpowiedzi) i pełne
+`GET /api/exercises/search` przez `TestClient`. Ten ostatni dolicza stały
+narzut przekazywania żądania między wątkami klienta testowego (kilka ms),
+którego nie ma pod serwerem ASGI, dlatego z celem `TARGET_MS` porównywane
+jest najgorsze p50 wywołania bezpośredniego.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+
+from benchmarks.training_load import timings
+from utils import synthetic
+
+TARGET_MS = 10.0
+
+# Pojedyncze słowo, prefiks, literówka, kilka słów (AND) - słowa z `synthetic.WORDS`
+QUERIES = ["przysiad", "pod", "wioslowanei", "martwy ciąg", "deska sprint skip"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(synthetic.SCALES), default="large")
+    parser.add_argument("--factor", type=float, default=2.5, help="mnożnik liczby rekordów skali")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", help="istniejąca baza z danymi (domyślnie nowy plik SQLite z danymi skali)")
+    parser.add_argument("--repeat", type=int, default=50, help="liczba pomiarów na wariant")
+    args = parser.parse_args()
+
+    import database
+    from sqlalchemy.orm import sessionmaker
+
+    if args.database_url:
+        engine = database.create_database_engine(args.database_url)
+        database.engine = engine
+        database.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    else:
+        from benchmarks.load import prepare_database
+
+        path = os.path.join(tempfile.mkdtemp(prefix="trainhub-search-"), "benchmark.db")
+        counts = prepare_database(f"sqlite:///{path}", synthetic.scale_by_name(args.scale, args.factor), args.seed)
+        print("Załadowano: " + ", ".join(f"{table} {rows:,}" for table, rows in counts.items()))
+
+    from fastapi.testclient import TestClient
+
+    import main as app_module
+    from api.exercise import search_exercises
+    from fastapi import Response
+    from services.search import exercise_index
+    from services.tag_index import tag_index
+
+    client = TestClient(app_module.app)
+    db = database.SessionLocal()
+    exercise_index.ensure_built(db)
+    tag_index.ensure_built(db)
+    popular_tag = max(tag_index.counts().items(), key=lambda item: item[1])[0]
+
+    def handler(query, tags_any=()):
+        return search_exercises(
+            Response(), q=query, tags_any=list(tags_any), tags_all=[], tags_not=[], limit=20, cursor=None, db=db
+        )
+
+    variants = {}
+    for query in QUERIES:
+        variants[f"index {query!r}"] = lambda query=query: exercise_index.search(query, limit=21)
+    for query in QUERIES:
+        variants[f"endpoint {query!r}"] = lambda query=query: handler(query)
+    variants["endpoint tag + fraza"] = lambda: handler(QUERIES[0], [popular_tag])
+    for query in QUERIES:
+        variants[f"GET {query!r}"] = lambda query=query: client.get(
+            "/api/exercises/search", params={"q": query}
+        ).raise_for_status()
+    variants["GET tag + fraza"] = lambda: client.get(
+        "/api/exercises/search", params={"q": QUERIES[0], "tags_any": [popular_tag]}
+    ).raise_for_status()
+
+    print(f"{'wariant':<32}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    handler_p50 = []
+    for name, run in variants.items():
+        samples = timings(run, args.repeat)
+        p50 = statistics.median(samples)
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        print(f"{name:<32}{p50:>10.1f}{p95:>10.1f}{samples[-1]:>10.1f}")
+        if name.startswith("endpoint"):
+            handler_p50.append(p50)
+    db.close()
+
+    worst = max(handler_p50)
+    verdict = "spełniony" if worst <= TARGET_MS else "niespełniony"
+    print(f"Cel {TARGET_MS:.0f} ms dla endpointu wyszukiwania: {verdict} (najgorsze p50 {worst:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Porównanie przepustowości list: response_model (Pydantic) vs `?fast=true`.
+
+Uruchamiane z katalogu `api`:
+
+    python -m benchmarks.serialization [--rows 500] [--requests 50]
+
+Benchmark działa na bazie SQLite w pamięci (schemat z migracji, dane
+losowe z ziarnem), z wyłączonym cache odpowiedzi, więc mierzy samo
+zapytanie + serializację.
+"""
+import argparse
+import datetime
+import random
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import database
+from utils.migrate import upgrade
+
+ENDPOINTS = ["/api/exercises/", "/api/workouts/", "/api/plans/"]
+
+
+def seed(session, rows: int, rng: random.Random):
+    from models.exercise import Exercise
+    from models.plan import DayOfWeek, Plan, WeekPlan, WorkoutPlan
+    from models.tag import Tag
+    from models.workout import ExerciseUnit, SectionExercise, Workout, WorkoutExercise, WorkoutSection
+
+    tags = [Tag(name=f"tag {i}") for i in range(20)]
+    session.add_all(tags)
+    exercises = []
+    for i in range(rows):
+        exercise = Exercise(name=f"Ćwiczenie {i}", instructions="Opis " * rng.randint(5, 40), enrichment=None)
+        exercise.tags = rng.sample(tags, 3)
+        exercises.append(exercise)
+    session.add_all(exercises)
+    session.flush()
+
+    workouts = []
+    for i in range(rows):
+        workout = Workout(title=f"Trening {i}", description="Opis treningu", duration=60, created_at=datetime.date.today())
+        session.add(workout)
+        workouts.append(workout)
+        for s in range(3):
+            section = WorkoutSection(workout=workout, name=f"Sekcja {s}", position=s)
+            session.add(section)
+            for position in range(5):
+                workout_exercise = WorkoutExercise(
+                    ex_id=rng.choice(exercises).id, sets=rng.randint(1, 5), rest=rng.choice([30, 60, 90]),
+                    position=position, **rng.choice([
+                        {"unit": ExerciseUnit.QUANTITY, "quantity": rng.randint(5, 15), "duration": None},
+                        {"unit": ExerciseUnit.TIME, "quantity": None, "duration": rng.randint(20, 60)},
+                    ]),
+                )
+                session.add(SectionExercise(section=section, workout_exercise=workout_exercise, position=position))
+    session.flush()
+
+    days = list(DayOfWeek)
+    for i in range(rows):
+        plan = Plan(name=f"Plan {i}", event_date=datetime.date.today())
+        session.add(plan)
+        for w in range(4):
+            week = WeekPlan(plan=plan, position=w)
+            session.add(week)
+            for day in rng.sample(days, 3):
+                session.add(WorkoutPlan(
+                    plan=plan, week=week, day_of_week=day, completed=False, work_id=rng.choice(workouts).id
+                ))
+    session.commit()
+
+
+def measure(client: TestClient, url: str, requests: int) -> float:
+    client.get(url)  # rozgrzewka
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(url)
+        response.raise_for_status()
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500, help="liczba rekordów każdego typu (i rozmiar strony)")
+    parser.add_argument("--requests", type=int, default=50, help="liczba żądań na wariant")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    upgrade(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with session_factory() as session:
+        seed(session, args.rows, random.Random(args.seed))
+
+    database.engine = engine
+    database.SessionLocal = session_factory
+    import main as app_module
+    from services.cache import response_cache
+
+    response_cache.ttl = 0
+
+    def get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app_module.app.dependency_overrides[database.get_db] = get_db
+    client = TestClient(app_module.app)
+
+    limit = min(args.rows, 500)
+    print(f"{'endpoint':<20}{'pydantic req/s':>16}{'fast req/s':>12}{'speedup':>10}")
+    for endpoint in ENDPOINTS:
+        slow = measure(client, f"{endpoint}?limit={limit}", args.requests)
+        fast = measure(client, f"{endpoint}?limit={limit}&fast=true", args.requests)
+        print(f"{endpoint:<20}{slow:>16.1f}{fast:>12.1f}{fast / slow:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
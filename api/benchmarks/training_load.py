@@ -0,0 +1,92 @@
+"""Czas liczenia obciążenia treningowego (`/api/plans/load`) na dużym zbiorze.
+
+Uruchamiane z katalogu `api`:
+
+    python -m benchmarks.training_load [--scale large] [--factor 1] [--seed 1]
+                                       [--database-url URL] [--repeat 10]
+
+Bez `--database-url` benchmark zakłada plik SQLite w katalogu tymczasowym
+i ładuje dane z `utils/synthetic.py` w wybranej skali; z `--database-url`
+mierzy istniejącą bazę (np. załadowaną przez `utils.bulk_load`).
+
+Mierzone są `training_load` dla całego sezonu (bez i z rozbiciem na tagi),
+dla jednego planu oraz sezonowe `GET /api/plans/load` z wyłączonym cache
+odpowiedzi (zapytanie + serializacja). Wynik: p50/p95/maksimum w ms
+i porównanie p50 sezonu bez tagów z celem `TARGET_MS`.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, List
+
+from utils import synthetic
+
+TARGET_MS = 100.0
+
+
+def timings(run: Callable[[], object], repeat: int) -> List[float]:
+    run()  # rozgrzewka (indeks tagów, cache stron bazy)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(synthetic.SCALES), default="large")
+    parser.add_argument("--factor", type=float, default=1.0, help="mnożnik liczby rekordów skali")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", help="istniejąca baza z danymi (domyślnie nowy plik SQLite z danymi skali)")
+    parser.add_argument("--repeat", type=int, default=10, help="liczba pomiarów na wariant")
+    args = parser.parse_args()
+
+    import database
+    from sqlalchemy.orm import sessionmaker
+
+    if args.database_url:
+        engine = database.create_database_engine(args.database_url)
+        database.engine = engine
+        database.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    else:
+        from benchmarks.load import prepare_database
+
+        path = os.path.join(tempfile.mkdtemp(prefix="trainhub-load-"), "benchmark.db")
+        counts = prepare_database(f"sqlite:///{path}", synthetic.scale_by_name(args.scale, args.factor), args.seed)
+        print("Załadowano: " + ", ".join(f"{table} {rows:,}" for table, rows in counts.items()))
+
+    from fastapi.testclient import TestClient
+
+    import main as app_module
+    from models.plan import Plan
+    from services.analytics import training_load
+    from services.cache import response_cache
+
+    response_cache.ttl = 0
+    client = TestClient(app_module.app)
+    with database.SessionLocal() as db:
+        plan_id = db.query(Plan.id).order_by(Plan.id).limit(1).scalar()
+        variants = {
+            "sezon": lambda: training_load(db),
+            "sezon z tagami": lambda: training_load(db, tags=True),
+            "jeden plan z tagami": lambda: training_load(db, [plan_id], tags=True),
+            "GET /api/plans/load": lambda: client.get("/api/plans/load").raise_for_status(),
+        }
+        print(f"{'wariant':<24}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+        results = {}
+        for name, run in variants.items():
+            samples = results[name] = timings(run, args.repeat)
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+            print(f"{name:<24}{statistics.median(samples):>10.1f}{p95:>10.1f}{samples[-1]:>10.1f}")
+
+    season = statistics.median(results["sezon"])
+    verdict = "spełniony" if season <= TARGET_MS else "niespełniony"
+    print(f"Cel {TARGET_MS:.0f} ms dla sezonu bez tagów: {verdict} (p50 {season:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,113 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
+"""Silnik i sesje bazy danych.
+
+Adres bazy pochodzi ze zmiennej `DATABASE_URL` (domyślnie lokalny MySQL).
+Wbudowany SQLite (np. `DATABASE_URL=sqlite:///trainhub.db`) jest
+pełnoprawnym backendem dla pojedynczej maszyny bez serwera bazy:
+- WAL - odczyty nie czekają na zapis, zapisy są serializowane,
+- `synchronous=NORMAL` (w trybie WAL bezpieczne przy awarii procesu),
+  `mmap_size` i `cache_size` (`SQLITE_MMAP_SIZE`, `SQLITE_CACHE_KB`),
+- `foreign_keys=ON` - kaskady `ON DELETE` działają jak na MySQL,
+- własne połączenie dla każdego wątku obsługującego żądanie: pula
+  `SQLITE_POOL_SIZE` połączeń (domyślnie 40, jak pula wątków AnyIO);
+  połączenia nie są współdzielone między wątkami, bo sesja żądania bywa
+  otwierana w jednym wątku puli, a zamykana w innym,
+- odczyty idą w trybie autocommit, a transakcję otwiera dopiero pierwszy
+  zapis (albo SAVEPOINT) jako `BEGIN IMMEDIATE`: blokada zapisu jest brana
+  od razu i czeka `SQLITE_BUSY_TIMEOUT` sekund, zamiast kończyć się
+  natychmiastowym "database is locked" przy próbie podniesienia blokady
+  transakcji, która najpierw czytała nieaktualny już snapshot WAL;
+  SAVEPOINT (atomowy `/api/batch`) działa, bo transakcją zarządza
+  SQLAlchemy, a nie moduł sqlite3.
+Enumy (nazwy) i kolumny `Time` (tekst `HH:MM:SS`) SQLAlchemy zapisuje na
+obu silnikach tak samo, a migracje używają tylko przenośnego DDL - schemat
+tworzy `python -m utils.migrate upgrade` z ustawionym `DATABASE_URL`.
+"""
+import os
+import re
+from contextvars import ContextVar
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from models.base import Base
+
+SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL", "mysql+pymysql://root@localhost/trainhub")
+
+SQLITE_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", "40"))
+SQLITE_BUSY_TIMEOUT = float(os.environ.get("SQLITE_BUSY_TIMEOUT", "30"))
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "temp_store": "MEMORY",
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Ujemna wartość to rozmiar w KiB (na połączenie)
+    "cache_size": -int(os.environ.get("SQLITE_CACHE_KB", str(64 * 1024))),
+}
+# Instrukcje, które nie otwierają transakcji (pozostałe, także DDL i SAVEPOINT, otwierają)
+SQLITE_READS = ("SELECT", "PRAGMA", "EXPLAIN")
+_DML = re.compile(r"\b(INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+
+def _is_write(statement: str, context) -> bool:
+    """Czy instrukcja SQLite wymaga transakcji zapisu.
+
+    Skompilowane INSERT/UPDATE/DELETE rozpoznaje kontekst wykonania, także
+    z CTE (`WITH ... DELETE`); surowy SQL - pierwsze słowo, a `WITH` jest
+    zapisem, jeśli zawiera instrukcję DML.
+    """
+    if context is not None and (context.isinsert or context.isupdate or context.isdelete):
+        return True
+    head = statement.lstrip()[:7].upper()
+    if head.startswith("WITH"):
+        return _DML.search(statement) is not None
+    return not head.startswith(SQLITE_READS)
+
 
-SQLALCHEMY_DATABASE_URL = "mysql+pymysql://root@localhost/trainhub"
+def create_database_engine(url: str) -> Engine:
+    if not url.startswith("sqlite"):
+        return create_engine(url)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    engine = create_engine(
+        url,
+        # Połączenie przechodzi między wątkami razem z sesją (nigdy nie jest używane przez dwa naraz)
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT},
+        poolclass=QueuePool,
+        pool_size=SQLITE_POOL_SIZE,
+        max_overflow=10,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _configure(dbapi_connection, connection_record):
+        # Bez niejawnych BEGIN modułu sqlite3 - transakcję otwiera `_begin_on_write`
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _begin_on_write(conn, cursor, statement, parameters, context, executemany):
+        dbapi_connection = conn.connection.dbapi_connection
+        if not dbapi_connection.in_transaction and _is_write(statement, context):
+            dbapi_connection.execute("BEGIN IMMEDIATE")
+
+    return engine
+
+
+engine = create_database_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+
+# Sesja współdzielona przez podżądania /api/batch (zamyka ją endpoint batch)
+batch_session = ContextVar("batch_session", default=None)
 
 def get_db():
+    shared = batch_session.get()
+    if shared is not None:
+        yield shared
+        return
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -1,49 +1,82 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from database import engine, Base
-from api import exercise, tag, workout, plan, analyser
+from database import engine, SessionLocal
+from api import exercise, tag, workout, plan, analyser, batch
+from utils.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from utils.migrate import check_schema_version
+from services.annotation_buffer import annotation_buffer
+from services.search import exercise_index
+from services.tag_index import tag_index
+from services.cache import CACHE_HEADER, response_cache
+from services.versioning import ETAG_HEADER
+from services import idempotency, logs, metrics, profiler
+import logging
 import os
 import shutil
 from pathlib import Path
 from fastapi.responses import JSONResponse
 
+# Logowanie konfigurujemy raz, przed czymkolwiek, co loguje
+logs.setup()
+logger = logging.getLogger(__name__)
+
 app = FastAPI()
 
+# Powtórzone POST z tym samym Idempotency-Key dostają zapisaną odpowiedź; wewnątrz
+# CORS, żeby odtworzenie dostało nagłówki CORS liczone dla bieżącego żądania
+app.add_middleware(idempotency.IdempotencyMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, ETAG_HEADER, CACHE_HEADER, profiler.PROFILE_HEADER,
+                    logs.REQUEST_ID_HEADER, idempotency.REPLAYED_HEADER],
 )
 
+# Profiler SQL (SQL_PROFILE=1) - raporty N+1 i wolnych zapytań w logu
+if profiler.enabled:
+    app.add_middleware(profiler.SqlProfilerMiddleware)
+    profiler.instrument_engine(engine)
+
+# Metryki Prometheus - middleware (obejmuje wszystkie warstwy poza RequestIdMiddleware, która jest
+# najbardziej zewnętrzna) i zdarzenia silnika
+if metrics.enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.instrument_engine(engine)
+
+# Identyfikator żądania - najbardziej zewnętrzny, żeby widziały go logi wszystkich warstw
+app.add_middleware(logs.RequestIdMiddleware)
+
 # Tworzenie katalogu dla przesłanych plików, jeśli nie istnieje
 UPLOAD_DIR = Path("../public/uploads")
 try:
     UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-    print(f"Utworzono katalog: {UPLOAD_DIR.absolute()}")
+    logger.info("Utworzono katalog: %s", UPLOAD_DIR.absolute())
 except Exception as e:
-    print(f"Błąd podczas tworzenia katalogu: {str(e)}")
+    logger.warning("Błąd podczas tworzenia katalogu: %s", e)
     # Alternatywna ścieżka, jeśli nie można utworzyć katalogu
     UPLOAD_DIR = Path("./uploads")
     UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-    print(f"Utworzono alternatywny katalog: {UPLOAD_DIR.absolute()}")
+    logger.info("Utworzono alternatywny katalog: %s", UPLOAD_DIR.absolute())
 
 # Montowanie katalogów jako statyczne
 try:
     app.mount("/static", StaticFiles(directory="../public"), name="static")
-    print("Zamontowano katalog ../public jako /static")
+    logger.info("Zamontowano katalog ../public jako /static")
 except Exception as e:
-    print(f"Błąd podczas montowania katalogu ../public: {str(e)}")
+    logger.warning("Błąd podczas montowania katalogu ../public: %s", e)
 
 # Montowanie alternatywnego katalogu uploads, jeśli używamy alternatywnej ścieżki
 if not str(UPLOAD_DIR).endswith("public/uploads"):
     try:
         app.mount("/uploads", StaticFiles(directory="./uploads"), name="uploads")
-        print("Zamontowano katalog ./uploads jako /uploads")
+        logger.info("Zamontowano katalog ./uploads jako /uploads")
     except Exception as e:
-        print(f"Błąd podczas montowania katalogu ./uploads: {str(e)}")
+        logger.warning("Błąd podczas montowania katalogu ./uploads: %s", e)
 
 # Include routers
 app.include_router(tag.router, prefix="/api/tags", tags=["tags"])
@@ -51,6 +84,7 @@ app.include_router(exercise.router, prefix="/api/exercises", tags=["exercises"])
 app.include_router(workout.router, prefix="/api/workouts", tags=["workouts"])
 app.include_router(plan.router, prefix="/api/plans", tags=["plans"])
 app.include_router(analyser.router, prefix="/api/analysers", tags=["analysers"])
+app.include_router(batch.router, prefix="/api/batch", tags=["batch"])
 
 @app.post("/api/upload")
 async def upload_file(file: UploadFile = File(...)):
@@ -71,12 +105,38 @@ async def upload_file(file: UploadFile = File(...)):
             # Jeśli używamy alternatywnej ścieżki
             return {"url": f"/uploads/{unique_filename}"}
     except Exception as e:
-        print(f"Błąd podczas przesyłania pliku: {str(e)}")
+        logger.exception("Błąd podczas przesyłania pliku")
         raise HTTPException(status_code=500, detail=f"Nie udało się przesłać pliku: {str(e)}")
 
+@app.get("/api/cache/stats")
+def cache_stats():
+    return response_cache.stats()
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    rendered = metrics.render()
+    if rendered is None:
+        raise HTTPException(status_code=503, detail="Metryki są wyłączone (brak prometheus_client albo METRICS_ENABLED=0)")
+    body, content_type = rendered
+    return Response(content=body, media_type=content_type)
+
 @app.on_event("startup")
 def startup():
-    Base.metadata.create_all(bind=engine)
+    # Schemat tworzą migracje (python -m utils.migrate upgrade) - tu tylko sprawdzamy wersję
+    check_schema_version(engine)
+
+    # Indeksy ćwiczeń budujemy raz, dalej aktualizują je endpointy
+    db = SessionLocal()
+    try:
+        exercise_index.build(db)
+        tag_index.build(db)
+    finally:
+        db.close()
+
+@app.on_event("shutdown")
+def shutdown():
+    # Zbuforowane edycje adnotacji nie mogą przepaść przy zatrzymaniu serwera
+    annotation_buffer.flush()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,151 @@
+"""Schemat bazowy - tabele w postaci sprzed wprowadzenia migracji.
+
+Definicje tabel są tu zamrożone i celowo nie importują modeli, żeby późniejsze
+zmiany w `models/` nie zmieniały historii. Tworzenie z `checkfirst` pozwala
+przejąć istniejącą bazę utworzoną wcześniej przez `create_all`.
+"""
+import datetime
+import enum
+
+from sqlalchemy import (
+    Boolean, Column, Date, Enum, ForeignKey, Integer, MetaData, String, Table, Text, Time
+)
+
+revision = 1
+description = "initial schema"
+
+metadata = MetaData()
+
+
+class DayOfWeek(str, enum.Enum):
+    MONDAY = "Monday"
+    TUESDAY = "Tuesday"
+    WEDNESDAY = "Wednesday"
+    THURSDAY = "Thursday"
+    FRIDAY = "Friday"
+    SATURDAY = "Saturday"
+    SUNDAY = "Sunday"
+
+
+class ExerciseUnit(str, enum.Enum):
+    TIME = "CZAS"
+    QUANTITY = "ILOŚĆ"
+
+
+Table(
+    "exercises", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(255), nullable=False),
+    Column("instructions", Text, nullable=True),
+    Column("enrichment", Text, nullable=True),
+    Column("videoUrl", String(255), nullable=True),
+    Column("crop_id", Integer, nullable=True),
+)
+
+Table(
+    "tags", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(255), nullable=False),
+)
+
+Table(
+    "exercise_tags", metadata,
+    Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    Column("ex_id", Integer, ForeignKey("exercises.id"), primary_key=True),
+)
+
+Table(
+    "workouts", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String(255), nullable=False),
+    Column("description", Text, nullable=True),
+    Column("created_at", Date, nullable=False, default=datetime.date.today),
+    Column("duration", Integer, nullable=True),
+)
+
+Table(
+    "workout_section", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("work_id", Integer, ForeignKey("workouts.id", ondelete="CASCADE"), nullable=False),
+    Column("name", String(255), nullable=False),
+    Column("position", Integer, nullable=False),
+)
+
+Table(
+    "workout_exercise", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("ex_id", Integer, ForeignKey("exercises.id", ondelete="CASCADE"), nullable=False),
+    Column("sets", Integer, nullable=False),
+    Column("quantity", Integer, nullable=True),
+    Column("unit", Enum(ExerciseUnit), nullable=False),
+    Column("duration", Integer, nullable=True),
+    Column("rest", Integer, nullable=False),
+    Column("position", Integer, nullable=False),
+)
+
+Table(
+    "section_exercises", metadata,
+    Column("section_id", Integer, ForeignKey("workout_section.id", ondelete="CASCADE"), primary_key=True),
+    Column("work_exercise_id", Integer, ForeignKey("workout_exercise.id", ondelete="CASCADE"), primary_key=True),
+    Column("position", Integer, nullable=False),
+)
+
+Table(
+    "plan", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(255), nullable=False),
+    Column("event_date", Date, nullable=False),
+)
+
+Table(
+    "week_plan", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("plan_id", Integer, ForeignKey("plan.id", ondelete="CASCADE"), nullable=False),
+    Column("position", Integer, nullable=False),
+    Column("notes", Text, nullable=True),
+)
+
+Table(
+    "workout_plan", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("plan_id", Integer, ForeignKey("plan.id", ondelete="CASCADE"), nullable=False),
+    Column("week_id", Integer, ForeignKey("week_plan.id", ondelete="CASCADE"), nullable=False),
+    Column("name", String(255), nullable=True),
+    Column("description", Text, nullable=True),
+    Column("day_of_week", Enum(DayOfWeek), nullable=False),
+    Column("completed", Boolean, nullable=False, default=False),
+    Column("notes", Text, nullable=True),
+    Column("work_id", Integer, ForeignKey("workouts.id", ondelete="SET NULL"), nullable=True),
+)
+
+Table(
+    "analyser", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("video_url", String(255), nullable=False),
+    Column("name", String(255), nullable=False),
+)
+
+Table(
+    "annotation_analyser", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("analyser_id", Integer, ForeignKey("analyser.id"), nullable=False),
+    Column("time_from", Time, nullable=False),
+    Column("time_to", Time, nullable=True),
+    Column("title", String(255), nullable=False),
+    Column("description", String(255), nullable=True),
+    Column("color", String(50), nullable=False),
+    Column("saved", Boolean, nullable=False, default=False),
+)
+
+Table(
+    "cropped_video", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("anno_id", Integer, ForeignKey("annotation_analyser.id"), nullable=False),
+    Column("video_url", String(255), nullable=False),
+    # Model bazowy miał tu "exercises.crop_id" - bazy przejęte z tym kluczem przepina v010
+    Column("crop_id", Integer, ForeignKey("exercises.id"), nullable=False),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
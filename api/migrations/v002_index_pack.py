@@ -0,0 +1,24 @@
+"""Indeksy pod najczęstsze filtry (klucze obce) i sortowanie po pozycji."""
+from utils.migrate import create_index
+
+revision = 2
+description = "foreign key and ordering indexes"
+
+INDEXES = [
+    ("ix_week_plan_plan_position", "week_plan", ["plan_id", "position"]),
+    ("ix_workout_plan_plan_week", "workout_plan", ["plan_id", "week_id"]),
+    ("ix_workout_plan_week_day", "workout_plan", ["week_id", "day_of_week"]),
+    ("ix_workout_plan_work_id", "workout_plan", ["work_id"]),
+    ("ix_workout_section_work_position", "workout_section", ["work_id", "position"]),
+    ("ix_section_exercises_work_exercise_id", "section_exercises", ["work_exercise_id"]),
+    ("ix_workout_exercise_ex_id", "workout_exercise", ["ex_id"]),
+    ("ix_exercise_tags_ex_id", "exercise_tags", ["ex_id"]),
+    ("ix_annotation_analyser_analyser_time", "annotation_analyser", ["analyser_id", "time_from"]),
+    ("ix_cropped_video_anno_id", "cropped_video", ["anno_id"]),
+    ("ix_cropped_video_crop_id", "cropped_video", ["crop_id"]),
+]
+
+
+def upgrade(conn):
+    for name, table_name, columns in INDEXES:
+        create_index(conn, name, table_name, columns)
@@ -0,0 +1,14 @@
+"""Liczniki wersji agregatów - podstawa ETagów i warunkowych GET-ów."""
+from sqlalchemy import Column, Integer
+
+from utils.migrate import add_column
+
+revision = 3
+description = "version counters for plans, workouts, exercises and analysers"
+
+TABLES = ["plan", "workouts", "exercises", "analyser"]
+
+
+def upgrade(conn):
+    for table_name in TABLES:
+        add_column(conn, table_name, Column("version", Integer, nullable=False, server_default="1"))
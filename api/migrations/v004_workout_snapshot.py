@@ -0,0 +1,26 @@
+"""Tabela zdenormalizowanych snapshotów treningów.
+
+Snapshoty są uzupełniane leniwie przy odczycie albo hurtowo przez
+`python -m services.snapshot rebuild`.
+"""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, Table, Text
+from sqlalchemy.dialects import mysql
+
+revision = 4
+description = "workout snapshot table"
+
+metadata = MetaData()
+
+Table("workouts", metadata, Column("id", Integer, primary_key=True))
+
+Table(
+    "workout_snapshot", metadata,
+    Column("work_id", Integer, ForeignKey("workouts.id", ondelete="CASCADE"), primary_key=True),
+    Column("version", Integer, nullable=False),
+    Column("body", Text().with_variant(mysql.MEDIUMTEXT(), "mysql"), nullable=False),
+    Column("built_at", DateTime, nullable=False),
+)
+
+
+def upgrade(conn):
+    metadata.tables["workout_snapshot"].create(conn, checkfirst=True)
@@ -0,0 +1,16 @@
+"""Szacowany czas treningu i sekcji (sekundy) z indeksem pod filtr zakresu.
+
+Istniejące treningi dostają wartości po `python -m services.duration recompute`.
+"""
+from sqlalchemy import Column, Integer
+
+from utils.migrate import add_column, create_index
+
+revision = 5
+description = "estimated workout and section duration"
+
+
+def upgrade(conn):
+    add_column(conn, "workouts", Column("estimated_duration", Integer, nullable=True))
+    add_column(conn, "workout_section", Column("estimated_duration", Integer, nullable=True))
+    create_index(conn, "ix_workouts_estimated_duration", "workouts", ["estimated_duration", "id"])
@@ -0,0 +1,18 @@
+"""Szablony planów i pochodzenie tygodni przy klonowaniu.
+
+`plan.is_template` oznacza plan-szablon, `week_plan.source_week_id` - tydzień,
+z którego skopiowano dany tydzień (służy do przemapowania id przy
+kopiowaniu treningów przez INSERT ... SELECT).
+"""
+from sqlalchemy import Boolean, Column, Integer
+
+from utils.migrate import add_column, create_index
+
+revision = 6
+description = "plan templates and week source ids"
+
+
+def upgrade(conn):
+    add_column(conn, "plan", Column("is_template", Boolean, nullable=False, server_default="0"))
+    add_column(conn, "week_plan", Column("source_week_id", Integer, nullable=True))
+    create_index(conn, "ix_week_plan_plan_source", "week_plan", ["plan_id", "source_week_id"])
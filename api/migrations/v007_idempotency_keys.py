@@ -0,0 +1,29 @@
+"""Tabela kluczy idempotencji (`Idempotency-Key`) z zapisanymi odpowiedziami.
+
+Wiersz powstaje, gdy żądanie z kluczem zaczyna się wykonywać (`status`
+pusty), a po zakończeniu dostaje odpowiedź do odtwarzania. Wygasłe wiersze
+są usuwane przez `services/idempotency.py`.
+"""
+from sqlalchemy import Column, DateTime, Index, Integer, LargeBinary, MetaData, String, Table, Text
+from sqlalchemy.dialects import mysql
+
+revision = 7
+description = "idempotency keys"
+
+metadata = MetaData()
+
+Table(
+    "idempotency_key", metadata,
+    Column("key", String(255), primary_key=True),
+    Column("request_hash", String(64), nullable=False),
+    Column("status", Integer, nullable=True),
+    Column("headers", Text, nullable=True),
+    Column("body", LargeBinary().with_variant(mysql.MEDIUMBLOB(), "mysql"), nullable=True),
+    Column("created_at", DateTime, nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+    Index("ix_idempotency_key_expires_at", "expires_at"),
+)
+
+
+def upgrade(conn):
+    metadata.tables["idempotency_key"].create(conn, checkfirst=True)
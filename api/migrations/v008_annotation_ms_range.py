@@ -0,0 +1,56 @@
+"""Czasy adnotacji jako milisekundy i indeks zakresowy.
+
+`start_ms`/`end_ms` powielają `time_from`/`time_to` (adnotacja bez końca
+ma `end_ms = start_ms`), żeby zapytanie o adnotacje nachodzące na okno
+osi czasu szło po indeksie `(analyser_id, start_ms, end_ms)`. Istniejące
+wiersze są uzupełniane partiami (przenośnie - bez funkcji czasu silnika).
+"""
+from sqlalchemy import Column, Integer, MetaData, Table, Time, bindparam, select, update
+
+from utils.migrate import add_column, create_index
+
+revision = 8
+description = "annotation millisecond range columns"
+
+BATCH_SIZE = 5000
+
+metadata = MetaData()
+
+annotation = Table(
+    "annotation_analyser", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("time_from", Time),
+    Column("time_to", Time),
+    Column("start_ms", Integer),
+    Column("end_ms", Integer),
+)
+
+
+def _ms(value):
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1000 + value.microsecond // 1000
+
+
+def upgrade(conn):
+    add_column(conn, "annotation_analyser", Column("start_ms", Integer, nullable=False, server_default="0"))
+    add_column(conn, "annotation_analyser", Column("end_ms", Integer, nullable=False, server_default="0"))
+
+    statement = (
+        update(annotation)
+        .where(annotation.c.id == bindparam("row_id"))
+        .values(start_ms=bindparam("start"), end_ms=bindparam("end"))
+    )
+    after = 0
+    while True:
+        rows = conn.execute(
+            select(annotation.c.id, annotation.c.time_from, annotation.c.time_to)
+            .where(annotation.c.id > after).order_by(annotation.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        conn.execute(statement, [
+            {"row_id": row.id, "start": _ms(row.time_from), "end": _ms(row.time_to or row.time_from)}
+            for row in rows
+        ])
+        after = rows[-1].id
+
+    create_index(conn, "ix_annotation_analyser_range", "annotation_analyser", ["analyser_id", "start_ms", "end_ms"])
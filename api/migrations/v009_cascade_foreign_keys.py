@@ -0,0 +1,26 @@
+"""Kaskadowe usuwanie (ON DELETE CASCADE) dla analizatorów, adnotacji i ćwiczeń.
+
+Usunięcie analizatora usuwa jego adnotacje, adnotacji - jej przycięte
+wideo, a ćwiczenia - jego tagi i przycięte wideo, po stronie bazy. Dzięki
+temu `services/deletion.py` usuwa całe agregaty kilkoma zbiorczymi
+DELETE-ami zamiast ładować i usuwać wiersze po kolei.
+
+Cel każdego klucza jest podany jawnie: w bazie przejętej z modelu bazowego
+`cropped_video.crop_id` wskazuje `exercises.crop_id`, a kaskada musi iść
+po `exercises.id`.
+"""
+from utils.migrate import set_foreign_keys
+
+revision = 9
+description = "cascading foreign keys for analysers, annotations and exercises"
+
+FOREIGN_KEYS = [
+    ("exercise_tags", {"tag_id": ("tags.id", "CASCADE"), "ex_id": ("exercises.id", "CASCADE")}),
+    ("annotation_analyser", {"analyser_id": ("analyser.id", "CASCADE")}),
+    ("cropped_video", {"anno_id": ("annotation_analyser.id", "CASCADE"), "crop_id": ("exercises.id", "CASCADE")}),
+]
+
+
+def upgrade(conn):
+    for table_name, references in FOREIGN_KEYS:
+        set_foreign_keys(conn, table_name, references)
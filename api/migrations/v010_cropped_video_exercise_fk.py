@@ -0,0 +1,17 @@
+"""Klucz obcy `cropped_video.crop_id` wskazuje `exercises.id`.
+
+Model bazowy deklarował `ForeignKey("exercises.crop_id")`, choć `crop_id`
+przyciętego wideo to id ćwiczenia. v001 tworzy nowe bazy już z poprawnym
+kluczem, ale baza przejęta z `create_all` (checkfirst) zachowała stary -
+ta migracja go przepina, zachowując akcję ON DELETE (bazy migrowane
+wcześniejszą wersją v009, która zachowywała stary cel). Przycięte wideo
+wskazujące nieistniejące ćwiczenie jest usuwane.
+"""
+from utils.migrate import set_foreign_keys
+
+revision = 10
+description = "cropped_video.crop_id references exercises.id"
+
+
+def upgrade(conn):
+    set_foreign_keys(conn, "cropped_video", {"crop_id": ("exercises.id", None)})
@@ -0,0 +1,15 @@
+"""Dzierżawa zajęcia klucza idempotencji (`lease_until`), niezależna od czasu życia odpowiedzi.
+
+Klucze zajęte przed migracją nie mają dzierżawy i mogą zostać przejęte
+przez kolejne ponowienie.
+"""
+from sqlalchemy import Column, DateTime
+
+from utils.migrate import add_column
+
+revision = 11
+description = "idempotency key claim lease"
+
+
+def upgrade(conn):
+    add_column(conn, "idempotency_key", Column("lease_until", DateTime, nullable=True))
@@ -0,0 +1,19 @@
+"""AUTOINCREMENT dla kluczy głównych w SQLite - id usuniętych wierszy nie wracają.
+
+Bez niego SQLite nadaje nowemu wierszowi największe wolne id, więc po
+usunięciu ostatniej adnotacji (albo analizatora, treningu...) następna
+dostaje jej id - a id są częścią ETagów (`parent_version`), tagów cache
+(`analyser:{id}`), wpisów indeksów w pamięci i odtwarzanych odpowiedzi
+idempotentnych. Na MySQL (InnoDB, AUTO_INCREMENT) migracja nic nie robi.
+"""
+from utils.migrate import set_sqlite_autoincrement
+
+revision = 12
+description = "sqlite autoincrement primary keys"
+
+TABLES = ["analyser", "annotation_analyser", "cropped_video", "exercises", "tags", "workouts", "plan", "week_plan"]
+
+
+def upgrade(conn):
+    for table_name in TABLES:
+        set_sqlite_autoincrement(conn, table_name)
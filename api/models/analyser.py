@@ -1,38 +1,67 @@
 # models/analyser.py
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Time
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Index, Time, event
 from sqlalchemy.orm import relationship
 from models.base import Base
 
 class Analyser(Base):
     __tablename__ = "analyser"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     video_url = Column(String(255), nullable=False)
     name = Column(String(255), nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
-    annotations = relationship("AnnotationAnalyser", back_populates="analyser")
+    annotations = relationship("AnnotationAnalyser", back_populates="analyser", passive_deletes=True)
 
 class AnnotationAnalyser(Base):
     __tablename__ = "annotation_analyser"
+    __table_args__ = (
+        Index("ix_annotation_analyser_analyser_time", "analyser_id", "time_from"),
+        Index("ix_annotation_analyser_range", "analyser_id", "start_ms", "end_ms"),
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    analyser_id = Column(Integer, ForeignKey("analyser.id"), nullable=False)
+    analyser_id = Column(Integer, ForeignKey("analyser.id", ondelete="CASCADE"), nullable=False)
     time_from = Column(Time, nullable=False)
     time_to = Column(Time, nullable=True)
     title = Column(String(255), nullable=False)
     description = Column(String(255), nullable=True)
     color = Column(String(50), nullable=False)
     saved = Column(Boolean, nullable=False, default=False)
+    # Kopia time_from/time_to w milisekundach do zapytań o okno osi czasu (ustawiana przy zapisie)
+    start_ms = Column(Integer, nullable=False, default=0, server_default="0")
+    end_ms = Column(Integer, nullable=False, default=0, server_default="0")
     
     analyser = relationship("Analyser", back_populates="annotations")
-    cropped_videos = relationship("CroppedVideo", back_populates="annotation")
+    cropped_videos = relationship("CroppedVideo", back_populates="annotation", passive_deletes=True)
+
+def time_ms(value) -> int:
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1000 + value.microsecond // 1000
+
+def annotation_range(time_from, time_to):
+    """(start_ms, end_ms) adnotacji; bez czasu końca to punkt."""
+    start = time_ms(time_from)
+    return start, time_ms(time_to) if time_to is not None else start
+
+@event.listens_for(AnnotationAnalyser, "before_insert")
+@event.listens_for(AnnotationAnalyser, "before_update")
+def _set_range(mapper, connection, target):
+    if target.time_from is not None:
+        target.start_ms, target.end_ms = annotation_range(target.time_from, target.time_to)
 
 class CroppedVideo(Base):
     __tablename__ = "cropped_video"
+    __table_args__ = (
+        Index("ix_cropped_video_anno_id", "anno_id"),
+        Index("ix_cropped_video_crop_id", "crop_id"),
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    anno_id = Column(Integer, ForeignKey("annotation_analyser.id"), nullable=False)
+    anno_id = Column(Integer, ForeignKey("annotation_analyser.id", ondelete="CASCADE"), nullable=False)
     video_url = Column(String(255), nullable=False)
-    crop_id = Column(Integer, ForeignKey("exercises.crop_id"), nullable=False)
+    crop_id = Column(Integer, ForeignKey("exercises.id", ondelete="CASCADE"), nullable=False)
     
     annotation = relationship("AnnotationAnalyser", back_populates="cropped_videos")
\ No newline at end of file
@@ -4,6 +4,7 @@ from models.base import Base
 
 class Exercise(Base):
     __tablename__ = "exercises"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
@@ -11,5 +12,6 @@ class Exercise(Base):
     enrichment = Column(Text, nullable=True)
     videoUrl = Column(String(255), nullable=True)
     crop_id = Column(Integer, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
-    tags = relationship("Tag", secondary="exercise_tags", back_populates="exercises")
\ No newline at end of file
+    tags = relationship("Tag", secondary="exercise_tags", back_populates="exercises", passive_deletes=True)
\ No newline at end of file
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, DateTime, Index, Integer, LargeBinary, String, Text
+from sqlalchemy.dialects import mysql
+from models.base import Base
+
+# Odpowiedź na żądanie POST z nagłówkiem Idempotency-Key (status pusty = żądanie w toku)
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_key"
+
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status = Column(Integer, nullable=True)
+    headers = Column(Text, nullable=True)
+    body = Column(LargeBinary().with_variant(mysql.MEDIUMBLOB(), "mysql"), nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    # Do kiedy żądanie w toku trzyma klucz (odnawiane w trakcie wykonania; po wygaśnięciu klucz można przejąć)
+    lease_until = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_idempotency_key_expires_at", "expires_at"),
+    )
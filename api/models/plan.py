@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Boolean, Enum as SQLAlchemyEnum
+from sqlalchemy import Column, Integer, String, Text, Date, ForeignKey, Boolean, Index, Enum as SQLAlchemyEnum
 from sqlalchemy.orm import relationship
 from models.base import Base
 import datetime
@@ -16,45 +16,62 @@ class DayOfWeek(str, enum.Enum):
 # Plan treningowy (główny)
 class Plan(Base):
     __tablename__ = "plan"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
     event_date = Column(Date, nullable=False)
+    is_template = Column(Boolean, nullable=False, default=False, server_default="0")
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     weeks = relationship(
         "WeekPlan",
         back_populates="plan",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
 
 # Tygodnie w planie treningowym
 class WeekPlan(Base):
     __tablename__ = "week_plan"
+    __table_args__ = (
+        Index("ix_week_plan_plan_position", "plan_id", "position"),
+        Index("ix_week_plan_plan_source", "plan_id", "source_week_id"),
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     plan_id = Column(Integer, ForeignKey("plan.id", ondelete="CASCADE"), nullable=False)
     position = Column(Integer, nullable=False)
-    notes = Column(String, nullable=True)
+    notes = Column(Text, nullable=True)
+    # Tydzień, z którego skopiowano ten tydzień (klonowanie planów)
+    source_week_id = Column(Integer, nullable=True)
     
     plan = relationship("Plan", back_populates="weeks")
     workouts = relationship(
         "WorkoutPlan",
         back_populates="week",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
 
 # Treningi w planie tygodniowym
 class WorkoutPlan(Base):
     __tablename__ = "workout_plan"
+    __table_args__ = (
+        Index("ix_workout_plan_plan_week", "plan_id", "week_id"),
+        Index("ix_workout_plan_week_day", "week_id", "day_of_week"),
+        Index("ix_workout_plan_work_id", "work_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     plan_id = Column(Integer, ForeignKey("plan.id", ondelete="CASCADE"), nullable=False)
     week_id = Column(Integer, ForeignKey("week_plan.id", ondelete="CASCADE"), nullable=False)
     name = Column(String(255), nullable=True)
-    description = Column(String, nullable=True)
+    description = Column(Text, nullable=True)
     day_of_week = Column(SQLAlchemyEnum(DayOfWeek), nullable=False)
     completed = Column(Boolean, nullable=False, default=False)
-    notes = Column(String, nullable=True)
+    notes = Column(Text, nullable=True)
     work_id = Column(Integer, ForeignKey("workouts.id", ondelete="SET NULL"), nullable=True)
     
     plan = relationship("Plan")
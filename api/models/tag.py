@@ -1,17 +1,21 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from models.base import Base
 
 class Tag(Base):
     __tablename__ = "tags"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
     
-    exercises = relationship("Exercise", secondary="exercise_tags", back_populates="tags")
+    exercises = relationship("Exercise", secondary="exercise_tags", back_populates="tags", passive_deletes=True)
 
 class ExerciseTag(Base):
     __tablename__ = "exercise_tags"
+    __table_args__ = (
+        Index("ix_exercise_tags_ex_id", "ex_id"),
+    )
 
-    tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True)
-    ex_id = Column(Integer, ForeignKey("exercises.id"), primary_key=True)
\ No newline at end of file
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+    ex_id = Column(Integer, ForeignKey("exercises.id", ondelete="CASCADE"), primary_key=True)
\ No newline at end of file
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Index
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import relationship
 from sqlalchemy import Enum as SQLAlchemyEnum
 from models.base import Base
@@ -13,33 +14,46 @@ class ExerciseUnit(str, Enum):
 # Workout (plan treningowy)
 class Workout(Base):
     __tablename__ = "workouts"
+    __table_args__ = (
+        Index("ix_workouts_estimated_duration", "estimated_duration", "id"),
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
     created_at = Column(Date, nullable=False, default=datetime.date.today)
     duration = Column(Integer, nullable=True)
+    # Szacunek serwera w sekundach (services/duration.py)
+    estimated_duration = Column(Integer, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     sections = relationship(
         "WorkoutSection",
         back_populates="workout",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
 
 # Sekcja w treningu
 class WorkoutSection(Base):
     __tablename__ = "workout_section"
+    __table_args__ = (
+        Index("ix_workout_section_work_position", "work_id", "position"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     work_id = Column(Integer, ForeignKey("workouts.id", ondelete="CASCADE"), nullable=False)
     name = Column(String(255), nullable=False)
     position = Column(Integer, nullable=False)
+    estimated_duration = Column(Integer, nullable=True)
     
     workout = relationship("Workout", back_populates="sections")
     section_exercises = relationship(
         "SectionExercise",
         back_populates="section",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
     exercises = relationship(
         "WorkoutExercise",
@@ -51,6 +65,9 @@ class WorkoutSection(Base):
 # Ćwiczenie w treningu
 class WorkoutExercise(Base):
     __tablename__ = "workout_exercise"
+    __table_args__ = (
+        Index("ix_workout_exercise_ex_id", "ex_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     ex_id = Column(Integer, ForeignKey("exercises.id", ondelete="CASCADE"), nullable=False)
@@ -64,7 +81,8 @@ class WorkoutExercise(Base):
     section_exercises = relationship(
         "SectionExercise",
         back_populates="workout_exercise",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
     sections = relationship(
         "WorkoutSection",
@@ -72,10 +90,23 @@ class WorkoutExercise(Base):
         back_populates="exercises",
         overlaps="section_exercises,section"
     )
+    exercise = relationship("Exercise", viewonly=True)
+    
+    # Pola pomocnicze do wyświetlania (nazwa i wideo z biblioteki ćwiczeń)
+    @property
+    def name(self):
+        return self.exercise.name if self.exercise else None
+    
+    @property
+    def videoUrl(self):
+        return self.exercise.videoUrl if self.exercise else None
 
 # Powiązanie sekcji i ćwiczenia (wiele-do-wielu z dodatkowymi danymi)
 class SectionExercise(Base):
     __tablename__ = "section_exercises"
+    __table_args__ = (
+        Index("ix_section_exercises_work_exercise_id", "work_exercise_id"),
+    )
 
     section_id = Column(Integer, ForeignKey("workout_section.id", ondelete="CASCADE"), primary_key=True)
     work_exercise_id = Column(Integer, ForeignKey("workout_exercise.id", ondelete="CASCADE"), primary_key=True)
@@ -90,4 +121,13 @@ class SectionExercise(Base):
         "WorkoutExercise",
         back_populates="section_exercises",
         overlaps="sections,exercises"
-    )
\ No newline at end of file
+    )
+
+# Zdenormalizowany JSON treningu (kształt WorkoutResponse) odczytywany jednym zapytaniem po kluczu
+class WorkoutSnapshot(Base):
+    __tablename__ = "workout_snapshot"
+
+    work_id = Column(Integer, ForeignKey("workouts.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, nullable=False)
+    body = Column(Text().with_variant(mysql.MEDIUMTEXT(), "mysql"), nullable=False)
+    built_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
@@ -1,6 +1,6 @@
 # schemas/analyser.py
 from pydantic import BaseModel, validator
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import time
 
 # Analyser Schemas
@@ -66,11 +66,32 @@ class CroppedVideoResponse(CroppedVideoBase):
 
 class AnnotationResponse(AnnotationBase):
     id: int
+    start_ms: Optional[int] = None
+    end_ms: Optional[int] = None
     cropped_videos: List[CroppedVideoResponse] = []
     
     class Config:
         from_attributes = True
 
+# Zbiorczy zapis adnotacji osi czasu
+class AnnotationBulkCreate(AnnotationBase):
+    analyser_id: Optional[int] = None
+    ref: Optional[str] = None  # identyfikator klienta, pod którym wraca nadane id
+
+class AnnotationBulkUpdate(AnnotationBase):
+    analyser_id: Optional[int] = None
+    id: int
+
+class AnnotationBulk(BaseModel):
+    create: List[AnnotationBulkCreate] = []
+    update: List[AnnotationBulkUpdate] = []
+    delete: List[int] = []
+
+class AnnotationBulkResult(BaseModel):
+    created: Dict[str, int] = {}  # ref (albo pozycja na liście create) -> id
+    annotations: List[AnnotationResponse] = []
+    deleted: List[int] = []
+
 class AnalyserResponse(AnalyserBase):
     id: int
     annotations: List[AnnotationResponse] = []
@@ -0,0 +1,33 @@
+# schemas/batch.py
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+import enum
+
+class BatchMethod(str, enum.Enum):
+    GET = "GET"
+    POST = "POST"
+    PUT = "PUT"
+    PATCH = "PATCH"
+    DELETE = "DELETE"
+
+class BatchOperation(BaseModel):
+    # Nazwa wyniku, do którego późniejsze operacje odwołują się przez ${nazwa.pole}
+    id: Optional[str] = None
+    method: BatchMethod = BatchMethod.GET
+    path: str
+    body: Optional[Any] = None
+    headers: Dict[str, str] = {}
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+    atomic: bool = False
+
+class BatchResult(BaseModel):
+    id: Optional[str] = None
+    status: int
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = None
+
+class BatchResponse(BaseModel):
+    committed: bool
+    results: List[BatchResult] = []
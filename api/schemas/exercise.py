@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional, List
-from schemas.tag import TagResponse
+from schemas.tag import TagResponse, TagCount
 
 class ExerciseBase(BaseModel):
     name: str
@@ -20,4 +20,13 @@ class ExerciseResponse(ExerciseBase):
     tags: List[TagResponse] = []
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Wyszukiwanie
+class ExerciseSearchHit(ExerciseResponse):
+    score: float
+
+class ExerciseSearchResponse(BaseModel):
+    total: int
+    items: List[ExerciseSearchHit]
+    facets: List[TagCount]
\ No newline at end of file
@@ -43,6 +43,29 @@ class WorkoutPlanResponse(WorkoutPlanBase):
     class Config:
         from_attributes = True
 
+# Operacje zbiorcze na treningach w planie (zaznaczenie wielu treningów)
+class BulkAction(str, enum.Enum):
+    MOVE = "move"
+    COMPLETE = "complete"
+    UNCOMPLETE = "uncomplete"
+    SET_DAY = "set_day"
+    ATTACH = "attach"
+    DELETE = "delete"
+
+class WorkoutPlanBulkOperation(BaseModel):
+    action: BulkAction
+    workout_ids: List[int]
+    week_id: Optional[int] = None              # move
+    day_of_week: Optional[DayOfWeek] = None    # set_day, opcjonalnie move
+    work_id: Optional[int] = None              # attach (None odpina trening)
+
+class WorkoutPlanBulk(BaseModel):
+    operations: List[WorkoutPlanBulkOperation]
+
+class WorkoutPlanBulkResult(BaseModel):
+    workouts: List[WorkoutPlanResponse] = []
+    deleted: List[int] = []
+
 # Schematy dla WeekPlan
 class WeekPlanBase(BaseModel):
     position: int
@@ -69,7 +92,7 @@ class PlanBase(BaseModel):
     event_date: datetime.date
 
 class PlanCreate(PlanBase):
-    pass
+    is_template: bool = False
 
 class PlanUpdate(BaseModel):
     name: Optional[str] = None
@@ -77,7 +100,42 @@ class PlanUpdate(BaseModel):
 
 class PlanResponse(PlanBase):
     id: int
+    is_template: bool = False
     weeks: List[WeekPlanResponse] = []
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class PlanClone(BaseModel):
+    event_date: datetime.date
+    name: Optional[str] = None
+    is_template: bool = False
+
+# Obciążenie treningowe (analityka)
+class LoadTotals(BaseModel):
+    sets: int = 0
+    reps: int = 0
+    work_seconds: int = 0
+    rest_seconds: int = 0
+    exercises: int = 0
+
+# Rozbicie tygodnia na tagi kolumnowo: i-ty element każdej listy dotyczy i-tego tagu
+class TagLoadColumns(BaseModel):
+    tag_id: List[int] = []
+    name: List[str] = []
+    sets: List[int] = []
+    reps: List[int] = []
+    work_seconds: List[int] = []
+    rest_seconds: List[int] = []
+    exercises: List[int] = []
+
+class WeekLoad(LoadTotals):
+    week_id: int
+    position: int
+    workouts: int = 0
+    tags: Optional[TagLoadColumns] = None  # tylko z ?tags=true
+
+class PlanLoad(LoadTotals):
+    plan_id: int
+    name: str
+    weeks: List[WeekLoad] = []
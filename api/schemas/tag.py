@@ -7,4 +7,9 @@ class TagResponse(TagBase):
     id: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TagCount(BaseModel):
+    tag_id: int
+    name: str
+    count: int
\ No newline at end of file
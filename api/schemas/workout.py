@@ -21,6 +21,8 @@ class WorkoutExerciseCreate(WorkoutExerciseBase):
 
 class WorkoutExerciseResponse(WorkoutExerciseBase):
     id: int
+    name: Optional[str] = None
+    videoUrl: Optional[str] = None
     
     class Config:
         from_attributes = True
@@ -35,6 +37,7 @@ class WorkoutSectionCreate(WorkoutSectionBase):
 class WorkoutSectionResponse(WorkoutSectionBase):
     id: int
     work_id: int
+    estimated_duration: Optional[int] = None
     exercises: List[WorkoutExerciseResponse] = []
     
     class Config:
@@ -51,6 +54,7 @@ class WorkoutCreate(WorkoutBase):
 class WorkoutResponse(WorkoutBase):
     id: int
     created_at: datetime.date
+    estimated_duration: Optional[int] = None
     sections: List[WorkoutSectionResponse]
     
     class Config:
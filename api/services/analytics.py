@@ -0,0 +1,278 @@
+"""Analityka obciążenia treningowego planów (tydzień po tygodniu).
+
+Sumy tygodni liczy baza jednym zapytaniem: ćwiczenia są sumowane raz na
+trening (GROUP BY work_id po Workout -> WorkoutSection -> SectionExercise
+-> WorkoutExercise, tylko treningi użyte w planach), a te sumy są
+doklejane do harmonogramu (Plan -> WeekPlan -> WorkoutPlan) i sumowane
+per tydzień. Do Pythona trafia jeden wiersz na tydzień; sumy planów to
+sumy ich tygodni.
+
+Rozbicie tygodni na tagi jest opcjonalne (`tags=True`), bo wymaga
+pojedynczych wierszy ćwiczeń (tagi bierzemy z `tag_index`): ćwiczenia są
+sumowane raz na parę (trening, tag), a pary rozwijane po harmonogramie -
+operacjami NumPy (`bincount`, `unique`, `repeat`). Wynik jest kolumnowy
+(`{"tag_id": [...], "name": [...], "sets": [...], ...}` na tydzień), bez
+słownika na każdą parę (tydzień, tag).
+
+Pomiar (`python -m benchmarks.training_load`, SQLite, skala `large`:
+1000 planów, 4000 tygodni, 105 tys. ćwiczeń treningów, p50): cały sezon
+ok. 170 ms bez tagów i ok. 0,8 s z tagami, jeden plan z tagami ok. 8 ms.
+Koszt sezonu to przejście bazy po wszystkich ćwiczeniach użytych
+treningów - celu 100 ms dla całego sezonu na zimno to nie spełnia;
+powtórne odczyty obsługuje cache odpowiedzi.
+
+Miary na wiersz ćwiczenia:
+- `sets` - liczba serii,
+- `reps` - serie x `quantity` dla jednostki ILOŚĆ,
+- `work_seconds` - serie x `duration` dla jednostki CZAS,
+- `rest_seconds` - serie x `rest`,
+- `exercises` - liczba ćwiczeń.
+Ćwiczenie z kilkoma tagami wlicza się do każdego z nich.
+"""
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from models.plan import Plan, WeekPlan, WorkoutPlan
+from models.tag import Tag
+from models.workout import ExerciseUnit, SectionExercise, WorkoutExercise, WorkoutSection
+from services.tag_index import tag_index
+
+METRICS = ("sets", "reps", "work_seconds", "rest_seconds", "exercises")
+
+# Kolumny tablic z zapytań
+WORK, EX, SETS, QUANTITY, DURATION, REST, IS_QUANTITY = range(7)
+S_WEEK, S_WORK = range(2)
+
+
+def _int_rows(db: Session, statement, width: int) -> np.ndarray:
+    # Same liczby całkowite - wiersze prosto z kursora DB-API, bez budowania
+    # obiektów Row; fromiter po spłaszczonych krotkach, bo np.array(rows)
+    # sprawdza każdy wiersz jako sekwencję
+    result = db.connection().execute(statement)
+    rows = result.cursor.fetchall()
+    result.close()
+    flat = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=len(rows) * width)
+    return flat.reshape(len(rows), width)
+
+
+def _plans(plan_ids: Optional[List[int]]):
+    # Sezon (bez `plan_ids`) to plany właściwe, bez szablonów
+    if plan_ids is None:
+        return select(Plan.id).where(Plan.is_template.is_(False))
+    return select(Plan.id).where(Plan.id.in_(plan_ids))
+
+
+def _workout_sums(plans):
+    """Sumy miar per trening dla treningów użytych w planach (jeden wiersz na trening)."""
+    used_workouts = select(WorkoutPlan.work_id).where(WorkoutPlan.plan_id.in_(plans))
+    is_quantity = WorkoutExercise.unit == ExerciseUnit.QUANTITY
+    sets = WorkoutExercise.sets
+    return (
+        select(
+            WorkoutSection.work_id,
+            func.sum(sets).label("sets"),
+            func.sum(case((is_quantity, sets * func.coalesce(WorkoutExercise.quantity, 0)), else_=0)).label("reps"),
+            func.sum(case((is_quantity, 0), else_=sets * func.coalesce(WorkoutExercise.duration, 0))).label("work_seconds"),
+            func.sum(sets * WorkoutExercise.rest).label("rest_seconds"),
+            func.count().label("exercises"),
+        )
+        .join(SectionExercise, SectionExercise.section_id == WorkoutSection.id)
+        .join(WorkoutExercise, WorkoutExercise.id == SectionExercise.work_exercise_id)
+        .where(WorkoutSection.work_id.in_(used_workouts))
+        .group_by(WorkoutSection.work_id)
+        .subquery()
+    )
+
+
+def _week_totals(plans):
+    """Plan, tydzień (NULL dla planu bez tygodni), liczba treningów i sumy miar - wiersz na tydzień."""
+    sums = _workout_sums(plans)
+    return (
+        select(
+            Plan.id, Plan.name, WeekPlan.id, WeekPlan.position, func.count(WorkoutPlan.id),
+            *[func.coalesce(func.sum(sums.c[metric]), 0) for metric in METRICS],
+        )
+        .select_from(Plan)
+        .outerjoin(WeekPlan, WeekPlan.plan_id == Plan.id)
+        .outerjoin(WorkoutPlan, WorkoutPlan.week_id == WeekPlan.id)
+        .outerjoin(sums, sums.c.work_id == WorkoutPlan.work_id)
+        .where(Plan.id.in_(plans))
+        .group_by(Plan.id, Plan.name, WeekPlan.id, WeekPlan.position)
+        .order_by(Plan.id, WeekPlan.position, WeekPlan.id)
+    )
+
+
+def _schedule(plans):
+    return (
+        select(WorkoutPlan.week_id, WorkoutPlan.work_id)
+        .where(WorkoutPlan.work_id.is_not(None), WorkoutPlan.plan_id.in_(plans))
+    )
+
+
+def _exercises(plans):
+    used_workouts = _schedule(plans).with_only_columns(WorkoutPlan.work_id).distinct()
+    return (
+        select(
+            WorkoutSection.work_id,
+            WorkoutExercise.ex_id,
+            WorkoutExercise.sets,
+            func.coalesce(WorkoutExercise.quantity, 0),
+            func.coalesce(WorkoutExercise.duration, 0),
+            WorkoutExercise.rest,
+            case((WorkoutExercise.unit == ExerciseUnit.QUANTITY, 1), else_=0),
+        )
+        .join(SectionExercise, SectionExercise.section_id == WorkoutSection.id)
+        .join(WorkoutExercise, WorkoutExercise.id == SectionExercise.work_exercise_id)
+        .where(WorkoutSection.work_id.in_(used_workouts))
+    )
+
+
+def _metrics(data: np.ndarray) -> np.ndarray:
+    """Macierz (wiersze x METRICS) z surowych kolumn ćwiczeń."""
+    sets = data[:, SETS]
+    is_quantity = data[:, IS_QUANTITY].astype(bool)
+    return np.column_stack((
+        sets,
+        np.where(is_quantity, sets * data[:, QUANTITY], 0),
+        np.where(is_quantity, 0, sets * data[:, DURATION]),
+        sets * data[:, REST],
+        np.ones_like(sets),
+    ))
+
+
+def _grouped_sums(groups: np.ndarray, size: int, metrics: np.ndarray) -> np.ndarray:
+    """Sumy kolumn `metrics` dla grup 0..size-1 (grupy x METRICS)."""
+    return np.column_stack([
+        np.bincount(groups, weights=metrics[:, i], minlength=size) for i in range(len(METRICS))
+    ]).astype(np.int64)
+
+
+def _positions(ids, keys: np.ndarray) -> np.ndarray:
+    """Pozycja każdego klucza na liście `ids` (-1, gdy go tam nie ma)."""
+    ids = np.asarray(ids, dtype=np.int64)
+    table = np.full(int(ids.max(initial=0)) + 1, -1, dtype=np.int64)
+    table[ids] = np.arange(len(ids))
+    inside = keys < len(table)
+    return np.where(inside, table[np.where(inside, keys, 0)], -1)
+
+
+def _expand(counts: np.ndarray, offsets: np.ndarray, owners: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Rozwija wiersze na ich elementy z listy w układzie CSR.
+
+    Wiersz `i` ma elementy `offsets[owners[i]] ... + counts[owners[i]]`.
+    Zwraca (indeks wiersza, indeks elementu) dla każdej pary.
+    """
+    repeats = counts[owners]
+    rows = np.repeat(np.arange(len(owners)), repeats)
+    within = np.arange(len(rows)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    return rows, offsets[owners[rows]] + within
+
+
+def _csr(owners: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(liczności, przesunięcia) dla elementów posortowanych po właścicielu."""
+    counts = np.bincount(owners, minlength=size)
+    return counts, np.cumsum(counts) - counts
+
+
+def _workout_tag_sums(exercise_ids: np.ndarray, workout_rows: np.ndarray, metrics: np.ndarray):
+    """Sumy per (trening, tag): (trening, tag, sumy) posortowane po treningu."""
+    unique_ids, inverse = np.unique(exercise_ids, return_inverse=True)
+    tags_by_exercise = tag_index.tags_for(unique_ids.tolist())
+    tag_lists = [sorted(tags_by_exercise.get(ex_id, ())) for ex_id in unique_ids.tolist()]
+    tag_counts = np.fromiter((len(tags) for tags in tag_lists), dtype=np.int64, count=len(tag_lists))
+    flat_tags = np.fromiter(chain.from_iterable(tag_lists), dtype=np.int64, count=int(tag_counts.sum()))
+
+    rows, items = _expand(tag_counts, np.cumsum(tag_counts) - tag_counts, inverse)
+    tags = flat_tags[items]
+    # Klucz pary zakodowany w jednej liczbie; unique sortuje, więc pary są pogrupowane po treningu
+    tag_span = int(tags.max(initial=0)) + 1
+    pairs, pair_of_row = np.unique(workout_rows[rows] * tag_span + tags, return_inverse=True)
+    return pairs // tag_span, pairs % tag_span, _grouped_sums(pair_of_row, len(pairs), metrics[rows])
+
+
+def _week_tags(db: Session, plans, week_ids: List[int]) -> Dict[int, dict]:
+    """Rozbicie tygodni na tagi: {pozycja tygodnia na `week_ids`: kolumny}."""
+    schedule = _int_rows(db, _schedule(plans), 2)
+    exercises = _int_rows(db, _exercises(plans), 7)
+    if not len(exercises):
+        return {}
+
+    # Sumy (trening, tag) raz na trening, niezależnie od liczby tygodni, w których występuje
+    workout_ids = np.unique(exercises[:, WORK])
+    workout_rows = _positions(workout_ids, exercises[:, WORK])
+    pair_workouts, pair_tags, pair_sums = _workout_tag_sums(exercises[:, EX], workout_rows, _metrics(exercises))
+    if not len(pair_tags):
+        return {}
+
+    # Harmonogram: wpisy z treningiem bez ćwiczeń albo tygodniem spoza zestawienia pomijamy
+    scheduled = _positions(workout_ids, schedule[:, S_WORK])
+    week_rows = _positions(week_ids, schedule[:, S_WEEK])
+    valid = (scheduled >= 0) & (week_rows >= 0)
+    scheduled, week_rows = scheduled[valid], week_rows[valid]
+
+    counts, offsets = _csr(pair_workouts, len(workout_ids))
+    entries, pairs = _expand(counts, offsets, scheduled)
+    tag_span = int(pair_tags.max()) + 1
+    keys, key_of_entry = np.unique(week_rows[entries] * tag_span + pair_tags[pairs], return_inverse=True)
+    week_tag_sums = _grouped_sums(key_of_entry, len(keys), pair_sums[pairs])
+
+    tag_names = dict(db.query(Tag.id, Tag.name).filter(Tag.id.in_(np.unique(pair_tags).tolist())))
+    key_weeks, key_tags = np.divmod(keys, tag_span)
+    known = np.isin(key_tags, list(tag_names))
+    key_weeks, key_tags, week_tag_sums = key_weeks[known], key_tags[known], week_tag_sums[known]
+
+    # Klucze są posortowane, więc wpisy jednego tygodnia leżą obok siebie; kolumny
+    # zamieniamy na listy raz, a tygodnie dostają ich wycinki
+    tag_ids = key_tags.tolist()
+    columns = {"tag_id": tag_ids, "name": [tag_names[tag_id] for tag_id in tag_ids]}
+    columns.update(zip(METRICS, week_tag_sums.T.tolist()))
+    bounds = (np.flatnonzero(np.diff(key_weeks)) + 1).tolist()
+    return {
+        int(key_weeks[start]): {name: column[start:end] for name, column in columns.items()}
+        for start, end in zip([0] + bounds, bounds + [len(tag_ids)])
+    }
+
+
+def training_load(db: Session, plan_ids: Optional[Iterable[int]] = None, tags: bool = False) -> List[dict]:
+    """Obciążenie planów w kształcie `PlanLoad`.
+
+    Bez `plan_ids` liczy wszystkie plany poza szablonami (cały sezon).
+    Z `tags` tygodnie dostają kolumnowe rozbicie na tagi (inaczej `tags` to None).
+    """
+    plans = _plans(list(plan_ids) if plan_ids is not None else None)
+
+    result: List[dict] = []
+    week_ids: List[int] = []
+    weeks: List[dict] = []
+    for plan_id, name, week_id, position, workouts, *sums in db.execute(_week_totals(plans)):
+        if not result or result[-1]["plan_id"] != plan_id:
+            result.append({"plan_id": plan_id, "name": name, "weeks": [], **dict.fromkeys(METRICS, 0)})
+        if week_id is None:
+            continue
+        week = {"week_id": week_id, "position": position, "workouts": workouts, "tags": None}
+        for metric, value in zip(METRICS, sums):
+            week[metric] = int(value)
+            result[-1][metric] += int(value)
+        result[-1]["weeks"].append(week)
+        week_ids.append(week_id)
+        weeks.append(week)
+
+    if tags and weeks:
+        tag_index.ensure_built(db)
+        empty = {name: [] for name in ("tag_id", "name") + METRICS}
+        columns = _week_tags(db, plans, week_ids)
+        for i, week in enumerate(weeks):
+            week["tags"] = columns.get(i, empty)
+    return result
+
+
+def scheduled_workouts(db: Session, plan_id: int) -> List[int]:
+    """Id treningów przypiętych do planu (klucze cache zestawienia)."""
+    return [
+        work_id for work_id, in db.query(WorkoutPlan.work_id)
+        .filter(WorkoutPlan.plan_id == plan_id, WorkoutPlan.work_id.is_not(None)).distinct()
+    ]
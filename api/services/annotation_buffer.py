@@ -0,0 +1,208 @@
+"""Bufor zapisu (write-behind) dla szybkich edycji adnotacji.
+
+Przeciąganie adnotacji na osi czasu wysyła serię `PUT /annotations/{id}`;
+każdy zapisywany osobno to UPDATE, podbicie wersji analizatora i commit.
+Zamiast tego edycje (czasy, tekst, kolor, `saved`) trafiają do pamięci:
+kolejne zmiany tej samej adnotacji nadpisują się, a wątek w tle co
+`ANNOTATION_WRITE_DELAY` sekund (domyślnie 0.5; 0 wyłącza bufor) zapisuje
+wszystkie oczekujące adnotacje jednym UPDATE-em (executemany), z jednym
+podbiciem wersji i unieważnieniem cache na analizator. Po
+`ANNOTATION_WRITE_MAX` oczekujących adnotacjach zapis następuje od razu.
+
+Spójność odczytów: endpointy czytające lub zmieniające adnotacje wołają
+najpierw `flush(analyser_ids)`, który synchronicznie zapisuje oczekujące
+zmiany tych analizatorów (i czeka na trwający zapis w tle), więc klient
+zawsze czyta swoje zapisy, a ETag i cache widzą nową wersję. Lista
+analizatorów opróżnia tylko analizatory z bieżącej strony. Bufor jest
+lokalny dla procesu - przy kilku procesach serwera inne procesy widzą
+zmianę najpóźniej po `ANNOTATION_WRITE_DELAY`.
+
+Edycje, których baza by nie przyjęła (`accepts`), nie trafiają do bufora.
+Jeśli mimo to zbiorczy zapis się nie uda, edycje są zapisywane pojedynczo,
+a odrzucona zostaje tylko ta błędna (z wpisem w logu) - nie wraca do
+bufora, więc nie blokuje kolejnych zapisów i odczytów.
+
+Podżądania `/api/batch` omijają bufor (zapisują synchronicznie w sesji
+batcha) i go nie opróżniają - batch opróżnia cały bufor przed startem.
+Przy zamknięciu aplikacji bufor jest opróżniany (shutdown i atexit).
+"""
+import atexit
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.exc import OperationalError
+
+import database
+
+WRITE_DELAY = float(os.environ.get("ANNOTATION_WRITE_DELAY", "0.5"))
+MAX_PENDING = int(os.environ.get("ANNOTATION_WRITE_MAX", "1000"))
+
+# Pola zapisywane przez bufor - każda edycja ustawia wszystkie (pełny PUT)
+FIELDS = ("time_from", "time_to", "start_ms", "end_ms", "title", "description", "color", "saved")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Edit:
+    analyser_id: int
+    # Pola spoza bufora do odpowiedzi (id, analyser_id, cropped_videos) - z pierwszego odczytu
+    base: dict
+    values: dict
+
+
+class AnnotationWriteBuffer:
+    def __init__(self, delay: float = WRITE_DELAY, max_pending: int = MAX_PENDING):
+        self.delay = delay
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        # Zapis do bazy - jeden naraz, żeby odczyt po flush() widział także zapis trwający w tle
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending: Dict[int, _Edit] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Czy edycje w bieżącym kontekście mogą iść przez bufor."""
+        return self.delay > 0 and database.batch_session.get() is None
+
+    def pending(self, annotation_id: int) -> Optional[dict]:
+        """Adnotacja z oczekującymi zmianami (jak w odpowiedzi) albo None."""
+        with self._lock:
+            edit = self._pending.get(annotation_id)
+            return {**edit.base, **edit.values} if edit is not None else None
+
+    def put(self, annotation_id: int, analyser_id: int, base: dict, values: dict) -> dict:
+        """Zapamiętuje edycję; zwraca adnotację po zmianie."""
+        with self._lock:
+            edit = self._pending.get(annotation_id)
+            if edit is None:
+                edit = self._pending[annotation_id] = _Edit(analyser_id, base, {})
+            edit.values.update(values)
+            merged = {**edit.base, **edit.values}
+            full = len(self._pending) >= self.max_pending
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="annotation-write-buffer", daemon=True)
+                self._thread.start()
+        if full:
+            self._wakeup.set()
+        # Listy i szczegóły z cache pokazywałyby stan sprzed edycji; odczyty same opróżniają bufor
+        from services.cache import response_cache
+        response_cache.invalidate("analysers", f"analyser:{analyser_id}")
+        return merged
+
+    def flush(self, analyser_ids: Optional[Iterable[int]] = None) -> int:
+        """Zapisuje oczekujące zmiany (wszystkie albo wskazanych analizatorów).
+
+        Zwraca liczbę zapisanych adnotacji. Przy chwilowym błędzie bazy
+        (blokada, zerwane połączenie) edycje wracają do bufora i wyjątek
+        leci dalej; edycje, których baza nie przyjmie, są odrzucane.
+        """
+        if database.batch_session.get() is not None:
+            return 0
+        wanted = set(analyser_ids) if analyser_ids is not None else None
+        with self._flush_lock:
+            with self._lock:
+                edits = {
+                    annotation_id: edit for annotation_id, edit in self._pending.items()
+                    if wanted is None or edit.analyser_id in wanted
+                }
+                for annotation_id in edits:
+                    del self._pending[annotation_id]
+            if not edits:
+                return 0
+            try:
+                self._write(edits)
+                return len(edits)
+            except OperationalError:
+                self._requeue(edits)
+                raise
+            except Exception:
+                logger.warning("Zbiorczy zapis edycji adnotacji nie przeszedł - zapis pojedynczo", exc_info=True)
+            # Któraś edycja nie przejdzie nigdy - zapisujemy pojedynczo i odrzucamy tylko błędne
+            written = 0
+            remaining = dict(edits)
+            for annotation_id, edit in edits.items():
+                try:
+                    self._write({annotation_id: edit})
+                    written += 1
+                except OperationalError:
+                    self._requeue(remaining)
+                    raise
+                except Exception:
+                    logger.exception(
+                        "Odrzucono zbuforowaną edycję adnotacji",
+                        extra={"annotation_id": annotation_id, "analyser_id": edit.analyser_id},
+                    )
+                del remaining[annotation_id]
+            return written
+
+    def _requeue(self, edits: Dict[int, _Edit]):
+        with self._lock:
+            # Nowsze edycje tych adnotacji mają pierwszeństwo
+            for annotation_id, edit in edits.items():
+                self._pending.setdefault(annotation_id, edit)
+
+    @staticmethod
+    def accepts(values: dict) -> bool:
+        """Czy baza przyjmie edycję (NOT NULL, długość napisów).
+
+        Edycje, które by nie przeszły, idą synchronicznie i kończą się
+        błędem we własnym żądaniu, zamiast psuć zapis w tle.
+        """
+        from models.analyser import AnnotationAnalyser
+
+        columns = AnnotationAnalyser.__table__.c
+        for field in FIELDS:
+            value, column = values.get(field), columns[field]
+            if value is None:
+                if not column.nullable:
+                    return False
+            elif isinstance(value, str) and getattr(column.type, "length", None) and len(value) > column.type.length:
+                return False
+        return True
+
+    def flush_annotation(self, annotation_id: int):
+        with self._lock:
+            edit = self._pending.get(annotation_id)
+        if edit is not None:
+            self.flush([edit.analyser_id])
+        elif database.batch_session.get() is None:
+            # Adnotacja mogła właśnie trafić do zapisu w tle - czekamy na jego koniec
+            with self._flush_lock:
+                pass
+
+    def _write(self, edits: Dict[int, _Edit]):
+        from models.analyser import Analyser, AnnotationAnalyser
+        from services.cache import response_cache
+        from services.versioning import bump_version
+
+        table = AnnotationAnalyser.__table__
+        statement = update(table).where(table.c.id == bindparam("row_id")).values(
+            {field: bindparam(field) for field in FIELDS}
+        )
+        analyser_ids = {edit.analyser_id for edit in edits.values()}
+        with database.SessionLocal() as db:
+            db.execute(statement, [{"row_id": annotation_id, **edit.values} for annotation_id, edit in edits.items()])
+            bump_version(db, Analyser, analyser_ids)
+            db.commit()
+        response_cache.invalidate("analysers", *[f"analyser:{analyser_id}" for analyser_id in analyser_ids])
+        logger.debug("Zapisano zbuforowane edycje adnotacji", extra={"annotations": len(edits), "analysers": len(analyser_ids)})
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.delay)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Nie udało się zapisać zbuforowanych edycji adnotacji")
+
+
+annotation_buffer = AnnotationWriteBuffer()
+atexit.register(annotation_buffer.flush)
@@ -0,0 +1,88 @@
+"""Indeks przedziałów adnotacji w pamięci procesu (dla często czytanych analizatorów).
+
+Zapytanie o okno osi czasu (`?from=&to=`) szuka adnotacji, które na nie
+nachodzą: `start_ms <= to AND end_ms >= from`. W bazie obsługuje je indeks
+`(analyser_id, start_ms, end_ms)`, ale przy przewijaniu osi czasu to samo
+kilkaset adnotacji analizatora jest filtrowane wiele razy na sekundę.
+
+Dla ostatnio używanych analizatorów (LRU, `ANNOTATION_INDEX_SIZE`, domyślnie
+32) trzymamy więc ich przedziały posortowane po początku razem z najdłuższym
+przedziałem (`max_span`). Każdy przedział nachodzący na okno zaczyna się
+w `[from - max_span, to]`, więc wystarczy bisekcja po początkach i odrzucenie
+kandydatów kończących się przed `from`. Przy adnotacjach o podobnej długości
+(typowe nagrania) daje to tyle, co drzewo przedziałów, bez jego utrzymywania.
+
+Wpis jest ważny dla jednej wersji analizatora - każdy zapis adnotacji
+podbija wersję, więc nieaktualny wpis jest po prostu budowany od nowa.
+Indeks jest lokalny dla procesu.
+"""
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import List, NamedTuple, Tuple
+
+from sqlalchemy.orm import Session
+
+INDEX_SIZE = int(os.environ.get("ANNOTATION_INDEX_SIZE", "32"))
+
+
+class _Entry(NamedTuple):
+    version: int
+    starts: List[int]
+    # (start_ms, end_ms, id) w kolejności `starts`
+    intervals: List[Tuple[int, int, int]]
+    max_span: int
+
+
+class AnnotationIntervalIndex:
+    def __init__(self, size: int = INDEX_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+
+    def _build(self, db: Session, analyser_id: int, version: int) -> _Entry:
+        from models.analyser import AnnotationAnalyser
+
+        intervals = sorted(
+            db.query(AnnotationAnalyser.start_ms, AnnotationAnalyser.end_ms, AnnotationAnalyser.id)
+            .filter(AnnotationAnalyser.analyser_id == analyser_id)
+            .all()
+        )
+        return _Entry(
+            version=version,
+            starts=[start for start, _, _ in intervals],
+            intervals=[tuple(interval) for interval in intervals],
+            max_span=max((end - start for start, end, _ in intervals), default=0),
+        )
+
+    def _entry(self, db: Session, analyser_id: int, version: int) -> _Entry:
+        with self._lock:
+            entry = self._entries.get(analyser_id)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(analyser_id)
+                return entry
+        entry = self._build(db, analyser_id, version)
+        with self._lock:
+            current = self._entries.get(analyser_id)
+            # Równoległe żądanie mogło już zbudować nowszą wersję
+            if current is None or current.version <= version:
+                self._entries[analyser_id] = entry
+                self._entries.move_to_end(analyser_id)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def overlapping(self, db: Session, analyser_id: int, version: int, start_ms: int, end_ms: int) -> List[int]:
+        """Rosnące id adnotacji analizatora nachodzących na okno `[start_ms, end_ms]`."""
+        entry = self._entry(db, analyser_id, version)
+        low = bisect_left(entry.starts, start_ms - entry.max_span)
+        high = bisect_right(entry.starts, end_ms)
+        return sorted(annotation_id for _, end, annotation_id in entry.intervals[low:high] if end >= start_ms)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+annotation_index = AnnotationIntervalIndex()
@@ -0,0 +1,112 @@
+"""Wykonywanie podżądań `/api/batch` wewnątrz procesu.
+
+Każda operacja jest przekazywana do aplikacji ASGI tak jak zwykłe żądanie
+(ten sam routing, walidacja i middleware), ale bez ruchu sieciowego.
+Wszystkie operacje batcha dzielą jedną sesję bazy (`database.batch_session`).
+
+Odwołania do wcześniejszych wyników: w ścieżce i ciele operacji napis
+`${nazwa.pole}` jest zastępowany wartością z ciała odpowiedzi operacji o
+danym `id`, np. `${plan.id}` albo `${plan.weeks.0.id}`. Napis będący w
+całości jednym odwołaniem przyjmuje typ wartości (liczba zostaje liczbą).
+"""
+import asyncio
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+REFERENCE = re.compile(r"\$\{([A-Za-z_][\w-]*)((?:\.[\w-]+)*)\}")
+
+
+class UnresolvedReference(Exception):
+    pass
+
+
+def _lookup(results: Dict[str, Any], name: str, path: str):
+    if name not in results:
+        # Brak wyniku: nieznana nazwa, operacja jeszcze nie wykonana albo nieudana
+        raise UnresolvedReference(f"Result '{name}' is not available")
+    value = results[name]
+    for key in filter(None, path.split(".")):
+        try:
+            value = value[int(key)] if isinstance(value, list) else value[key]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise UnresolvedReference(f"Result '{name}' has no field '{path.lstrip('.')}'")
+    return value
+
+
+def resolve(value, results: Dict[str, Any], in_path: bool = False):
+    """Podstawia odwołania `${...}` w napisach (rekurencyjnie w listach i słownikach)."""
+    if isinstance(value, dict):
+        return {key: resolve(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve(item, results) for item in value]
+    if not isinstance(value, str):
+        return value
+    whole = REFERENCE.fullmatch(value)
+    if whole and not in_path:
+        return _lookup(results, *whole.groups())
+    render = (lambda v: quote(str(v), safe="")) if in_path else str
+    return REFERENCE.sub(lambda match: render(_lookup(results, *match.groups())), value)
+
+
+async def call(app, parent_scope: dict, method: str, path: str, body: Optional[Any], headers: Dict[str, str]) -> Tuple[int, Dict[str, str], Any]:
+    """Wywołuje aplikację ASGI; zwraca (status, nagłówki, ciało - JSON albo tekst)."""
+    path, _, query = path.partition("?")
+    content = b"" if body is None else json.dumps(body).encode()
+    raw_headers = [
+        (k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()
+        if k.lower() not in ("content-type", "content-length")
+    ]
+    raw_headers += [(b"content-type", b"application/json"), (b"content-length", str(len(content)).encode())]
+    scope = {
+        "type": "http",
+        "asgi": parent_scope.get("asgi", {"version": "3.0"}),
+        "http_version": parent_scope.get("http_version", "1.1"),
+        "method": method,
+        "scheme": parent_scope.get("scheme", "http"),
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": parent_scope.get("root_path", ""),
+        "query_string": query.encode(),
+        "headers": raw_headers,
+        "client": parent_scope.get("client"),
+        "server": parent_scope.get("server"),
+    }
+
+    sent_body = False
+    finished = asyncio.Event()
+    status = 500
+    response_headers: Dict[str, str] = {}
+    chunks: List[bytes] = []
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": content, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            for key, value in message.get("headers", []):
+                response_headers[key.decode("latin-1")] = value.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+    finished.set()
+
+    raw = b"".join(chunks)
+    try:
+        payload = json.loads(raw) if raw else None
+    except ValueError:
+        payload = raw.decode(errors="replace")
+    response_headers.pop("content-length", None)
+    response_headers.pop("content-type", None)
+    return status, response_headers, payload
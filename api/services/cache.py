@@ -0,0 +1,206 @@
+"""Cache odpowiedzi GET w pamięci procesu.
+
+Przechowuje gotowe, zserializowane ciała odpowiedzi (bajty JSON), więc
+trafienie pomija zarówno zapytania do bazy, jak i walidację Pydantic.
+Wpisy mają limit liczby i rozmiaru (LRU) oraz TTL. Każdy wpis jest oznaczony
+tagami zasobów, od których zależy (np. "plans", "plan:3"), a endpointy
+zapisujące po commicie wywołują `response_cache.invalidate(...)` z tagami
+zmienionych zasobów.
+
+W atomowym `/api/batch` (`deferred()`) commit endpointu nie jest jeszcze
+trwały, więc cache jest omijany, a unieważnienia są powtarzane po
+zakończeniu transakcji.
+
+Cache jest lokalny dla procesu - przy kilku workerach unieważnienie dotyczy
+tylko procesu, który obsłużył zapis, a pozostałe polegają na TTL.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+DEFAULT_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+DEFAULT_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "300"))
+
+CACHE_HEADER = "X-Cache"
+
+# Tagi unieważnione w trwającej transakcji atomowego batcha (None poza nim)
+_deferred_tags: ContextVar[Optional[Set[str]]] = ContextVar("response_cache_deferred_tags", default=None)
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    headers: Dict[str, str]
+    tags: Tuple[str, ...]
+    expires_at: float
+    size: int = field(init=False)
+
+    def __post_init__(self):
+        self.size = len(self.body) + sum(len(k) + len(v) for k, v in self.headers.items())
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES, ttl: float = DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._tag_keys: Dict[str, Set[str]] = {}
+        self._bytes = 0
+        # Licznik unieważnień - odpowiedź policzona przed zapisem nie trafi do cache
+        self._generation = 0
+        self._adapters: Dict[object, TypeAdapter] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0 and _deferred_tags.get() is None
+
+    # Niskopoziomowe API
+    def get(self, key: str) -> Tuple[Optional[CacheEntry], int]:
+        """Zwraca (wpis lub None, generacja do przekazania w `put`)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return entry, self._generation
+
+    def put(self, key: str, body: bytes, headers: Dict[str, str], tags: Iterable[str], generation: int):
+        entry = CacheEntry(body=body, headers=headers, tags=tuple(tags), expires_at=time.monotonic() + self.ttl)
+        if not self.enabled or entry.size > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self._generation:
+                # W międzyczasie był zapis - ta odpowiedź może być nieaktualna
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            for tag in entry.tags:
+                self._tag_keys.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, *tags: str):
+        deferred = _deferred_tags.get()
+        if deferred is not None:
+            deferred.update(tags)
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in self._tag_keys.pop(tag, ()):
+                    if key in self._entries:
+                        self._drop(key)
+                        self.invalidations += 1
+
+    @contextmanager
+    def deferred(self):
+        """Zapisy w jednej transakcji z commitem na końcu bloku (atomowy batch).
+
+        W bloku cache jest omijany (nie zobaczy niezatwierdzonych danych), a po
+        wyjściu - po commicie lub rollbacku - unieważnienia są powtarzane, bo
+        równoległy odczyt mógł w międzyczasie zapisać stan sprzed transakcji.
+        """
+        tags: Set[str] = set()
+        token = _deferred_tags.set(tags)
+        try:
+            yield
+        finally:
+            _deferred_tags.reset(token)
+            self.invalidate(*tags)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tag_keys.clear()
+            self._bytes = 0
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    # API dla endpointów
+    @staticmethod
+    def request_key(request: Request) -> str:
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return f"{request.url.path}?{query}"
+
+    def lookup(self, request: Request) -> Tuple[Optional[Response], int]:
+        """Zwraca gotową odpowiedź z cache (albo None) i generację dla `store`."""
+        if not self.enabled:
+            return None, 0
+        entry, generation = self.get(self.request_key(request))
+        if entry is None:
+            return None, generation
+        headers = dict(entry.headers)
+        headers[CACHE_HEADER] = "HIT"
+        return Response(content=entry.body, media_type="application/json", headers=headers), generation
+
+    def store(self, request: Request, model, data, tags: Iterable[str], generation: int, response: Response = None) -> Response:
+        """Serializuje `data` wg `model` (jak `response_model`), zapisuje i zwraca odpowiedź.
+
+        Nagłówki ustawione wcześniej na `response` (np. kursor stronicowania)
+        są zapamiętywane razem z ciałem.
+        """
+        adapter = self._adapters.get(model)
+        if adapter is None:
+            adapter = self._adapters[model] = TypeAdapter(model)
+        body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+        return self.store_body(request, body, tags, generation, response)
+
+    def store_body(self, request: Request, body: bytes, tags: Iterable[str], generation: int, response: Response = None) -> Response:
+        """Jak `store`, ale dla ciała zserializowanego wcześniej (szybka ścieżka)."""
+        headers = {}
+        if response is not None:
+            headers = {k: v for k, v in response.headers.items() if k.lower() not in ("content-length", "content-type")}
+        self.put(self.request_key(request), body, headers, tags, generation)
+        return Response(content=body, media_type="application/json", headers={**headers, CACHE_HEADER: "MISS"})
+
+
+response_cache = ResponseCache()
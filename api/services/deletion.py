@@ -0,0 +1,221 @@
+"""Usuwanie agregatów kilkoma zbiorczymi DELETE-ami.
+
+Wiersze podrzędne usuwa baza przez klucze obce `ON DELETE CASCADE`
+(plan -> tygodnie -> treningi planu, trening -> sekcje -> powiązania
+z ćwiczeniami i snapshot, analizator -> adnotacje -> przycięte wideo,
+ćwiczenie -> tagi, ćwiczenia w treningach i przycięte wideo), więc liczba
+zapytań nie zależy od wielkości agregatu. Jawnie usuwamy tylko
+`workout_exercise`, który wisi pod treningiem przez tabelę łączącą
+(bez klucza obcego do treningu).
+
+Funkcje działają w bieżącej transakcji: zwracają `Deletion` z tym, czego
+usunięcie dotknęło. Wywołujący robi `apply(db)` (wersje, snapshoty) przed
+commitem i `finish()` (indeksy w pamięci, pliki, cache) po nim.
+
+W atomowym `/api/batch` (`deferred_file_removal()`) commit endpointu nie
+jest jeszcze trwały, więc `finish()` tylko zapamiętuje pliki wideo, a batch
+usuwa je dopiero po commicie całej transakcji (po rollbacku pliki zostają).
+"""
+import logging
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from models.analyser import Analyser, AnnotationAnalyser, CroppedVideo
+from models.exercise import Exercise
+from models.plan import Plan, WeekPlan, WorkoutPlan
+from models.workout import SectionExercise, Workout, WorkoutExercise, WorkoutSection
+from services.cache import response_cache
+from services.search import exercise_index
+from services.snapshot import refresh_snapshots, workouts_using_exercises
+from services.tag_index import tag_index
+from services.versioning import bump_version
+
+logger = logging.getLogger(__name__)
+
+# Obiekty w sesji nie są synchronizowane - endpointy nie używają ich po usunięciu
+_BULK = {"synchronize_session": False}
+
+# Pliki do usunięcia po commicie trwającego atomowego batcha (None poza nim)
+_deferred_video_urls: ContextVar[Optional[List[str]]] = ContextVar("deletion_deferred_video_urls", default=None)
+
+
+def remove_video_file(video_url: str):
+    """Usuwa plik przyciętego wideo (`/uploads/...` albo ścieżka); błędy tylko loguje."""
+    try:
+        if video_url.startswith('/uploads/'):
+            project_root = Path(__file__).resolve().parents[2]  # api/services/deletion.py -> api/services -> api -> root
+            video_path = project_root / "public" / "uploads" / video_url.replace('/uploads/', '')
+        else:
+            video_path = Path(video_url)
+        if video_path.exists() and video_path.is_file():
+            os.remove(video_path)
+            logger.info("Usunięto plik wideo: %s", video_path)
+        else:
+            logger.warning("Nie znaleziono pliku wideo do usunięcia: %s", video_url)
+    except Exception as file_error:
+        logger.error("Błąd podczas usuwania pliku wideo: %s", file_error)
+
+
+def remove_video_files(video_urls: Iterable[str]):
+    for video_url in video_urls:
+        remove_video_file(video_url)
+
+
+@contextmanager
+def deferred_file_removal():
+    """Zbiera pliki wideo usuwane w bloku zamiast usuwać je od razu.
+
+    Zwraca listę ścieżek; wywołujący przekazuje ją do `remove_video_files`
+    po commicie transakcji, a po rollbacku ją pomija.
+    """
+    video_urls: List[str] = []
+    token = _deferred_video_urls.set(video_urls)
+    try:
+        yield video_urls
+    finally:
+        _deferred_video_urls.reset(token)
+
+
+@dataclass
+class Deletion:
+    exercises: Set[int] = field(default_factory=set)   # usunięte ćwiczenia
+    workouts: Set[int] = field(default_factory=set)    # treningi, które straciły ćwiczenia
+    plans: Set[int] = field(default_factory=set)       # plany ze zmienionymi treningami
+    analysers: Set[int] = field(default_factory=set)   # analizatory ze zmienionymi adnotacjami
+    video_urls: List[str] = field(default_factory=list)
+
+    def apply(self, db: Session):
+        """Wersje i snapshoty agregatów, które przetrwały (w bieżącej transakcji)."""
+        bump_version(db, Workout, self.workouts)
+        refresh_snapshots(db, self.workouts)
+        bump_version(db, Plan, self.plans)
+        bump_version(db, Analyser, self.analysers)
+
+    def finish(self, *stale: str):
+        """Po commicie: indeksy w pamięci, pliki wideo i cache (z dodatkowymi kluczami `stale`)."""
+        if self.exercises:
+            exercise_index.remove(self.exercises)
+            tag_index.remove(self.exercises)
+        deferred = _deferred_video_urls.get()
+        if deferred is not None:
+            deferred.extend(self.video_urls)
+        else:
+            remove_video_files(self.video_urls)
+
+        keys = list(stale)
+        if self.exercises:
+            keys += ["exercises", "workouts"] + [f"exercise:{exercise_id}" for exercise_id in self.exercises]
+        if self.workouts:
+            keys += ["workouts"] + [f"workout:{workout_id}" for workout_id in self.workouts]
+        if self.plans:
+            keys += ["plans"] + [f"plan:{plan_id}" for plan_id in self.plans]
+        if self.analysers:
+            keys += ["analysers"] + [f"analyser:{analyser_id}" for analyser_id in self.analysers]
+        if keys:
+            response_cache.invalidate(*dict.fromkeys(keys))
+
+
+def delete_plans(db: Session, plan_ids: Iterable[int]) -> Deletion:
+    """Tygodnie i treningi planu usuwa kaskada."""
+    db.execute(delete(Plan).where(Plan.id.in_(list(plan_ids))), execution_options=_BULK)
+    return Deletion()
+
+
+def delete_weeks(db: Session, week_ids: Iterable[int]) -> Deletion:
+    week_ids = list(week_ids)
+    plans = {plan_id for plan_id, in db.execute(select(WeekPlan.plan_id).where(WeekPlan.id.in_(week_ids)).distinct())}
+    db.execute(delete(WeekPlan).where(WeekPlan.id.in_(week_ids)), execution_options=_BULK)
+    return Deletion(plans=plans)
+
+
+def delete_workouts(db: Session, workout_ids: Iterable[int]) -> Deletion:
+    """Sekcje, powiązania i snapshot usuwa kaskada; plany tracą powiązanie (SET NULL)."""
+    workout_ids = list(workout_ids)
+    plans = {
+        plan_id for plan_id, in db.execute(select(WorkoutPlan.plan_id).where(WorkoutPlan.work_id.in_(workout_ids)).distinct())
+    }
+    # Ćwiczenia treningu pobieramy przed usunięciem - kaskada usuwa powiązania, po których je znajdujemy
+    workout_exercise_ids = db.execute(
+        select(SectionExercise.work_exercise_id)
+        .join(WorkoutSection, WorkoutSection.id == SectionExercise.section_id)
+        .where(WorkoutSection.work_id.in_(workout_ids))
+    ).scalars().all()
+    if workout_exercise_ids:
+        db.execute(delete(WorkoutExercise).where(WorkoutExercise.id.in_(workout_exercise_ids)), execution_options=_BULK)
+    db.execute(delete(Workout).where(Workout.id.in_(workout_ids)), execution_options=_BULK)
+    return Deletion(plans=plans)
+
+
+def delete_exercises(db: Session, exercise_ids: Iterable[int]) -> Deletion:
+    """Tagi, ćwiczenia w treningach i przycięte wideo usuwa kaskada; adnotacje tracą status 'saved'."""
+    exercise_ids = set(exercise_ids)
+    if not exercise_ids:
+        return Deletion()
+    cropped = db.execute(
+        select(CroppedVideo.video_url, AnnotationAnalyser.analyser_id)
+        .join(AnnotationAnalyser, AnnotationAnalyser.id == CroppedVideo.anno_id)
+        .where(CroppedVideo.crop_id.in_(exercise_ids))
+    ).all()
+    deletion = Deletion(
+        exercises=exercise_ids,
+        workouts=workouts_using_exercises(db, exercise_ids),
+        analysers={analyser_id for _, analyser_id in cropped},
+        video_urls=[video_url for video_url, _ in cropped if video_url],
+    )
+    if cropped:
+        db.execute(
+            update(AnnotationAnalyser)
+            .where(AnnotationAnalyser.id.in_(select(CroppedVideo.anno_id).where(CroppedVideo.crop_id.in_(exercise_ids))))
+            .values(saved=False),
+            execution_options=_BULK,
+        )
+    db.execute(delete(Exercise).where(Exercise.id.in_(exercise_ids)), execution_options=_BULK)
+    return deletion
+
+
+def _delete_annotations_where(db: Session, condition) -> Deletion:
+    """Adnotacje spełniające warunek razem z przyciętym wideo i ćwiczeniami z nich wyciętymi."""
+    cropped = db.execute(
+        select(CroppedVideo.crop_id, CroppedVideo.video_url)
+        .join(AnnotationAnalyser, AnnotationAnalyser.id == CroppedVideo.anno_id)
+        .where(condition)
+    ).all()
+    exercise_ids = {crop_id for crop_id, _ in cropped if crop_id}
+    deletion = Deletion(
+        exercises=exercise_ids,
+        workouts=workouts_using_exercises(db, exercise_ids),
+        video_urls=[video_url for _, video_url in cropped if video_url],
+    )
+    # Ćwiczenia przed adnotacjami - ich przycięte wideo znika wtedy razem z nimi
+    if exercise_ids:
+        db.execute(delete(Exercise).where(Exercise.id.in_(exercise_ids)), execution_options=_BULK)
+    db.execute(delete(AnnotationAnalyser).where(condition), execution_options=_BULK)
+    return deletion
+
+
+def delete_annotations(db: Session, annotation_ids: Iterable[int]) -> Deletion:
+    annotation_ids = list(annotation_ids)
+    if not annotation_ids:
+        return Deletion()
+    analysers = {
+        analyser_id for analyser_id, in
+        db.execute(select(AnnotationAnalyser.analyser_id).where(AnnotationAnalyser.id.in_(annotation_ids)).distinct())
+    }
+    deletion = _delete_annotations_where(db, AnnotationAnalyser.id.in_(annotation_ids))
+    deletion.analysers = analysers
+    return deletion
+
+
+def delete_analysers(db: Session, analyser_ids: Iterable[int]) -> Deletion:
+    """Adnotacje (z przyciętym wideo i ćwiczeniami) i sam analizator."""
+    analyser_ids = list(analyser_ids)
+    deletion = _delete_annotations_where(db, AnnotationAnalyser.analyser_id.in_(analyser_ids))
+    db.execute(delete(Analyser).where(Analyser.id.in_(analyser_ids)), execution_options=_BULK)
+    return deletion
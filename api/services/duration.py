@@ -0,0 +1,122 @@
+"""Szacowanie czasu trwania treningu po stronie serwera.
+
+Ćwiczenie trwa `sets x (praca + rest)`, gdzie praca to `duration` dla
+jednostki CZAS albo `quantity x REP_SECONDS` dla ILOŚĆ (przerwa po ostatniej
+serii liczy się jako zmiana stanowiska). Do sekcji dochodzą przejścia między
+ćwiczeniami, do treningu - przejścia między sekcjami.
+
+Wynik (sekundy) jest zapisywany w `workouts.estimated_duration`
+i `workout_section.estimated_duration` przy każdym zapisie treningu, więc
+filtrowanie po czasie to zapytanie po indeksie. Przeliczenie istniejących
+danych (z katalogu `api`):
+
+    python -m services.duration recompute
+"""
+import os
+import sys
+from collections import defaultdict
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from models.workout import ExerciseUnit, SectionExercise, Workout, WorkoutExercise, WorkoutSection
+
+REP_SECONDS = int(os.environ.get("DURATION_REP_SECONDS", "3"))
+EXERCISE_TRANSITION_SECONDS = int(os.environ.get("DURATION_EXERCISE_TRANSITION_SECONDS", "30"))
+SECTION_TRANSITION_SECONDS = int(os.environ.get("DURATION_SECTION_TRANSITION_SECONDS", "60"))
+
+RECOMPUTE_BATCH_SIZE = 500
+
+
+def exercise_seconds(sets, quantity, unit, duration, rest) -> int:
+    if ExerciseUnit(unit) is ExerciseUnit.TIME:
+        work = duration or 0
+    else:
+        work = (quantity or 0) * REP_SECONDS
+    return sets * (work + (rest or 0))
+
+
+def section_seconds(exercises: Iterable) -> int:
+    """Czas sekcji z ćwiczeń (obiekty z polami sets/quantity/unit/duration/rest)."""
+    totals = [exercise_seconds(e.sets, e.quantity, e.unit, e.duration, e.rest) for e in exercises]
+    return sum(totals) + EXERCISE_TRANSITION_SECONDS * max(len(totals) - 1, 0)
+
+
+def workout_seconds(section_totals: List[int]) -> int:
+    return sum(section_totals) + SECTION_TRANSITION_SECONDS * max(len(section_totals) - 1, 0)
+
+
+def estimate(sections: Iterable) -> Tuple[int, List[int]]:
+    """(czas treningu, czasy sekcji) dla sekcji z polem `exercises` - np. `WorkoutCreate.sections`."""
+    section_totals = [section_seconds(section.exercises) for section in sections]
+    return workout_seconds(section_totals), section_totals
+
+
+def recompute(db: Session, workout_ids: Iterable[int]):
+    """Przelicza zapisane szacunki z tabel (bez commita)."""
+    workout_ids = list(workout_ids)
+    if not workout_ids:
+        return
+    sections = db.query(WorkoutSection.id, WorkoutSection.work_id).filter(
+        WorkoutSection.work_id.in_(workout_ids)
+    ).order_by(WorkoutSection.work_id, WorkoutSection.position).all()
+    exercises = defaultdict(list)
+    if sections:
+        rows = (
+            db.query(SectionExercise.section_id, WorkoutExercise.sets, WorkoutExercise.quantity,
+                     WorkoutExercise.unit, WorkoutExercise.duration, WorkoutExercise.rest)
+            .join(WorkoutExercise, WorkoutExercise.id == SectionExercise.work_exercise_id)
+            .filter(SectionExercise.section_id.in_([section_id for section_id, _ in sections]))
+        )
+        for row in rows:
+            exercises[row.section_id].append(row)
+
+    section_totals = defaultdict(list)
+    section_rows = []
+    for section_id, work_id in sections:
+        seconds = section_seconds(exercises[section_id])
+        section_totals[work_id].append(seconds)
+        section_rows.append({"row_id": section_id, "estimated_duration": seconds})
+    workout_rows = [
+        {"row_id": work_id, "estimated_duration": workout_seconds(section_totals[work_id])} for work_id in workout_ids
+    ]
+
+    # Jedno UPDATE na tabelę wykonane dla wszystkich wierszy (executemany)
+    for table, rows in ((WorkoutSection.__table__, section_rows), (Workout.__table__, workout_rows)):
+        if rows:
+            db.execute(
+                update(table).where(table.c.id == bindparam("row_id"))
+                .values(estimated_duration=bindparam("estimated_duration")),
+                rows,
+            )
+
+
+def main(argv):
+    from database import SessionLocal
+    import models.exercise, models.tag, models.plan, models.analyser  # noqa: F401 - rejestracja modeli
+    from services.snapshot import refresh_snapshots
+
+    if (argv[1] if len(argv) > 1 else "recompute") != "recompute":
+        print("Użycie: python -m services.duration recompute")
+        return 2
+    count, after = 0, 0
+    with SessionLocal() as db:
+        while True:
+            ids = [
+                workout_id for workout_id, in db.query(Workout.id)
+                .filter(Workout.id > after).order_by(Workout.id).limit(RECOMPUTE_BATCH_SIZE)
+            ]
+            if not ids:
+                break
+            recompute(db, ids)
+            refresh_snapshots(db, ids)
+            db.commit()
+            count += len(ids)
+            after = ids[-1]
+    print(f"Przeliczono szacowany czas treningów: {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,281 @@
+"""Idempotentne żądania POST (nagłówek `Idempotency-Key`).
+
+Pierwsze żądanie z danym kluczem zajmuje go w tabeli `idempotency_key`
+(krótka, osobna transakcja), wykonuje się normalnie, a jego odpowiedź
+(status, nagłówki, treść) jest zapisywana na `IDEMPOTENCY_TTL` sekund.
+Kolejne żądania z tym kluczem:
+- po zakończeniu pierwszego dostają zapisaną odpowiedź bez ponownego
+  wykonania (z nagłówkiem `Idempotent-Replayed: true`),
+- w trakcie pierwszego czekają na jego wynik (do `IDEMPOTENCY_WAIT` sekund,
+  potem 409), zamiast wykonywać tę samą pracę równolegle,
+- z inną metodą, ścieżką albo treścią niż pierwsze dostają 422.
+Odpowiedzi 5xx (i wyjątki) zwalniają klucz, więc ponowienie wykona się
+od nowa. Zajęcie klucza trwa `IDEMPOTENCY_LEASE` sekund i jest odnawiane,
+dopóki żądanie się wykonuje - jeśli proces, który je wykonywał, zginie
+(awaria, SIGKILL, wdrożenie), po wygaśnięciu dzierżawy klucz przejmuje
+kolejne ponowienie zamiast dostawać 409 aż do końca `IDEMPOTENCY_TTL`. Czekanie i zajmowanie klucza działa przez bazę, więc obejmuje też
+kilka procesów serwera.
+
+Treść żądania jest buforowana (hash i przekazanie dalej), więc pomijane są
+żądania multipart (upload plików) i strumieniowane (`Transfer-Encoding:
+chunked`) - wykonują się zwyczajnie, bez ochrony klucza. Zapisywane są tylko
+nagłówki ustawiane przez endpoint (`_STORED_HEADERS`); middleware działa
+wewnątrz CORSMiddleware, więc odtworzona odpowiedź dostaje nagłówki CORS
+policzone dla bieżącego żądania, a nie dla pierwszego.
+
+Podżądania `/api/batch` są pomijane - wykonują się we wspólnej sesji batcha
+(w trybie atomowym mogą zostać wycofane), a klucz można podać dla całego
+żądania batch.
+"""
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import List
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+import database
+from models.idempotency import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+TTL = int(os.environ.get("IDEMPOTENCY_TTL", str(24 * 3600)))
+WAIT_TIMEOUT = float(os.environ.get("IDEMPOTENCY_WAIT", "120"))
+LEASE = float(os.environ.get("IDEMPOTENCY_LEASE", "30"))
+PURGE_INTERVAL = 300
+MAX_KEY_LENGTH = 255
+
+# Nagłówki odpowiedzi endpointu, które zapisujemy; resztę (CORS, id żądania,
+# profil SQL, X-Cache, długość) odtworzenie dostaje od warstw wokół
+_STORED_HEADERS = {b"content-type", b"etag", b"location", b"x-next-cursor", b"x-total-count"}
+
+table = IdempotencyKey.__table__
+logger = logging.getLogger(__name__)
+_last_purge = 0.0
+
+
+def request_hash(scope, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def _purge(conn, now: datetime.datetime):
+    global _last_purge
+    if time.monotonic() - _last_purge < PURGE_INTERVAL:
+        return
+    _last_purge = time.monotonic()
+    conn.execute(delete(table).where(table.c.expires_at <= now))
+
+
+def _lease_expired(row, now: datetime.datetime) -> bool:
+    """Czy żądanie w toku przestało odnawiać zajęcie klucza (jego proces zginął)."""
+    return row.status is None and (row.lease_until is None or row.lease_until <= now)
+
+
+def _claim(key: str, digest: str):
+    """Zajmuje klucz. None, gdy zajęło go to żądanie; w przeciwnym razie istniejący wiersz."""
+    for _ in range(3):
+        now = datetime.datetime.utcnow()
+        lease_until = now + datetime.timedelta(seconds=LEASE)
+        try:
+            with database.engine.begin() as conn:
+                _purge(conn, now)
+                conn.execute(insert(table).values(
+                    key=key, request_hash=digest, created_at=now, lease_until=lease_until,
+                    expires_at=now + datetime.timedelta(seconds=TTL),
+                ))
+            return None
+        except IntegrityError:
+            with database.engine.begin() as conn:
+                row = conn.execute(select(table).where(table.c.key == key)).first()
+                if row is not None and row.expires_at > now:
+                    if row.request_hash != digest or not _lease_expired(row, now):
+                        return row
+                    # Dzierżawa wygasła - przejmujemy klucz (warunek chroni przed dwoma przejęciami naraz)
+                    taken = conn.execute(
+                        update(table)
+                        .where(table.c.key == key, table.c.status.is_(None), table.c.lease_until == row.lease_until)
+                        .values(created_at=now, lease_until=lease_until)
+                    ).rowcount
+                    if taken:
+                        logger.warning("Przejęto klucz idempotencji po wygaśnięciu dzierżawy", extra={"idempotency_key": key})
+                        return None
+                    continue
+                # Wygasły (albo właśnie zwolniony) - próbujemy zająć jeszcze raz
+                conn.execute(delete(table).where(table.c.key == key, table.c.expires_at <= now))
+    raise RuntimeError(f"Nie udało się zająć klucza idempotencji {key}")
+
+
+def _load(key: str):
+    with database.engine.connect() as conn:
+        return conn.execute(select(table).where(table.c.key == key)).first()
+
+
+def _store(key: str, status: int, headers: List[list], body: bytes):
+    with database.engine.begin() as conn:
+        conn.execute(update(table).where(table.c.key == key).values(status=status, headers=json.dumps(headers), body=body))
+
+
+def _renew(key: str):
+    with database.engine.begin() as conn:
+        conn.execute(
+            update(table).where(table.c.key == key, table.c.status.is_(None))
+            .values(lease_until=datetime.datetime.utcnow() + datetime.timedelta(seconds=LEASE))
+        )
+
+
+async def _keep_lease(key: str):
+    """Odnawia zajęcie klucza, dopóki żądanie się wykonuje (anulowane po jego końcu)."""
+    while True:
+        await asyncio.sleep(LEASE / 3)
+        try:
+            await run_in_threadpool(_renew, key)
+        except Exception:
+            logger.exception("Nie udało się odnowić dzierżawy klucza idempotencji")
+
+
+def _release(key: str):
+    with database.engine.begin() as conn:
+        conn.execute(delete(table).where(table.c.key == key, table.c.status.is_(None)))
+
+
+async def _wait(key: str, deadline: float):
+    """Czeka na zakończenie żądania, które zajęło klucz.
+
+    Zwraca wiersz z odpowiedzią albo None, gdy klucz można zająć ponownie
+    (zwolniony po 5xx albo z wygasłą dzierżawą).
+    """
+    delay = 0.05
+    while time.monotonic() < deadline:
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 1.0)
+        row = await run_in_threadpool(_load, key)
+        if row is None or _lease_expired(row, datetime.datetime.utcnow()):
+            return None
+        if row.status is not None:
+            return row
+    raise TimeoutError
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        key = None
+        if scope["type"] == "http" and scope["method"] == "POST" and database.batch_session.get() is None:
+            header = IDEMPOTENCY_HEADER.lower().encode()
+            key = next((value.decode("latin-1") for name, value in scope.get("headers", ()) if name == header), None)
+        if key and not _bufferable(scope):
+            logger.debug("Pominięto klucz idempotencji dla treści multipart/strumieniowanej", extra={"idempotency_key": key})
+            key = None
+        if not key:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await _error(scope, receive, send, 400, f"{IDEMPOTENCY_HEADER} is limited to {MAX_KEY_LENGTH} characters")
+            return
+
+        body = await _read_body(receive)
+        digest = request_hash(scope, body)
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while True:
+            row = await run_in_threadpool(_claim, key, digest)
+            if row is None:
+                break
+            if row.request_hash != digest:
+                await _error(scope, receive, send, 422, f"{IDEMPOTENCY_HEADER} was already used for a different request")
+                return
+            if row.status is None:
+                try:
+                    row = await _wait(key, deadline)
+                except TimeoutError:
+                    await _error(scope, receive, send, 409, f"A request with this {IDEMPOTENCY_HEADER} is still in progress")
+                    return
+                if row is None:
+                    continue
+            logger.debug("Odtworzenie odpowiedzi dla klucza idempotencji", extra={"idempotency_key": key, "status": row.status})
+            await _replay(row, send)
+            return
+
+        await self._execute(scope, receive, send, key, body)
+
+    async def _execute(self, scope, receive, send, key: str, body: bytes):
+        status = None
+        headers: List[list] = []
+        chunks: List[bytes] = []
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers.extend(
+                    [name.decode("latin-1"), value.decode("latin-1")]
+                    for name, value in message.get("headers", []) if name.lower() in _STORED_HEADERS
+                )
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        lease = asyncio.ensure_future(_keep_lease(key))
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await run_in_threadpool(_release, key)
+            raise
+        finally:
+            lease.cancel()
+        if status is None or status >= 500:
+            await run_in_threadpool(_release, key)
+        else:
+            await run_in_threadpool(_store, key, status, headers, b"".join(chunks))
+
+
+def _bufferable(scope) -> bool:
+    """Czy treść żądania można wczytać w całości do pamięci (nie upload ani strumień)."""
+    headers = dict(scope.get("headers", ()))
+    if headers.get(b"content-type", b"").lower().startswith(b"multipart/"):
+        return False
+    return b"chunked" not in headers.get(b"transfer-encoding", b"").lower()
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def _replay(row, send):
+    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in json.loads(row.headers or "[]")]
+    headers += [(b"content-length", str(len(row.body or b"")).encode()), (REPLAYED_HEADER.lower().encode(), b"true")]
+    await send({"type": "http.response.start", "status": row.status, "headers": headers})
+    await send({"type": "http.response.body", "body": row.body or b""})
+
+
+async def _error(scope, receive, send, status: int, detail: str):
+    await JSONResponse({"detail": detail}, status_code=status)(scope, receive, send)
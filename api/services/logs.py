@@ -0,0 +1,209 @@
+"""Konfiguracja logowania (raz, przy starcie aplikacji).
+
+- Wątki żądań tylko wkładają rekordy do kolejki (`QueueHandler`); formatowanie
+  i zapis na stderr robi osobny wątek (`QueueListener`).
+- Format JSON (`LOG_FORMAT=json`, domyślnie) albo tekst (`LOG_FORMAT=text`),
+  z identyfikatorem żądania i polami przekazanymi w `extra=`.
+- Poziomy: `LOG_LEVEL` (root, domyślnie INFO) i `LOG_LEVELS` per logger,
+  np. `LOG_LEVELS=api.analyser=DEBUG,sql_profiler=WARNING`.
+- Gadatliwe rekordy poniżej WARNING są ograniczane: `LOG_DEBUG_SAMPLE` to
+  odsetek przepuszczanych rekordów DEBUG, a `LOG_RATE_LIMIT` - maksymalna
+  liczba rekordów na sekundę z jednego miejsca w kodzie (logger, plik
+  i linia wywołania; 0 wyłącza limit). Pominięte są zliczane w polu
+  `suppressed` następnego przepuszczonego rekordu.
+- `RequestIdMiddleware` nadaje każdemu żądaniu identyfikator (nagłówek
+  `X-Request-ID` z żądania albo nowy) i zwraca go w odpowiedzi; trafia on do
+  każdego rekordu logowanego w trakcie żądania - także z zadań FFmpeg
+  i podżądań `/api/batch`, które dziedziczą kontekst.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import traceback
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.environ.get("LOG_LEVELS", "")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+DEBUG_SAMPLE = float(os.environ.get("LOG_DEBUG_SAMPLE", "1"))
+RATE_LIMIT = float(os.environ.get("LOG_RATE_LIMIT", "20"))
+# Okna limitu nieużywane dłużej niż tyle sekund są usuwane
+WINDOW_TTL = 10.0
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Atrybuty, które ma każdy LogRecord - reszta pochodzi z `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """`a=DEBUG,b.c=WARNING` -> {"a": "DEBUG", "b.c": "WARNING"}."""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+class RequestContextFilter(logging.Filter):
+    """Dopisuje identyfikator żądania (w wątku, który loguje - przed kolejką)."""
+
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Próbkowanie DEBUG i limit rekordów na sekundę per miejsce w kodzie (poniżej WARNING)."""
+
+    def __init__(self, debug_sample: float = DEBUG_SAMPLE, rate_limit: float = RATE_LIMIT):
+        super().__init__()
+        self.debug_sample = debug_sample
+        self.rate_limit = rate_limit
+        self.lock = threading.Lock()
+        # (logger, plik, linia) -> [początek okna, przepuszczone w oknie, pominięte]
+        self.windows: Dict[Tuple[str, str, int], list] = {}
+        self.last_prune = time.monotonic()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        if record.levelno <= logging.DEBUG and self.debug_sample < 1 and random.random() >= self.debug_sample:
+            return False
+        if not self.rate_limit:
+            return True
+        now = time.monotonic()
+        key = (record.name, record.pathname, record.lineno)
+        with self.lock:
+            if now - self.last_prune >= WINDOW_TTL:
+                self._prune(now)
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= 1.0:
+                suppressed = window[2] if window else 0
+                self.windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] >= self.rate_limit:
+                window[2] += 1
+                return False
+            window[1] += 1
+            return True
+
+    def _prune(self, now: float):
+        self.last_prune = now
+        for key in [key for key, window in self.windows.items() if now - window[0] >= WINDOW_TTL]:
+            del self.windows[key]
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key != "request_id":
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        text = super().format(record)
+        extra = {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES and key != "request_id"}
+        return f"{text} {extra}" if extra else text
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Jak `QueueHandler`, ale zachowuje pola rekordu (a traceback w `exc_text`) dla formatera JSON."""
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info))
+            record.exc_info = None
+        return record
+
+
+def setup():
+    """Konfiguruje logowanie procesu; kolejne wywołania nic nie robią."""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+
+    handler = _QueueHandler(queue.SimpleQueue())
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(SamplingFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    for name, level in parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, output)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+class RequestIdMiddleware:
+    """Identyfikator żądania w kontekście (dla logów) i w nagłówku odpowiedzi."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header = REQUEST_ID_HEADER.lower().encode()
+        incoming = next((value.decode("latin-1") for key, value in scope.get("headers", ()) if key == header), None)
+        # Podżądania /api/batch bez własnego nagłówka dziedziczą identyfikator żądania nadrzędnego
+        current = (incoming or request_id.get() or uuid.uuid4().hex)[:64]
+        token = request_id.set(current)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((header, current.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(token)
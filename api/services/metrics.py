@@ -0,0 +1,244 @@
+"""Metryki Prometheus (`GET /metrics`).
+
+Wszystko jest zbierane z zewnątrz handlerów:
+- middleware ASGI (`MetricsMiddleware`) - czas odpowiedzi per szablon ścieżki,
+  żądania w toku, bajty ciał żądań i uploady (multipart), zadania FFmpeg
+  (endpointy z `JOB_ROUTES`: czas, liczba w toku/w kolejce, błędy),
+- zdarzenia silnika SQLAlchemy (`instrument_engine`) - liczba i czas zapytań
+  (również na żądanie), pobrania połączeń z puli i czas czekania na nie,
+- odczyt przy scrapowaniu - stan puli połączeń i puli wątków AnyIO, w której
+  FastAPI wykonuje synchroniczne handlery i zależności.
+
+`prometheus_client` jest opcjonalny - bez niego middleware nie jest
+dodawany, a `/metrics` odpowiada 503. Metryki są per proces; przy kilku
+workerach każdy z nich trzeba scrapować osobno. `METRICS_ENABLED=0` wyłącza
+zbieranie.
+"""
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from starlette.routing import compile_path
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+except ImportError:  # prometheus_client jest opcjonalny
+    generate_latest = None
+
+enabled = generate_latest is not None and os.environ.get("METRICS_ENABLED", "1") != "0"
+
+# Endpointy uruchamiające FFmpeg (szablon ścieżki -> nazwa zadania)
+JOB_ROUTES = {
+    "/api/analysers/annotations/{annotation_id}/crop-video": "crop_video",
+}
+UNMATCHED_ROUTE = "<unmatched>"
+
+if enabled:
+    REQUEST_DURATION = Histogram(
+        "http_request_duration_seconds", "Czas obsługi żądania", ["method", "route", "status"],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    )
+    REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "Żądania w toku", ["method"])
+    REQUEST_BYTES = Counter("http_request_bytes_total", "Bajty ciał żądań", ["route"])
+
+    UPLOAD_BYTES = Counter("upload_bytes_total", "Bajty przesłane w żądaniach multipart", ["route"])
+    UPLOAD_THROUGHPUT = Histogram(
+        "upload_throughput_bytes_per_second", "Przepustowość uploadu (bajty/s)", ["route"],
+        buckets=(64e3, 256e3, 1e6, 4e6, 16e6, 64e6, 256e6),
+    )
+
+    QUERIES_PER_REQUEST = Histogram(
+        "db_queries_per_request", "Liczba zapytań SQL na żądanie", ["route"],
+        buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+    )
+    QUERY_DURATION = Histogram(
+        "db_query_duration_seconds", "Czas zapytania SQL",
+        buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+    )
+    POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Pobrania połączeń z puli")
+    POOL_OVERFLOW_CHECKOUTS = Counter(
+        "db_pool_overflow_checkouts_total", "Pobrania ponad rozmiar puli (dodatkowe połączenia z max_overflow)"
+    )
+    POOL_CHECKOUT_WAIT = Histogram(
+        "db_pool_checkout_wait_seconds", "Czas pobrania połączenia z puli (czekanie na wolne i otwarcie nowego)",
+        buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+    )
+    POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Połączenia pobrane z puli")
+    POOL_OVERFLOW = Gauge("db_pool_overflow", "Połączenia ponad rozmiar puli (0, gdy pula nie jest pełna)")
+    POOL_SIZE = Gauge("db_pool_size", "Rozmiar puli połączeń")
+
+    JOB_DURATION = Histogram(
+        "ffmpeg_job_duration_seconds", "Czas zadania FFmpeg", ["job"],
+        buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+    )
+    JOBS_IN_PROGRESS = Gauge("ffmpeg_jobs_in_progress", "Zadania FFmpeg w toku lub w kolejce do puli wątków", ["job"])
+    JOB_FAILURES = Counter("ffmpeg_job_failures_total", "Nieudane zadania FFmpeg", ["job"])
+
+    THREADPOOL_BUSY = Gauge("threadpool_busy_threads", "Zajęte wątki puli AnyIO")
+    THREADPOOL_SIZE = Gauge("threadpool_size", "Limit wątków puli AnyIO")
+    THREADPOOL_WAITING = Gauge("threadpool_waiting_tasks", "Zadania czekające na wolny wątek")
+
+
+class _RequestStats:
+    __slots__ = ("queries", "request_bytes")
+
+    def __init__(self):
+        self.queries = 0
+        self.request_bytes = 0
+
+
+# Statystyki bieżącego żądania; pula wątków kopiuje kontekst, więc handlery synchroniczne też je widzą
+_current: ContextVar[Optional[_RequestStats]] = ContextVar("metrics_request_stats", default=None)
+
+_job_patterns = [(compile_path(path)[0], job) for path, job in JOB_ROUTES.items()]
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = _RequestStats()
+        token = _current.set(stats)
+        method = scope["method"]
+        job = next((name for pattern, name in _job_patterns if pattern.match(scope["path"])), None)
+        status = 500
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                stats.request_bytes += len(message.get("body", b""))
+            return message
+
+        async def status_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.labels(method).inc()
+        if job:
+            JOBS_IN_PROGRESS.labels(job).inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, status_send)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            REQUESTS_IN_PROGRESS.labels(method).dec()
+            route = route_template(scope)
+
+            REQUEST_DURATION.labels(method, route, str(status)).observe(elapsed)
+            QUERIES_PER_REQUEST.labels(route).observe(stats.queries)
+            if stats.request_bytes:
+                REQUEST_BYTES.labels(route).inc(stats.request_bytes)
+                if _is_multipart(scope):
+                    UPLOAD_BYTES.labels(route).inc(stats.request_bytes)
+                    UPLOAD_THROUGHPUT.labels(route).observe(stats.request_bytes / max(elapsed, 1e-6))
+            if job:
+                JOBS_IN_PROGRESS.labels(job).dec()
+                JOB_DURATION.labels(job).observe(elapsed)
+                if status >= 500:
+                    JOB_FAILURES.labels(job).inc()
+
+
+def route_template(scope) -> str:
+    """Pełny szablon ścieżki dopasowanej trasy, np. `/api/plans/{plan_id}`.
+
+    Trasa z routera dołączonego z prefiksem może znać tylko swoją część
+    ścieżki - prefiks to wtedy początek żądanej ścieżki przed fragmentem,
+    który pasuje do wzorca trasy.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    pattern = getattr(route, "path_regex", None)
+    if template is None or pattern is None:
+        return UNMATCHED_ROUTE
+    path = scope["path"]
+    for i, char in enumerate(path):
+        if char == "/" and pattern.match(path[i:]):
+            return path[:i] + template
+    return template
+
+
+def _is_multipart(scope) -> bool:
+    for key, value in scope.get("headers", ()):
+        if key == b"content-type":
+            return value.startswith(b"multipart/")
+    return False
+
+
+def instrument_engine(engine):
+    """Podpina liczniki zapytań i puli pod zdarzenia silnika."""
+    if not enabled:
+        return
+    pool = engine.pool
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_query_start")
+        if starts:
+            QUERY_DURATION.observe(time.perf_counter() - starts.pop())
+
+    @event.listens_for(pool, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        POOL_CHECKOUTS.inc()
+        overflow = getattr(pool, "overflow", None)
+        if overflow is not None and overflow() > 0:
+            POOL_OVERFLOW_CHECKOUTS.inc()
+
+    # Pula nie ma zdarzenia przed pobraniem, więc czas czekania mierzymy wokół `pool.connect`
+    # (przez nie idzie każde połączenie silnika; po `engine.dispose()` trzeba podpiąć na nowo)
+    connect = pool.connect
+
+    def _timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+    pool.connect = _timed_connect
+
+    # Stan puli czytany przy scrapowaniu (StaticPool/NullPool nie mają tych metod)
+    for gauge, name in ((POOL_CHECKED_OUT, "checkedout"), (POOL_SIZE, "size")):
+        reader = getattr(pool, name, None)
+        if reader is not None:
+            gauge.set_function(reader)
+    overflow = getattr(pool, "overflow", None)
+    if overflow is not None:
+        # QueuePool.overflow() jest ujemne, dopóki pula nie otworzy wszystkich `pool_size` połączeń
+        POOL_OVERFLOW.set_function(lambda: max(overflow(), 0))
+
+
+def _collect_threadpool():
+    from anyio import to_thread
+
+    limiter = to_thread.current_default_thread_limiter()
+    THREADPOOL_BUSY.set(limiter.borrowed_tokens)
+    THREADPOOL_SIZE.set(limiter.total_tokens)
+    THREADPOOL_WAITING.set(limiter.statistics().tasks_waiting)
+
+
+def render() -> Optional[tuple]:
+    """(treść, content type) do odpowiedzi `/metrics`; None, gdy metryki są wyłączone.
+
+    Wywoływać w pętli zdarzeń (endpoint async), bo limiter wątków AnyIO jest jej przypisany.
+    """
+    if not enabled:
+        return None
+    _collect_threadpool()
+    return generate_latest(), CONTENT_TYPE_LATEST
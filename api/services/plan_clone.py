@@ -0,0 +1,66 @@
+"""Klonowanie planów i szablony planów - kopiowanie zbiorowe po stronie bazy.
+
+Kopia planu to trzy instrukcje w jednej transakcji, niezależnie od liczby
+tygodni i treningów:
+
+1. INSERT nowego wiersza `plan`,
+2. INSERT ... SELECT tygodni źródła; każdy nowy tydzień zapamiętuje w
+   `source_week_id` id tygodnia, z którego powstał,
+3. INSERT ... SELECT treningów źródła złączonych z nowymi tygodniami po
+   `source_week_id` - to przemapowuje `week_id` bez czytania wierszy do Pythona.
+
+Szablon to zwykły plan z `is_template`: zapisany raz, nie trafia na listę
+planów ani do analityki sezonu, a nowy plan powstaje z niego tym samym
+klonowaniem. Treningi kopii zawsze startują jako nieukończone.
+"""
+import datetime
+from typing import Optional
+
+from sqlalchemy import and_, false, insert, literal, select, Integer
+from sqlalchemy.orm import Session
+
+from models.plan import Plan, WeekPlan, WorkoutPlan
+
+
+def clone_plan(
+    db: Session,
+    source: Plan,
+    event_date: datetime.date,
+    name: Optional[str] = None,
+    is_template: bool = False,
+) -> Plan:
+    """Kopiuje plan `source` (z tygodniami i treningami) w bieżącej transakcji.
+
+    Commit robi wywołujący; zwraca nowy plan (z nadanym id).
+    """
+    db_plan = Plan(name=name or source.name, event_date=event_date, is_template=is_template)
+    db.add(db_plan)
+    db.flush()  # To get plan ID
+    new_plan_id = literal(db_plan.id, Integer)
+
+    weeks = WeekPlan.__table__
+    db.execute(
+        insert(weeks).from_select(
+            ["plan_id", "position", "notes", "source_week_id"],
+            select(new_plan_id, weeks.c.position, weeks.c.notes, weeks.c.id)
+            .where(weeks.c.plan_id == source.id),
+        )
+    )
+
+    workouts = WorkoutPlan.__table__
+    new_weeks = weeks.alias("new_week")
+    db.execute(
+        insert(workouts).from_select(
+            ["plan_id", "week_id", "name", "description", "day_of_week", "completed", "notes", "work_id"],
+            select(
+                new_plan_id, new_weeks.c.id, workouts.c.name, workouts.c.description,
+                workouts.c.day_of_week, false(), workouts.c.notes, workouts.c.work_id,
+            )
+            .select_from(workouts.join(new_weeks, and_(
+                new_weeks.c.plan_id == db_plan.id,
+                new_weeks.c.source_week_id == workouts.c.week_id,
+            )))
+            .where(workouts.c.plan_id == source.id),
+        )
+    )
+    return db_plan
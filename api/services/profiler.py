@@ -0,0 +1,186 @@
+"""Profiler SQL per żądanie (włączany zmienną `SQL_PROFILE=1`).
+
+Zdarzenia `before_cursor_execute`/`after_cursor_execute` silnika zapisują
+każde zapytanie bieżącego żądania (czas, odcisk kształtu). Po odpowiedzi:
+- zapytania o tym samym odcisku powtórzone co najmniej `SQL_NPLUS1_THRESHOLD`
+  razy są zgłaszane jako podejrzenie N+1 (np. leniwe ładowanie relacji
+  podczas serializacji `response_model`),
+- zapytania wolniejsze niż `SQL_SLOW_MS` są zgłaszane z planem `EXPLAIN`
+  (pobieranym od razu, na surowym kursorze tego samego połączenia).
+Raport jest logowany jako JSON (logger `sql_profiler`): z problemami na
+poziomie WARNING, bez nich - DEBUG. `SQL_PROFILE_SAMPLE` (0-1) to odsetek
+profilowanych żądań, a `SQL_PROFILE_HEADER=1` dodaje do odpowiedzi nagłówek
+`X-SQL-Profile` z podsumowaniem (tylko do debugowania).
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger("sql_profiler")
+
+enabled = os.environ.get("SQL_PROFILE", "0") == "1"
+SAMPLE_RATE = float(os.environ.get("SQL_PROFILE_SAMPLE", "1"))
+SLOW_MS = float(os.environ.get("SQL_SLOW_MS", "100"))
+NPLUS1_THRESHOLD = int(os.environ.get("SQL_NPLUS1_THRESHOLD", "5"))
+EXPOSE_HEADER = os.environ.get("SQL_PROFILE_HEADER", "0") == "1"
+
+PROFILE_HEADER = "X-SQL-Profile"
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_PARAMS = re.compile(r"%\(\w+\)s|%s|:\w+|\?")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Kształt zapytania: bez literałów i parametrów, listy IN zwinięte do `(?+)`."""
+    shape = _SPACES.sub(" ", statement).strip()
+    shape = _LITERALS.sub("?", shape)
+    shape = _PARAMS.sub("?", shape)
+    return _PLACEHOLDER_LISTS.sub("(?+)", shape)
+
+
+class Query:
+    __slots__ = ("fingerprint", "statement", "duration_ms", "explain")
+
+    def __init__(self, statement: str, duration_ms: float, explain: Optional[list] = None):
+        self.fingerprint = fingerprint(statement)
+        self.statement = statement
+        self.duration_ms = duration_ms
+        self.explain = explain
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries: List[Query] = []
+
+    @property
+    def total_ms(self) -> float:
+        return sum(query.duration_ms for query in self.queries)
+
+    def repeated(self) -> List[dict]:
+        groups = defaultdict(list)
+        for query in self.queries:
+            groups[query.fingerprint].append(query)
+        return sorted((
+            {
+                "fingerprint": hashlib.sha1(shape.encode()).hexdigest()[:12],
+                "count": len(queries),
+                "total_ms": round(sum(query.duration_ms for query in queries), 2),
+                "statement": shape,
+            }
+            for shape, queries in groups.items() if len(queries) >= NPLUS1_THRESHOLD
+        ), key=lambda group: -group["count"])
+
+    def slow(self) -> List[dict]:
+        return [
+            {"duration_ms": round(query.duration_ms, 2), "statement": query.statement, "explain": query.explain}
+            for query in self.queries if query.duration_ms >= SLOW_MS
+        ]
+
+    def summary(self) -> str:
+        return (
+            f"queries={len(self.queries)}; time_ms={self.total_ms:.1f}; "
+            f"n_plus_one={len(self.repeated())}; slow={len(self.slow())}"
+        )
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("sql_profile", default=None)
+
+
+class SqlProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or random.random() >= SAMPLE_RATE:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        status = None
+
+        async def profiled_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if EXPOSE_HEADER:
+                    # Handler już skończył pracę - zapytania serializacji też są policzone
+                    headers = list(message.get("headers", []))
+                    headers.append((PROFILE_HEADER.lower().encode(), profile.summary().encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, profiled_send)
+        finally:
+            _current.reset(token)
+            _report(scope, status, profile, (time.perf_counter() - start) * 1000)
+
+
+def _report(scope, status, profile: RequestProfile, elapsed_ms: float):
+    repeated = profile.repeated()
+    slow = profile.slow()
+    level = logging.WARNING if repeated or slow else logging.DEBUG
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(level, json.dumps({
+        "event": "sql_profile",
+        "method": scope["method"],
+        "path": scope["path"],
+        "status": status,
+        "request_ms": round(elapsed_ms, 2),
+        "queries": len(profile.queries),
+        "query_ms": round(profile.total_ms, 2),
+        "n_plus_one": repeated,
+        "slow": slow,
+    }, ensure_ascii=False, default=str))
+
+
+def _explain(conn, statement: str, parameters) -> Optional[list]:
+    """Plan zapytania z surowego kursora DBAPI (bez zdarzeń silnika i bez wpływu na transakcję ORM)."""
+    if not statement.lstrip().upper().startswith("SELECT"):
+        return None
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [list(row) for row in cursor.fetchall()]
+    except Exception as e:
+        return [f"EXPLAIN failed: {e}"]
+    finally:
+        cursor.close()
+
+
+def instrument_engine(engine):
+    """Podpina profiler pod zdarzenia silnika."""
+    if not enabled:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("profiler_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        profile = _current.get()
+        starts = conn.info.get("profiler_query_start")
+        if profile is None or not starts:
+            return
+        duration_ms = (time.perf_counter() - starts.pop()) * 1000
+        explain = None
+        if duration_ms >= SLOW_MS and not executemany:
+            explain = _explain(conn, statement, parameters)
+        profile.queries.append(Query(statement, duration_ms, explain))
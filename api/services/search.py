@@ -0,0 +1,308 @@
+"""Wyszukiwanie pełnotekstowe ćwiczeń w pamięci procesu.
+
+Indeks odwrócony po polach `name`, `instructions` i `enrichment` z rankingiem
+BM25, dopasowaniem prefiksów (wyszukiwanie w trakcie pisania) i tolerancją
+pojedynczej literówki (sąsiedztwo usunięć w stylu SymSpell). Indeks budowany
+jest leniwie z bazy i aktualizowany przez endpointy tworzące, edytujące
+i usuwające ćwiczenia, więc zapytanie nie dotyka bazy danych.
+
+Punktacja jest wektorowa: lista wystąpień terminu jest kompilowana (leniwie,
+po każdej zmianie terminu) do tablic numpy `id`/ważona liczba wystąpień,
+a wyniki tokenów sumowane są w gęstej tablicy indeksowanej id ćwiczenia.
+Zbiór trafień wraca jako bitmapa zgodna z `services/tag_index.py`, więc
+facety i filtr tagów to AND bitmap, a stronę wyników wybiera częściowe
+sortowanie (`argpartition`) zamiast sortowania wszystkich trafień.
+
+Indeks jest lokalny dla procesu - przy kilku workerach każdy ma własną kopię.
+"""
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from services.tag_index import bits_from_mask, mask_from_bits
+
+FIELD_WEIGHTS = {"name": 3.0, "instructions": 1.0, "enrichment": 1.0}
+
+# Waga dopasowania w zależności od jego rodzaju
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.7
+FUZZY_MATCH = 0.5
+
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_EXPANSIONS = 64
+MIN_FUZZY_LENGTH = 4
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_TRANSLITERATION = str.maketrans({"ł": "l", "Ł": "l", "ß": "ss"})
+
+
+def normalize(text: str) -> str:
+    text = text.translate(_TRANSLITERATION).lower()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def _deletes(term: str) -> Set[str]:
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Odległość Damerau-Levenshteina <= 1 (bez liczenia całej macierzy)."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diff = [i for i in range(la) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return (
+            len(diff) == 2 and diff[1] == diff[0] + 1
+            and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+        )
+    if la > lb:
+        a, b = b, a
+    # b jest dłuższe o jeden znak - szukamy pozycji wstawienia
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+class ExerciseSearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._reset()
+
+    def _reset(self):
+        # termin -> {id ćwiczenia: ważona liczba wystąpień}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_terms: Dict[int, Set[str]] = {}
+        self._doc_length: Dict[int, float] = {}
+        self._total_length = 0.0
+        # termin -> (id rosnąco, ważone liczby wystąpień); usuwane przy zmianie terminu
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        # Długości dokumentów indeksowane id ćwiczenia (0 dla brakujących id)
+        self._lengths = np.zeros(0)
+        self._sorted_terms: List[str] = []
+        self._delete_index: Dict[str, Set[str]] = defaultdict(set)
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    # Budowanie i aktualizacja
+    def build(self, db: Session):
+        from models.exercise import Exercise
+
+        with self._lock:
+            self._reset()
+            rows = db.query(
+                Exercise.id, Exercise.name, Exercise.instructions, Exercise.enrichment
+            ).yield_per(1000)
+            for ex_id, name, instructions, enrichment in rows:
+                self._add(ex_id, name, instructions, enrichment)
+            self._built = True
+
+    def ensure_built(self, db: Session):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.build(db)
+
+    def upsert(self, exercise):
+        """Aktualizuje wpis po zapisaniu ćwiczenia (obiekt modelu `Exercise`)."""
+        with self._lock:
+            if not self._built:
+                return
+            self._remove(exercise.id)
+            self._add(exercise.id, exercise.name, exercise.instructions, exercise.enrichment)
+
+    def remove(self, exercise_ids: Iterable[int]):
+        with self._lock:
+            if not self._built:
+                return
+            for ex_id in exercise_ids:
+                self._remove(ex_id)
+
+    def _add(self, ex_id, name, instructions, enrichment):
+        frequencies: Dict[str, float] = defaultdict(float)
+        for field, text in (("name", name), ("instructions", instructions), ("enrichment", enrichment)):
+            for token in tokenize(text):
+                frequencies[token] += FIELD_WEIGHTS[field]
+
+        for term, weight in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._register_term(term)
+            postings[ex_id] = weight
+            self._arrays.pop(term, None)
+
+        length = sum(frequencies.values())
+        self._doc_terms[ex_id] = set(frequencies)
+        self._doc_length[ex_id] = length
+        self._total_length += length
+        if ex_id >= len(self._lengths):
+            grown = np.zeros(max(ex_id + 1, 2 * len(self._lengths)))
+            grown[:len(self._lengths)] = self._lengths
+            self._lengths = grown
+        self._lengths[ex_id] = length
+
+    def _remove(self, ex_id):
+        terms = self._doc_terms.pop(ex_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(ex_id, None)
+            self._arrays.pop(term, None)
+            if not postings:
+                del self._postings[term]
+                self._unregister_term(term)
+        self._total_length -= self._doc_length.pop(ex_id)
+        self._lengths[ex_id] = 0.0
+
+    def _register_term(self, term: str):
+        position = bisect_left(self._sorted_terms, term)
+        self._sorted_terms.insert(position, term)
+        if len(term) >= MIN_FUZZY_LENGTH:
+            for deleted in _deletes(term):
+                self._delete_index[deleted].add(term)
+
+    def _unregister_term(self, term: str):
+        position = bisect_left(self._sorted_terms, term)
+        if position < len(self._sorted_terms) and self._sorted_terms[position] == term:
+            del self._sorted_terms[position]
+        if len(term) >= MIN_FUZZY_LENGTH:
+            for deleted in _deletes(term):
+                bucket = self._delete_index.get(deleted)
+                if bucket is not None:
+                    bucket.discard(term)
+                    if not bucket:
+                        del self._delete_index[deleted]
+
+    # Zapytania
+    def _expand(self, token: str) -> Dict[str, float]:
+        """Zwraca terminy indeksu pasujące do tokenu zapytania wraz z wagą dopasowania."""
+        matches: Dict[str, float] = {}
+        if token in self._postings:
+            matches[token] = EXACT_MATCH
+
+        if len(token) >= MIN_PREFIX_LENGTH:
+            position = bisect_left(self._sorted_terms, token)
+            for term in self._sorted_terms[position:position + MAX_PREFIX_EXPANSIONS]:
+                if not term.startswith(token):
+                    break
+                matches.setdefault(term, PREFIX_MATCH)
+
+        if len(token) >= MIN_FUZZY_LENGTH:
+            candidates = set(self._delete_index.get(token, ()))
+            for deleted in _deletes(token):
+                if deleted in self._postings:
+                    candidates.add(deleted)
+                candidates.update(self._delete_index.get(deleted, ()))
+            for term in candidates:
+                if term not in matches and _within_one_edit(token, term):
+                    matches[term] = FUZZY_MATCH
+        return matches
+
+    def _term_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            ids = np.fromiter(postings, dtype=np.int64, count=len(postings))
+            frequencies = np.fromiter(postings.values(), dtype=np.float64, count=len(postings))
+            order = np.argsort(ids)
+            arrays = self._arrays[term] = (ids[order], frequencies[order])
+        return arrays
+
+    def search(
+        self,
+        query: str,
+        allowed: Optional[int] = None,
+        limit: int = 20,
+        after: Optional[Tuple[float, int]] = None,
+    ) -> Tuple[List[Tuple[int, float]], int]:
+        """Zwraca (strona wyników [(id, score)], bitmapa wszystkich trafień).
+
+        Każdy token zapytania musi pasować (dokładnie, prefiksem lub z jedną
+        literówką). `allowed` (bitmapa) zawęża wyniki, np. do ćwiczeń
+        z wybranymi tagami. Wyniki są posortowane malejąco po score, a przy
+        remisie rosnąco po id; `after` to (score, id) ostatniego wyniku
+        poprzedniej strony.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return [], 0
+
+        with self._lock:
+            scores = self._score(tokens)
+        if scores is None:
+            return [], 0
+        if allowed is not None:
+            scores[~mask_from_bits(allowed, len(scores))] = 0.0
+
+        matched = scores > 0
+        ids = np.flatnonzero(matched)
+        ranked = scores[ids]
+        if after is not None:
+            after_score, after_id = after
+            later = (ranked < after_score) | ((ranked == after_score) & (ids > after_id))
+            ids, ranked = ids[later], ranked[later]
+        if len(ids) > limit:
+            # Progowy score k-tego wyniku; remisy na progu zostają, żeby kolejność po id była pełna
+            threshold = np.partition(ranked, len(ranked) - limit)[len(ranked) - limit]
+            top = ranked >= threshold
+            ids, ranked = ids[top], ranked[top]
+        order = np.lexsort((ids, -ranked))[:limit]
+        page = [(int(ex_id), float(score)) for ex_id, score in zip(ids[order], ranked[order])]
+        return page, bits_from_mask(matched)
+
+    def _score(self, tokens: List[str]) -> Optional[np.ndarray]:
+        """Gęsta tablica score indeksowana id ćwiczenia (0 = brak trafienia)."""
+        doc_count = len(self._doc_terms)
+        if not doc_count:
+            return None
+        average_length = self._total_length / doc_count or 1.0
+
+        scores: Optional[np.ndarray] = None
+        for token in dict.fromkeys(tokens):
+            token_scores = np.zeros(len(self._lengths))
+            for term, match_weight in self._expand(token).items():
+                ids, frequencies = self._term_arrays(term)
+                idf = math.log(1 + (doc_count - len(ids) + 0.5) / (len(ids) + 0.5))
+                norm = 1 - BM25_B + BM25_B * self._lengths[ids] / average_length
+                bm25 = match_weight * idf * frequencies * (BM25_K1 + 1) / (frequencies + BM25_K1 * norm)
+                # Przy kilku pasujących terminach liczy się najlepszy (id w terminie są unikalne)
+                token_scores[ids] = np.maximum(token_scores[ids], bm25)
+
+            if scores is None:
+                scores = token_scores
+            else:
+                # Każdy token musi pasować - score > 0 tylko tam, gdzie pasowały wszystkie
+                scores = np.where((scores > 0) & (token_scores > 0), scores + token_scores, 0.0)
+            if not scores.any():
+                return None
+        return scores
+
+
+exercise_index = ExerciseSearchIndex()
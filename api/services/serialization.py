@@ -0,0 +1,203 @@
+"""Szybka ścieżka serializacji dużych list (opcjonalna, `?fast=true`).
+
+Zamiast ładować obiekty ORM, przechodzić po relacjach przez `from_attributes`
+i walidować wynik modelem Pydantic, listy są składane z krotek zwracanych
+przez zapytania o konkretne kolumny (po jednym zapytaniu na poziom drzewa)
+i kodowane przez orjson. Projekcje (`Projection`) są budowane raz przy
+imporcie modułu, więc na wiersz przypada tylko `dict(zip(...))`.
+
+Kształt JSON-a jest taki sam jak w odpowiedziach `*Response`; dzieci
+(sekcje, ćwiczenia, tygodnie, treningi) są sortowane po pozycji/id.
+Pydantic nadal waliduje ciała żądań.
+
+Zestawy pól (`Fieldset`) opisują, co listy mogą zwrócić przy `fields=` /
+`view=summary`: wybrane kolumny, liczniki dzieci zamiast tablic dzieci i
+ewentualnie dołączane dzieci.
+"""
+import datetime
+import enum
+import json
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models.analyser import Analyser, AnnotationAnalyser, CroppedVideo
+from models.exercise import Exercise
+from models.plan import Plan, WeekPlan, WorkoutPlan
+from models.tag import ExerciseTag, Tag
+from models.workout import SectionExercise, Workout, WorkoutExercise, WorkoutSection
+from utils.fieldsets import Fieldset
+
+try:
+    import orjson
+except ImportError:  # orjson jest opcjonalny - bez niego kodujemy biblioteką standardową
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class Projection:
+    """Lista kolumn i funkcja zamieniająca krotkę wyniku na słownik."""
+
+    def __init__(self, *columns):
+        self.columns = list(columns)
+        self.keys = tuple(column.key for column in columns)
+
+    def dict(self, row) -> dict:
+        return dict(zip(self.keys, row))
+
+    def dicts(self, rows: Iterable) -> List[dict]:
+        keys = self.keys
+        return [dict(zip(keys, row)) for row in rows]
+
+
+TAG = Projection(Tag.id, Tag.name)
+EXERCISE = Projection(
+    Exercise.id, Exercise.name, Exercise.instructions, Exercise.enrichment, Exercise.videoUrl, Exercise.crop_id
+)
+WORKOUT = Projection(
+    Workout.id, Workout.title, Workout.description, Workout.duration, Workout.created_at, Workout.estimated_duration
+)
+SECTION = Projection(
+    WorkoutSection.id, WorkoutSection.work_id, WorkoutSection.name, WorkoutSection.position,
+    WorkoutSection.estimated_duration,
+)
+WORKOUT_EXERCISE = Projection(
+    WorkoutExercise.id, WorkoutExercise.ex_id, WorkoutExercise.sets, WorkoutExercise.quantity,
+    WorkoutExercise.unit, WorkoutExercise.duration, WorkoutExercise.rest, WorkoutExercise.position,
+    Exercise.name, Exercise.videoUrl,
+)
+PLAN = Projection(Plan.id, Plan.name, Plan.event_date, Plan.is_template)
+WEEK = Projection(WeekPlan.id, WeekPlan.plan_id, WeekPlan.position, WeekPlan.notes)
+WORKOUT_PLAN = Projection(
+    WorkoutPlan.id, WorkoutPlan.plan_id, WorkoutPlan.week_id, WorkoutPlan.name, WorkoutPlan.description,
+    WorkoutPlan.day_of_week, WorkoutPlan.completed, WorkoutPlan.notes, WorkoutPlan.work_id,
+)
+
+
+def _group(rows: List[dict], key: str) -> Dict[int, List[dict]]:
+    groups: Dict[int, List[dict]] = defaultdict(list)
+    for row in rows:
+        groups[row[key]].append(row)
+    return groups
+
+
+def attach_exercise_tags(db: Session, exercises: List[dict]) -> List[dict]:
+    """Uzupełnia `tags` listy ćwiczeń (wiersze z `EXERCISE`)."""
+    ids = [exercise["id"] for exercise in exercises]
+    tags: Dict[int, List[dict]] = defaultdict(list)
+    if ids:
+        rows = (
+            db.query(ExerciseTag.ex_id, *TAG.columns)
+            .join(Tag, Tag.id == ExerciseTag.tag_id)
+            .filter(ExerciseTag.ex_id.in_(ids))
+            .order_by(ExerciseTag.ex_id, Tag.id)
+        )
+        for ex_id, *tag in rows:
+            tags[ex_id].append(TAG.dict(tag))
+    for exercise in exercises:
+        exercise["tags"] = tags.get(exercise["id"], [])
+    return exercises
+
+
+def attach_workout_sections(db: Session, workouts: List[dict]) -> List[dict]:
+    """Uzupełnia `sections` (z ćwiczeniami) listy treningów (wiersze z `WORKOUT`)."""
+    ids = [workout["id"] for workout in workouts]
+    sections = SECTION.dicts(
+        db.query(*SECTION.columns)
+        .filter(WorkoutSection.work_id.in_(ids))
+        .order_by(WorkoutSection.work_id, WorkoutSection.position, WorkoutSection.id)
+    ) if ids else []
+
+    section_ids = [section["id"] for section in sections]
+    exercises: Dict[int, List[dict]] = defaultdict(list)
+    if section_ids:
+        rows = (
+            db.query(SectionExercise.section_id, *WORKOUT_EXERCISE.columns)
+            .join(WorkoutExercise, WorkoutExercise.id == SectionExercise.work_exercise_id)
+            .outerjoin(Exercise, Exercise.id == WorkoutExercise.ex_id)
+            .filter(SectionExercise.section_id.in_(section_ids))
+            .order_by(SectionExercise.section_id, SectionExercise.position)
+        )
+        for section_id, *exercise in rows:
+            exercises[section_id].append(WORKOUT_EXERCISE.dict(exercise))
+
+    for section in sections:
+        section["exercises"] = exercises.get(section["id"], [])
+    by_workout = _group(sections, "work_id")
+    for workout in workouts:
+        workout["sections"] = by_workout.get(workout["id"], [])
+    return workouts
+
+
+def attach_plan_weeks(db: Session, plans: List[dict]) -> List[dict]:
+    """Uzupełnia `weeks` (z treningami) listy planów (wiersze z `PLAN`)."""
+    ids = [plan["id"] for plan in plans]
+    weeks = WEEK.dicts(
+        db.query(*WEEK.columns)
+        .filter(WeekPlan.plan_id.in_(ids))
+        .order_by(WeekPlan.plan_id, WeekPlan.position, WeekPlan.id)
+    ) if ids else []
+    workouts = _group(WORKOUT_PLAN.dicts(
+        db.query(*WORKOUT_PLAN.columns)
+        .filter(WorkoutPlan.plan_id.in_(ids))
+        .order_by(WorkoutPlan.week_id, WorkoutPlan.id)
+    ), "week_id") if ids else {}
+
+    for week in weeks:
+        week["workouts"] = workouts.get(week["id"], [])
+    by_plan = _group(weeks, "plan_id")
+    for plan in plans:
+        plan["weeks"] = by_plan.get(plan["id"], [])
+    return plans
+
+
+def _count(column, *where):
+    return select(func.count(column)).where(*where).scalar_subquery()
+
+
+EXERCISE_FIELDS = Fieldset(
+    EXERCISE.columns,
+    counts={"tags_count": _count(ExerciseTag.tag_id, ExerciseTag.ex_id == Exercise.id)},
+    children={"tags": attach_exercise_tags},
+    summary=("id", "name", "videoUrl", "crop_id", "tags_count"),
+)
+WORKOUT_FIELDS = Fieldset(
+    WORKOUT.columns,
+    counts={"sections_count": _count(WorkoutSection.id, WorkoutSection.work_id == Workout.id)},
+    children={"sections": attach_workout_sections},
+    summary=("id", "title", "duration", "estimated_duration", "created_at", "sections_count"),
+)
+PLAN_FIELDS = Fieldset(
+    PLAN.columns,
+    counts={
+        "weeks_count": _count(WeekPlan.id, WeekPlan.plan_id == Plan.id),
+        "workouts_count": _count(WorkoutPlan.id, WorkoutPlan.plan_id == Plan.id),
+    },
+    children={"weeks": attach_plan_weeks},
+    summary=("id", "name", "event_date", "is_template", "weeks_count", "workouts_count"),
+)
+ANALYSER_FIELDS = Fieldset(
+    [Analyser.id, Analyser.name, Analyser.video_url],
+    counts={
+        "annotations_count": _count(AnnotationAnalyser.id, AnnotationAnalyser.analyser_id == Analyser.id),
+        "cropped_videos_count": _count(
+            CroppedVideo.id, CroppedVideo.anno_id == AnnotationAnalyser.id, AnnotationAnalyser.analyser_id == Analyser.id
+        ),
+    },
+    summary=("id", "name", "video_url", "annotations_count", "cropped_videos_count"),
+)
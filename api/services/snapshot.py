@@ -0,0 +1,184 @@
+"""Zdenormalizowane snapshoty treningów (`workout_snapshot`).
+
+Snapshot to gotowy JSON w kształcie `WorkoutResponse` (z nazwami i wideo
+ćwiczeń), więc wyświetlenie treningu to odczyt jednego wiersza po kluczu
+zamiast złączeń `workouts`, `workout_section`, `section_exercises`,
+`workout_exercise` i `exercises`.
+
+Snapshoty są przebudowywane w tej samej transakcji co zapis, który je
+zmienia (tworzenie/edycja treningu, edycja lub usunięcie użytego ćwiczenia).
+Brakujący snapshot jest budowany przy pierwszym odczycie (w `/api/batch`
+tylko składany, bez zapisu - commit odczytu zamknąłby transakcję batcha).
+
+Konserwacja (z katalogu `api`):
+
+    python -m services.snapshot rebuild       # przebudowuje wszystkie snapshoty
+    python -m services.snapshot check [--fix] # porównuje snapshoty ze stanem tabel
+"""
+import datetime
+import json
+import sys
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import database
+from models.workout import SectionExercise, Workout, WorkoutExercise, WorkoutSection, WorkoutSnapshot
+from services.serialization import WORKOUT, attach_workout_sections, dumps
+
+REBUILD_BATCH_SIZE = 500
+
+
+def workouts_using_exercises(db: Session, exercise_ids: Iterable[int]) -> Set[int]:
+    """Id treningów, w których występuje którekolwiek z ćwiczeń."""
+    exercise_ids = list(exercise_ids)
+    if not exercise_ids:
+        return set()
+    return {
+        workout_id for workout_id, in db.query(WorkoutSection.work_id)
+        .join(SectionExercise, SectionExercise.section_id == WorkoutSection.id)
+        .join(WorkoutExercise, WorkoutExercise.id == SectionExercise.work_exercise_id)
+        .filter(WorkoutExercise.ex_id.in_(exercise_ids))
+        .distinct()
+    }
+
+
+def build_snapshots(db: Session, workout_ids: Iterable[int]) -> Dict[int, tuple]:
+    """Buduje snapshoty z bieżącego stanu tabel: {id: (wersja, body)}."""
+    workout_ids = list(workout_ids)
+    if not workout_ids:
+        return {}
+    rows = db.query(Workout.version, *WORKOUT.columns).filter(Workout.id.in_(workout_ids)).all()
+    versions = {row[1]: row[0] for row in rows}
+    workouts = attach_workout_sections(db, WORKOUT.dicts(row[1:] for row in rows))
+    return {workout["id"]: (versions[workout["id"]], dumps(workout).decode()) for workout in workouts}
+
+
+def refresh_snapshots(db: Session, workout_ids: Iterable[int]) -> Dict[int, str]:
+    """Przebudowuje snapshoty w bieżącej transakcji (commit robi wywołujący).
+
+    Zwraca {id: body}; treningi, których już nie ma, tracą snapshot.
+    """
+    workout_ids = set(workout_ids)
+    if not workout_ids:
+        return {}
+    db.flush()
+    snapshots = build_snapshots(db, workout_ids)
+    now = datetime.datetime.utcnow()
+    # Istniejące snapshoty jednym zapytaniem zamiast merge(), który pyta o każdy osobno
+    existing = {
+        snapshot.work_id: snapshot
+        for snapshot in db.query(WorkoutSnapshot).filter(WorkoutSnapshot.work_id.in_(list(snapshots)))
+    }
+    for workout_id, (version, body) in snapshots.items():
+        snapshot = existing.get(workout_id)
+        if snapshot is None:
+            db.add(WorkoutSnapshot(work_id=workout_id, version=version, body=body, built_at=now))
+        else:
+            snapshot.version, snapshot.body, snapshot.built_at = version, body, now
+    missing = workout_ids - set(snapshots)
+    if missing:
+        db.query(WorkoutSnapshot).filter(WorkoutSnapshot.work_id.in_(missing)).delete(synchronize_session=False)
+    return {workout_id: body for workout_id, (version, body) in snapshots.items()}
+
+
+def read_snapshot(db: Session, workout_id: int) -> Optional[str]:
+    """JSON treningu z jednego wiersza; buduje brakujący snapshot. None, jeśli treningu nie ma."""
+    body = db.query(WorkoutSnapshot.body).filter(WorkoutSnapshot.work_id == workout_id).scalar()
+    if body is not None:
+        return body
+    if database.batch_session.get() is not None:
+        # Sesja batcha: commit zwolniłby jego transakcję, więc snapshot zapisze dopiero odczyt poza batchem
+        snapshot = build_snapshots(db, [workout_id]).get(workout_id)
+        return snapshot[1] if snapshot is not None else None
+    body = refresh_snapshots(db, [workout_id]).get(workout_id)
+    if body is not None:
+        try:
+            db.commit()
+        except IntegrityError:
+            # Równoległy pierwszy odczyt zapisał snapshot wcześniej
+            db.rollback()
+            return db.query(WorkoutSnapshot.body).filter(WorkoutSnapshot.work_id == workout_id).scalar()
+    return body
+
+
+def _batches(db: Session):
+    after = 0
+    while True:
+        ids = [
+            workout_id for workout_id, in db.query(Workout.id)
+            .filter(Workout.id > after).order_by(Workout.id).limit(REBUILD_BATCH_SIZE)
+        ]
+        if not ids:
+            return
+        yield ids
+        after = ids[-1]
+
+
+def rebuild_all(db: Session) -> int:
+    """Przebudowuje wszystkie snapshoty (partiami, commit po każdej partii)."""
+    count = 0
+    for ids in _batches(db):
+        refresh_snapshots(db, ids)
+        db.commit()
+        count += len(ids)
+    db.query(WorkoutSnapshot).filter(~WorkoutSnapshot.work_id.in_(db.query(Workout.id))).delete(synchronize_session=False)
+    db.commit()
+    return count
+
+
+def check_consistency(db: Session, fix: bool = False) -> Dict[str, List[int]]:
+    """Porównuje zapisane snapshoty ze świeżo zbudowanymi.
+
+    Zwraca id treningów pogrupowane wg problemu: `missing` (brak snapshotu),
+    `stale` (inna wersja lub treść) i `orphaned` (snapshot bez treningu).
+    Z `fix=True` od razu je naprawia.
+    """
+    report: Dict[str, List[int]] = {"missing": [], "stale": [], "orphaned": []}
+    for ids in _batches(db):
+        stored = {
+            work_id: (version, body) for work_id, version, body in
+            db.query(WorkoutSnapshot.work_id, WorkoutSnapshot.version, WorkoutSnapshot.body)
+            .filter(WorkoutSnapshot.work_id.in_(ids))
+        }
+        for workout_id, (version, body) in build_snapshots(db, ids).items():
+            if workout_id not in stored:
+                report["missing"].append(workout_id)
+            elif stored[workout_id][0] != version or json.loads(stored[workout_id][1]) != json.loads(body):
+                report["stale"].append(workout_id)
+    report["orphaned"] = [
+        work_id for work_id, in db.query(WorkoutSnapshot.work_id)
+        .filter(~WorkoutSnapshot.work_id.in_(db.query(Workout.id)))
+    ]
+
+    if fix:
+        refresh_snapshots(db, report["missing"] + report["stale"] + report["orphaned"])
+        db.commit()
+    return report
+
+
+def main(argv):
+    from database import SessionLocal
+    import models.exercise, models.tag, models.plan, models.analyser  # noqa: F401 - rejestracja modeli
+
+    command = argv[1] if len(argv) > 1 else "check"
+    with SessionLocal() as db:
+        if command == "rebuild":
+            print(f"Przebudowano snapshoty treningów: {rebuild_all(db)}")
+            return 0
+        if command == "check":
+            fix = "--fix" in argv[2:]
+            report = check_consistency(db, fix=fix)
+            problems = sum(len(ids) for ids in report.values())
+            for kind, ids in report.items():
+                print(f"{kind}: {len(ids)}" + (f" {ids[:20]}" if ids else ""))
+            if problems and fix:
+                print("Naprawiono.")
+            return 1 if problems and not fix else 0
+    print("Użycie: python -m services.snapshot [rebuild | check [--fix]]")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,165 @@
+"""Indeks bitmapowy tag -> ćwiczenia w pamięci procesu.
+
+Każdy tag ma bitmapę, w której bit o numerze `id` ćwiczenia jest ustawiony,
+jeśli ćwiczenie ma ten tag. Bitmapy to zwykłe inty Pythona - operacje
+AND/OR/NOT i `bit_count()` wykonują się w C na całych słowach maszynowych,
+więc zapytania o kombinacje tagów i liczniki nie dotykają bazy ani tabeli
+`exercise_tags`.
+
+Indeks budowany jest przy starcie z `ExerciseTag` i aktualizowany przez
+endpointy zapisujące ćwiczenia. Jest lokalny dla procesu.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+
+def bits_from_ids(ids: Iterable[int]) -> int:
+    ids = list(ids)
+    if not ids:
+        return 0
+    buffer = bytearray(max(ids) // 8 + 1)
+    for i in ids:
+        buffer[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def ids_from_bits(bits: int, after: Optional[int] = None, limit: Optional[int] = None) -> List[int]:
+    """Zwraca rosnąco numery ustawionych bitów (większe od `after`)."""
+    if after is not None:
+        bits &= ~((1 << (after + 1)) - 1)
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    ids = []
+    start = (after + 1) >> 3 if after is not None else 0
+    for index in range(start, len(data)):
+        byte = data[index]
+        if not byte:
+            continue
+        base = index << 3
+        while byte:
+            low = byte & -byte
+            ids.append(base + low.bit_length() - 1)
+            if limit is not None and len(ids) >= limit:
+                return ids
+            byte ^= low
+    return ids
+
+
+def bits_from_mask(mask: np.ndarray) -> int:
+    """Bitmapa z tablicy logicznej indeksowanej id (bez pętli w Pythonie)."""
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+
+def mask_from_bits(bits: int, size: int) -> np.ndarray:
+    """Tablica logiczna długości `size`, odwrotność `bits_from_mask`."""
+    data = bits.to_bytes(max((size + 7) // 8, (bits.bit_length() + 7) // 8), "little")
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8), bitorder="little")[:size].astype(bool)
+
+
+class TagBitmapIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._tag_bits: Dict[int, int] = {}
+        self._exercise_tags: Dict[int, frozenset] = {}
+        self._all = 0
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    @property
+    def all(self) -> int:
+        return self._all
+
+    def build(self, db: Session):
+        from models.exercise import Exercise
+        from models.tag import ExerciseTag
+
+        exercise_ids = [ex_id for ex_id, in db.query(Exercise.id)]
+        exercise_tags: Dict[int, set] = {}
+        tag_members: Dict[int, List[int]] = {}
+        for tag_id, ex_id in db.query(ExerciseTag.tag_id, ExerciseTag.ex_id):
+            exercise_tags.setdefault(ex_id, set()).add(tag_id)
+            tag_members.setdefault(tag_id, []).append(ex_id)
+
+        with self._lock:
+            self._all = bits_from_ids(exercise_ids)
+            self._tag_bits = {tag_id: bits_from_ids(ids) for tag_id, ids in tag_members.items()}
+            self._exercise_tags = {ex_id: frozenset(tags) for ex_id, tags in exercise_tags.items()}
+            self._built = True
+
+    def ensure_built(self, db: Session):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.build(db)
+
+    def set_tags(self, exercise_id: int, tag_ids: Iterable[int]):
+        """Zapisuje aktualny zestaw tagów ćwiczenia (po utworzeniu lub edycji)."""
+        with self._lock:
+            if not self._built:
+                return
+            bit = 1 << exercise_id
+            new_tags = frozenset(tag_ids)
+            old_tags = self._exercise_tags.get(exercise_id, frozenset())
+            for tag_id in old_tags - new_tags:
+                self._tag_bits[tag_id] &= ~bit
+            for tag_id in new_tags - old_tags:
+                self._tag_bits[tag_id] = self._tag_bits.get(tag_id, 0) | bit
+            self._exercise_tags[exercise_id] = new_tags
+            self._all |= bit
+
+    def tags_for(self, exercise_ids: Iterable[int]) -> Dict[int, frozenset]:
+        """Zestawy tagów podanych ćwiczeń (bez ćwiczeń nieotagowanych)."""
+        with self._lock:
+            return {ex_id: self._exercise_tags[ex_id] for ex_id in exercise_ids if ex_id in self._exercise_tags}
+
+    def remove(self, exercise_ids: Iterable[int]):
+        with self._lock:
+            if not self._built:
+                return
+            for exercise_id in exercise_ids:
+                bit = 1 << exercise_id
+                for tag_id in self._exercise_tags.pop(exercise_id, ()):
+                    self._tag_bits[tag_id] &= ~bit
+                self._all &= ~bit
+
+    def query(
+        self,
+        tags_all: Iterable[int] = (),
+        tags_any: Iterable[int] = (),
+        tags_not: Iterable[int] = (),
+    ) -> int:
+        """Bitmapa ćwiczeń mających wszystkie `tags_all`, co najmniej jeden
+        z `tags_any` i żadnego z `tags_not`."""
+        with self._lock:
+            bits = self._all
+            for tag_id in tags_all:
+                bits &= self._tag_bits.get(tag_id, 0)
+            tags_any = list(tags_any)
+            if tags_any:
+                any_bits = 0
+                for tag_id in tags_any:
+                    any_bits |= self._tag_bits.get(tag_id, 0)
+                bits &= any_bits
+            for tag_id in tags_not:
+                bits &= ~self._tag_bits.get(tag_id, 0)
+            return bits
+
+    def counts(self, bits: Optional[int] = None) -> Dict[int, int]:
+        """Liczba ćwiczeń per tag (opcjonalnie tylko w obrębie podanej bitmapy)."""
+        with self._lock:
+            if bits is None:
+                return {tag_id: tag_bits.bit_count() for tag_id, tag_bits in self._tag_bits.items() if tag_bits}
+            counts = {}
+            for tag_id, tag_bits in self._tag_bits.items():
+                count = (tag_bits & bits).bit_count()
+                if count:
+                    counts[tag_id] = count
+            return counts
+
+
+tag_index = TagBitmapIndex()
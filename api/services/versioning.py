@@ -0,0 +1,72 @@
+"""Liczniki wersji agregatów i warunkowe GET-y (ETag / If-None-Match).
+
+`Plan`, `Workout`, `Exercise` i `Analyser` mają kolumnę `version`, którą
+każdy zapis - również zapis wiersza podrzędnego (tydzień, trening w planie,
+adnotacja, przycięte wideo) - podbija jednym UPDATE-em przed commitem.
+Endpointy GET liczą z niej słaby ETag i na pasujące `If-None-Match`
+odpowiadają 304 po jednym zapytaniu o wersję, bez ładowania całego drzewa.
+"""
+from typing import Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+
+ETAG_HEADER = "ETag"
+
+
+def bump_version(db: Session, model, ids: Iterable[int]):
+    """Podbija `version` wskazanych wierszy (w bieżącej transakcji)."""
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return
+    db.query(model).filter(model.id.in_(ids)).update(
+        {model.version: model.version + 1}, synchronize_session=False
+    )
+
+
+def make_etag(model, resource_id: int, version: int) -> str:
+    return f'W/"{model.__tablename__}-{resource_id}-{version}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Porównanie słabe - prefiks W/ nie ma znaczenia
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(","))
+
+
+def conditional(request: Request, response: Response, model, resource_id: int, version: Optional[int]) -> Optional[Response]:
+    """Ustawia ETag na `response`; zwraca 304, jeśli klient ma aktualną wersję.
+
+    Przy `version` None (zasób nie istnieje) nic nie robi - endpoint sam zwróci 404.
+    """
+    if version is None:
+        return None
+    etag = make_etag(model, resource_id, version)
+    response.headers[ETAG_HEADER] = etag
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=304, headers={ETAG_HEADER: etag})
+    return None
+
+
+def check_etag(request: Request, response: Response, db: Session, model, resource_id: int) -> Optional[Response]:
+    """Jedno zapytanie o wersję po kluczu głównym i `conditional`."""
+    version = db.query(model.version).filter(model.id == resource_id).scalar()
+    return conditional(request, response, model, resource_id, version)
+
+
+def parent_version(db: Session, parent, foreign_key, child_id: int) -> Tuple[Optional[int], Optional[int]]:
+    """(id, wersja) agregatu nadrzędnego dla wiersza podrzędnego, np. planu dla tygodnia.
+
+    `foreign_key` to kolumna dziecka wskazująca rodzica (np. `WeekPlan.plan_id`).
+    """
+    child = foreign_key.class_
+    row = (
+        db.query(parent.id, parent.version)
+        .join(child, foreign_key == parent.id)
+        .filter(child.id == child_id)
+        .first()
+    )
+    return (row[0], row[1]) if row else (None, None)
@@ -0,0 +1,73 @@
+"""Testy API: aplikacja przez TestClient na tymczasowej bazie SQLite.
+
+Silnik i sesje powstają przy imporcie `database`, więc `DATABASE_URL`
+ustawiamy przed importem aplikacji, a schemat tworzą migracje raz na
+sesję. Po każdym teście tabele są czyszczone, a stan w pamięci (cache,
+indeks przedziałów adnotacji, bufor edycji) zerowany; indeksy ćwiczeń
+i tagów buduje od nowa start aplikacji w fiksturze `client`.
+
+Uruchamiane z katalogu `api`: `python -m pytest`.
+"""
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parents[1]
+_DATABASE_DIR = tempfile.mkdtemp(prefix="trainhub-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DATABASE_DIR}/test.db"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("METRICS_ENABLED", "0")
+sys.path.insert(0, str(API_DIR))
+# main.py zakłada katalogi ../public względem katalogu roboczego
+os.chdir(API_DIR)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import delete, text  # noqa: E402
+
+import database  # noqa: E402
+from main import app  # noqa: E402
+from models.base import Base  # noqa: E402
+from services.annotation_buffer import annotation_buffer  # noqa: E402
+from services.annotation_index import annotation_index  # noqa: E402
+from services.cache import response_cache  # noqa: E402
+from utils.migrate import upgrade  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    upgrade(database.engine)
+    yield
+    database.engine.dispose()
+    shutil.rmtree(_DATABASE_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    yield
+    annotation_buffer.flush()
+    with database.engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(delete(table))
+    response_cache.clear()
+    annotation_index.clear()
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def scalar(sql: str, **params):
+    """Jedna wartość prosto z bazy (z pominięciem API i cache)."""
+    with database.engine.connect() as conn:
+        return conn.execute(text(sql), params).scalar()
+
+
+def create_exercise(client, name: str = "Przysiad", tag_ids=None) -> int:
+    response = client.post("/api/exercises/", json={"name": name, "tag_ids": tag_ids or []})
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
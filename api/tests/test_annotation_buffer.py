@@ -0,0 +1,132 @@
+"""Bufor zapisu edycji adnotacji: scalanie edycji i czytanie własnych zapisów przed zapisem w tle."""
+import threading
+
+import pytest
+
+from conftest import scalar
+from services.annotation_buffer import annotation_buffer
+
+
+@pytest.fixture
+def annotation(client):
+    analyser = client.post("/api/analysers/", json={"video_url": "/uploads/mecz.mp4", "name": "Mecz"}).json()
+    response = client.post(
+        f"/api/analysers/{analyser['id']}/annotations",
+        json={"analyser_id": analyser["id"], "time_from": "00:00:10", "title": "Początek", "color": "red"},
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def _edit(annotation, **changes):
+    fields = ("time_from", "time_to", "title", "description", "color", "saved")
+    return {**{field: annotation[field] for field in fields}, **changes}
+
+
+def test_edits_are_buffered_and_coalesced(client, annotation):
+    path = f"/api/analysers/annotations/{annotation['id']}"
+    version = scalar("SELECT version FROM analyser WHERE id = :id", id=annotation["analyser_id"])
+
+    # Zapis w tle czeka, dopóki trzymamy blokadę
+    with annotation_buffer._flush_lock:
+        first = client.put(path, json=_edit(annotation, title="Środek", time_from="00:00:20"))
+        second = client.put(path, json=_edit(annotation, title="Koniec", time_from="00:00:30"))
+
+        assert first.status_code == second.status_code == 200
+        assert second.json()["title"] == "Koniec"
+        assert second.json()["start_ms"] == 30000
+        assert annotation_buffer.pending(annotation["id"])["title"] == "Koniec"
+        assert scalar("SELECT title FROM annotation_analyser WHERE id = :id", id=annotation["id"]) == "Początek"
+
+    annotation_buffer.flush()
+    assert annotation_buffer.pending(annotation["id"]) is None
+    assert scalar("SELECT title FROM annotation_analyser WHERE id = :id", id=annotation["id"]) == "Koniec"
+    assert scalar("SELECT start_ms FROM annotation_analyser WHERE id = :id", id=annotation["id"]) == 30000
+    # Dwie edycje - jeden zapis i jedno podbicie wersji analizatora
+    assert scalar("SELECT version FROM analyser WHERE id = :id", id=annotation["analyser_id"]) == version + 1
+
+
+def test_get_reads_buffered_write(client, annotation):
+    path = f"/api/analysers/annotations/{annotation['id']}"
+    before = client.get(path)
+    etag = before.headers["ETag"]
+
+    assert client.put(path, json=_edit(annotation, title="Zmieniona")).status_code == 200
+    after = client.get(path, headers={"If-None-Match": etag})
+
+    assert after.status_code == 200
+    assert after.json()["title"] == "Zmieniona"
+    assert after.headers["ETag"] != etag
+    listed = client.get(f"/api/analysers/{annotation['analyser_id']}/annotations").json()
+    assert [a["title"] for a in listed] == ["Zmieniona"]
+
+
+def test_batch_sees_buffered_write(client, annotation):
+    path = f"/api/analysers/annotations/{annotation['id']}"
+    assert client.put(path, json=_edit(annotation, title="Zmieniona")).status_code == 200
+
+    result = client.post("/api/batch", json={"operations": [{"method": "GET", "path": path}]}).json()
+
+    assert result["results"][0]["body"]["title"] == "Zmieniona"
+
+
+def test_delete_drops_buffered_write(client, annotation):
+    path = f"/api/analysers/annotations/{annotation['id']}"
+    assert client.put(path, json=_edit(annotation, title="Zmieniona")).status_code == 200
+
+    assert client.delete(path).status_code == 200
+    annotation_buffer.flush()
+
+    assert annotation_buffer.pending(annotation["id"]) is None
+    assert scalar("SELECT count(*) FROM annotation_analyser") == 0
+
+
+def test_list_flushes_only_analysers_on_the_page(client, annotation, monkeypatch):
+    other = client.post("/api/analysers/", json={"video_url": "/uploads/inny.mp4", "name": "Inny"}).json()
+    flushed = []
+    flush = annotation_buffer.flush
+
+    def recording_flush(analyser_ids=None):
+        if threading.current_thread().name != "annotation-write-buffer":
+            flushed.append(None if analyser_ids is None else list(analyser_ids))
+        return flush(analyser_ids)
+
+    monkeypatch.setattr(annotation_buffer, "flush", recording_flush)
+    path = f"/api/analysers/annotations/{annotation['id']}"
+    assert client.put(path, json=_edit(annotation, title="Zmieniona")).status_code == 200
+
+    listed = client.get("/api/analysers/", params={"limit": 1})
+
+    assert listed.status_code == 200
+    assert [a["title"] for a in listed.json()[0]["annotations"]] == ["Zmieniona"]
+    assert flushed == [[annotation["analyser_id"]]]
+    assert other["id"] != annotation["analyser_id"]
+
+
+def test_rejected_edit_is_dropped_without_blocking_others(client, annotation):
+    analyser_id = annotation["analyser_id"]
+    broken = client.post(
+        f"/api/analysers/{analyser_id}/annotations",
+        json={"analyser_id": analyser_id, "time_from": "00:00:40", "title": "Druga", "color": "red"},
+    ).json()
+    path = f"/api/analysers/annotations/{annotation['id']}"
+    assert client.put(path, json=_edit(annotation, title="Zmieniona")).status_code == 200
+    # Wartość, której sterownik bazy nie przyjmie
+    annotation_buffer.put(broken["id"], analyser_id, {}, {**_edit(broken), "start_ms": 0, "end_ms": 0, "color": object()})
+
+    assert client.get("/api/analysers/").status_code == 200
+    assert annotation_buffer.pending(broken["id"]) is None
+    assert annotation_buffer.flush() == 0
+    assert scalar("SELECT title FROM annotation_analyser WHERE id = :id", id=annotation["id"]) == "Zmieniona"
+    assert scalar("SELECT color FROM annotation_analyser WHERE id = :id", id=broken["id"]) == "red"
+
+
+def test_edit_the_database_would_reject_is_not_buffered(client, annotation):
+    path = f"/api/analysers/annotations/{annotation['id']}"
+
+    response = client.put(path, json=_edit(annotation, title="x" * 300))
+
+    # Poza buforem - zapis synchroniczny (SQLite nie sprawdza długości, MySQL odrzuci to żądanie)
+    assert response.status_code == 200
+    assert annotation_buffer.pending(annotation["id"]) is None
+    assert len(scalar("SELECT title FROM annotation_analyser WHERE id = :id", id=annotation["id"])) == 300
@@ -0,0 +1,114 @@
+"""`/api/batch`: kolejność, odwołania do wcześniejszych wyników i wycofanie batcha atomowego."""
+import pytest
+
+from conftest import scalar
+
+
+def _batch(client, operations, atomic=False):
+    response = client.post("/api/batch", json={"operations": operations, "atomic": atomic})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+PLAN_WITH_WEEK = [
+    {"id": "plan", "method": "POST", "path": "/api/plans/", "body": {"name": "Sezon", "event_date": "2026-12-01"}},
+    {"id": "week", "method": "POST", "path": "/api/plans/weeks", "body": {"position": 1, "plan_id": "${plan.id}"}},
+]
+# Tydzień z innego planu - błąd po dwóch udanych zapisach
+FAILING = {"id": "entry", "method": "POST", "path": "/api/plans/workouts", "body": {
+    "plan_id": 999, "week_id": "${week.id}", "day_of_week": "Monday",
+}}
+
+
+def test_references_resolve_to_earlier_results(client):
+    result = _batch(client, PLAN_WITH_WEEK + [
+        {"id": "read", "method": "GET", "path": "/api/plans/${plan.id}/weeks"},
+    ])
+
+    assert result["committed"] is True
+    assert [r["status"] for r in result["results"]] == [201, 201, 200]
+    plan, week, weeks = (r["body"] for r in result["results"])
+    assert week["plan_id"] == plan["id"]
+    assert [w["id"] for w in weeks] == [week["id"]]
+
+
+def test_atomic_batch_rolls_back_on_first_error(client):
+    exercise = {"method": "POST", "path": "/api/exercises/", "body": {"name": "Po błędzie", "tag_ids": []}}
+    result = _batch(client, PLAN_WITH_WEEK + [FAILING, exercise], atomic=True)
+
+    assert result["committed"] is False
+    # Batch zatrzymuje się na pierwszym błędzie
+    assert [r["status"] for r in result["results"]] == [201, 201, 400]
+    for table in ("plan", "week_plan", "workout_plan", "exercises"):
+        assert scalar(f"SELECT count(*) FROM {table}") == 0, table
+    assert client.get("/api/plans/").json() == []
+    # Indeksy w pamięci nie pamiętają wycofanych zapisów
+    assert client.get("/api/exercises/search", params={"q": "błędzie"}).json()["items"] == []
+
+
+def test_atomic_batch_commits_when_all_succeed(client):
+    result = _batch(client, PLAN_WITH_WEEK, atomic=True)
+
+    assert result["committed"] is True
+    assert scalar("SELECT count(*) FROM week_plan") == 1
+    plan_id = result["results"][0]["body"]["id"]
+    assert client.get(f"/api/plans/{plan_id}").status_code == 200
+
+
+def test_non_atomic_batch_keeps_earlier_operations(client):
+    result = _batch(client, PLAN_WITH_WEEK + [
+        FAILING,
+        {"method": "GET", "path": "/api/plans/workouts/${entry.id}"},
+    ])
+
+    assert result["committed"] is True
+    assert [r["status"] for r in result["results"]] == [201, 201, 400, 424]
+    assert scalar("SELECT count(*) FROM plan") == 1
+    assert scalar("SELECT count(*) FROM week_plan") == 1
+
+
+def test_rejects_nested_batch(client):
+    response = client.post("/api/batch", json={"operations": [{"method": "POST", "path": "/api/batch"}]})
+    assert response.status_code == 400
+
+
+def _cropped_annotation(client, video_path) -> dict:
+    analyser = client.post("/api/analysers/", json={"video_url": "/uploads/mecz.mp4", "name": "Mecz"}).json()
+    annotation = client.post(
+        f"/api/analysers/{analyser['id']}/annotations",
+        json={"analyser_id": analyser["id"], "time_from": "00:00:10", "title": "Akcja", "color": "red"},
+    ).json()
+    exercise = client.post("/api/exercises/", json={"name": "Wycięte", "tag_ids": []}).json()
+    video_path.write_bytes(b"wideo")
+    cropped = client.post(
+        f"/api/analysers/annotations/{annotation['id']}/cropped-videos",
+        json={"anno_id": annotation["id"], "video_url": str(video_path), "crop_id": exercise["id"]},
+    )
+    assert cropped.status_code == 201, cropped.text
+    return {"analyser": analyser["id"], "annotation": annotation["id"], "exercise": exercise["id"]}
+
+
+@pytest.mark.parametrize("target", ["analyser", "annotation"])
+def test_rolled_back_delete_keeps_video_files(client, tmp_path, target):
+    video_path = tmp_path / "wyciete.mp4"
+    ids = _cropped_annotation(client, video_path)
+    path = f"/api/analysers/{ids['analyser']}" if target == "analyser" else f"/api/analysers/annotations/{ids['annotation']}"
+
+    result = _batch(client, [{"method": "DELETE", "path": path}] + PLAN_WITH_WEEK + [FAILING], atomic=True)
+
+    assert result["committed"] is False
+    assert result["results"][0]["status"] == 200
+    assert video_path.exists()
+    assert scalar("SELECT count(*) FROM cropped_video") == 1
+    assert client.get(f"/api/exercises/{ids['exercise']}").status_code == 200
+
+
+def test_committed_delete_removes_video_files(client, tmp_path):
+    video_path = tmp_path / "wyciete.mp4"
+    ids = _cropped_annotation(client, video_path)
+
+    result = _batch(client, [{"method": "DELETE", "path": f"/api/analysers/annotations/{ids['annotation']}"}], atomic=True)
+
+    assert result["committed"] is True
+    assert not video_path.exists()
+    assert scalar("SELECT count(*) FROM cropped_video") == 0
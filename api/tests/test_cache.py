@@ -0,0 +1,78 @@
+"""Cache odpowiedzi GET: trafienia, unieważnianie po zapisie, generacje i limity."""
+from services.cache import CACHE_HEADER, ResponseCache
+
+
+def _plan(client) -> int:
+    response = client.post("/api/plans/", json={"name": "Sezon", "event_date": "2026-12-01"})
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_second_read_is_a_hit(client):
+    plan_id = _plan(client)
+
+    first = client.get(f"/api/plans/{plan_id}")
+    second = client.get(f"/api/plans/{plan_id}")
+
+    assert first.headers[CACHE_HEADER] == "MISS"
+    assert second.headers[CACHE_HEADER] == "HIT"
+    assert second.json() == first.json()
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+
+def test_write_invalidates_dependent_entries(client):
+    plan_id = _plan(client)
+    other_id = _plan(client)
+    for path in (f"/api/plans/{plan_id}", f"/api/plans/{other_id}", "/api/plans/"):
+        client.get(path)
+
+    assert client.post("/api/plans/weeks", json={"position": 1, "plan_id": plan_id}).status_code == 201
+
+    plan = client.get(f"/api/plans/{plan_id}")
+    assert plan.headers[CACHE_HEADER] == "MISS"
+    assert len(plan.json()["weeks"]) == 1
+    assert client.get("/api/plans/").headers[CACHE_HEADER] == "MISS"
+    # Tagi innego planu nie zostały ruszone
+    assert client.get(f"/api/plans/{other_id}").headers[CACHE_HEADER] == "HIT"
+
+
+def test_query_parameters_are_part_of_the_key(client):
+    _plan(client)
+    _plan(client)
+
+    assert client.get("/api/plans/", params={"limit": 1}).headers[CACHE_HEADER] == "MISS"
+    assert client.get("/api/plans/").headers[CACHE_HEADER] == "MISS"
+    limited = client.get("/api/plans/", params={"limit": 1})
+    assert limited.headers[CACHE_HEADER] == "HIT"
+    assert len(limited.json()) == 1
+
+
+def test_response_computed_before_a_write_is_not_stored():
+    cache = ResponseCache(max_entries=10, max_bytes=1024, ttl=60)
+    entry, generation = cache.get("/api/plans/?")
+    assert entry is None
+
+    cache.invalidate("plans")
+    cache.put("/api/plans/?", b"[]", {}, ["plans"], generation)
+
+    assert cache.get("/api/plans/?")[0] is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResponseCache(max_entries=2, max_bytes=1024, ttl=60)
+    for key in ("a", "b"):
+        cache.put(key, b"{}", {}, [key], cache.get(key)[1])
+    cache.get("a")
+    cache.put("c", b"{}", {}, ["c"], cache.get("c")[1])
+
+    assert cache.get("a")[0] is not None
+    assert cache.get("b")[0] is None
+    assert cache.get("c")[0] is not None
+    assert cache.evictions == 1
+
+
+def test_cache_header_is_exposed_to_browsers(client):
+    response = client.get("/api/plans/", headers={"Origin": "https://app.example"})
+
+    exposed = {name.strip().lower() for name in response.headers["Access-Control-Expose-Headers"].split(",")}
+    assert CACHE_HEADER.lower() in exposed
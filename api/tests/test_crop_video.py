@@ -0,0 +1,26 @@
+"""Wycinanie fragmentu wideo: przycięte wideo zawsze należy do istniejącego ćwiczenia."""
+import pytest
+
+from conftest import create_exercise, scalar
+
+
+def _annotation(client) -> int:
+    analyser = client.post("/api/analysers/", json={"video_url": "/uploads/mecz.mp4", "name": "Mecz"}).json()
+    annotation = client.post(
+        f"/api/analysers/{analyser['id']}/annotations",
+        json={"analyser_id": analyser["id"], "time_from": "00:00:10", "time_to": "00:00:20", "title": "Akcja", "color": "red"},
+    )
+    assert annotation.status_code == 201, annotation.text
+    return annotation.json()["id"]
+
+
+@pytest.mark.parametrize("body, status", [(None, 400), ({}, 400), ({"exercise_id": "1"}, 400), ({"exercise_id": 999}, 404)])
+def test_crop_requires_existing_exercise(client, body, status):
+    create_exercise(client)
+    annotation_id = _annotation(client)
+
+    response = client.post(f"/api/analysers/annotations/{annotation_id}/crop-video", json=body)
+
+    assert response.status_code == status, response.text
+    assert scalar("SELECT count(*) FROM cropped_video") == 0
+    assert scalar("SELECT saved FROM annotation_analyser") == 0
@@ -0,0 +1,47 @@
+"""SQLite: transakcję otwiera pierwszy zapis (`BEGIN IMMEDIATE`), także zapis przez CTE."""
+import pytest
+from sqlalchemy import delete, select, text, update
+
+import database
+from conftest import create_exercise, scalar
+from models.exercise import Exercise
+
+table = Exercise.__table__
+
+
+def _cte_delete():
+    doomed = select(table.c.id).where(table.c.name == "Przysiad").cte("doomed")
+    return delete(table).where(table.c.id.in_(select(doomed.c.id))).add_cte(doomed)
+
+
+def _cte_update():
+    renamed = select(table.c.id).where(table.c.name == "Przysiad").cte("renamed")
+    return update(table).where(table.c.id.in_(select(renamed.c.id))).values(name="Wykrok").add_cte(renamed)
+
+
+@pytest.mark.parametrize("statement", [
+    _cte_delete,
+    _cte_update,
+    lambda: text("WITH doomed AS (SELECT id FROM exercises) DELETE FROM exercises WHERE id IN (SELECT id FROM doomed)"),
+])
+def test_cte_write_opens_transaction(client, statement):
+    create_exercise(client, "Przysiad")
+
+    with database.engine.connect() as conn:
+        compiled = str(statement().compile(dialect=conn.dialect))
+        assert compiled.lstrip().upper().startswith("WITH")
+        conn.execute(statement())
+        assert conn.connection.dbapi_connection.in_transaction
+        conn.rollback()
+
+    # Wycofanie działa, bo zapis nie wykonał się w trybie autocommit
+    assert scalar("SELECT name FROM exercises") == "Przysiad"
+
+
+def test_reads_stay_in_autocommit(client):
+    create_exercise(client, "Przysiad")
+
+    with database.engine.connect() as conn:
+        conn.execute(select(table.c.id))
+        conn.execute(text("WITH ids AS (SELECT id FROM exercises) SELECT count(*) FROM ids"))
+        assert not conn.connection.dbapi_connection.in_transaction
@@ -0,0 +1,143 @@
+"""Usuwanie przez API: zależne wiersze znikają kaskadowo, bez sierot w bazie."""
+import pytest
+
+from conftest import create_exercise, scalar
+
+
+def _analyser(client) -> int:
+    response = client.post("/api/analysers/", json={"video_url": "/uploads/mecz.mp4", "name": "Mecz"})
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def _annotation(client, analyser_id: int, time_from: str = "00:00:10") -> int:
+    response = client.post(
+        f"/api/analysers/{analyser_id}/annotations",
+        json={"analyser_id": analyser_id, "time_from": time_from, "title": "Akcja", "color": "red", "saved": True},
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def _cropped_video(client, annotation_id: int, exercise_id: int) -> int:
+    response = client.post(
+        f"/api/analysers/annotations/{annotation_id}/cropped-videos",
+        json={"anno_id": annotation_id, "video_url": "/uploads/wyciete.mp4", "crop_id": exercise_id},
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def _workout(client, exercise_id: int) -> int:
+    response = client.post("/api/workouts/", json={
+        "title": "Trening A",
+        "sections": [{
+            "name": "Rozgrzewka",
+            "position": 1,
+            "exercises": [{"ex_id": exercise_id, "sets": 3, "quantity": 10, "unit": "ILOŚĆ", "rest": 60, "position": 1}],
+        }],
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def _plan(client, workout_id: int) -> int:
+    response = client.post("/api/plans/", json={"name": "Sezon", "event_date": "2026-12-01"})
+    assert response.status_code == 201, response.text
+    plan_id = response.json()["id"]
+    week = client.post("/api/plans/weeks", json={"position": 1, "plan_id": plan_id})
+    assert week.status_code == 201, week.text
+    entry = client.post("/api/plans/workouts", json={
+        "plan_id": plan_id, "week_id": week.json()["id"], "day_of_week": "Monday", "work_id": workout_id,
+    })
+    assert entry.status_code == 201, entry.text
+    return plan_id
+
+
+def test_delete_analyser_removes_annotations_and_cut_exercises(client):
+    analyser_id = _analyser(client)
+    annotation_id = _annotation(client, analyser_id)
+    exercise_id = create_exercise(client, "Wycięte")
+    _cropped_video(client, annotation_id, exercise_id)
+    workout_id = _workout(client, exercise_id)
+
+    assert client.delete(f"/api/analysers/{analyser_id}").status_code == 200
+
+    assert client.get(f"/api/analysers/{analyser_id}").status_code == 404
+    assert client.get(f"/api/analysers/annotations/{annotation_id}").status_code == 404
+    assert client.get(f"/api/exercises/{exercise_id}").status_code == 404
+    assert scalar("SELECT count(*) FROM cropped_video") == 0
+    assert scalar("SELECT count(*) FROM workout_exercise") == 0
+    # Trening zostaje, ale jego snapshot nie pokazuje już usuniętego ćwiczenia
+    sections = client.get(f"/api/workouts/{workout_id}").json()["sections"]
+    assert [section["exercises"] for section in sections] == [[]]
+
+
+def test_delete_annotation_removes_cropped_videos(client):
+    analyser_id = _analyser(client)
+    kept = _annotation(client, analyser_id, "00:00:01")
+    annotation_id = _annotation(client, analyser_id, "00:00:30")
+    exercise_id = create_exercise(client, "Wycięte")
+    _cropped_video(client, annotation_id, exercise_id)
+
+    assert client.delete(f"/api/analysers/annotations/{annotation_id}").status_code == 200
+
+    assert client.get(f"/api/exercises/{exercise_id}").status_code == 404
+    assert scalar("SELECT count(*) FROM cropped_video") == 0
+    assert [a["id"] for a in client.get(f"/api/analysers/{analyser_id}/annotations").json()] == [kept]
+
+
+def test_delete_exercise_unsaves_annotation(client):
+    client.post("/api/tags/", json={"name": "Nogi"})
+    tag_id = client.get("/api/tags/").json()[0]["id"]
+    analyser_id = _analyser(client)
+    annotation_id = _annotation(client, analyser_id)
+    exercise_id = create_exercise(client, "Wycięte", [tag_id])
+    _cropped_video(client, annotation_id, exercise_id)
+    _workout(client, exercise_id)
+
+    assert client.delete(f"/api/exercises/{exercise_id}").status_code == 200
+
+    assert client.get(f"/api/exercises/{exercise_id}").status_code == 404
+    assert scalar("SELECT count(*) FROM exercise_tags") == 0
+    assert scalar("SELECT count(*) FROM cropped_video") == 0
+    assert scalar("SELECT count(*) FROM section_exercises") == 0
+    annotation = client.get(f"/api/analysers/annotations/{annotation_id}").json()
+    assert annotation["saved"] is False
+    assert annotation["cropped_videos"] == []
+
+
+def test_delete_workout_removes_sections_and_unlinks_plans(client):
+    workout_id = _workout(client, create_exercise(client))
+    plan_id = _plan(client, workout_id)
+
+    assert client.delete(f"/api/workouts/{workout_id}").status_code == 200
+
+    assert client.get(f"/api/workouts/{workout_id}").status_code == 404
+    for table in ("workout_section", "section_exercises", "workout_exercise", "workout_snapshot"):
+        assert scalar(f"SELECT count(*) FROM {table}") == 0, table
+    assert scalar("SELECT work_id FROM workout_plan WHERE plan_id = :plan_id", plan_id=plan_id) is None
+
+
+def test_delete_plan_removes_weeks_and_entries(client):
+    workout_id = _workout(client, create_exercise(client))
+    plan_id = _plan(client, workout_id)
+
+    assert client.delete(f"/api/plans/{plan_id}").status_code == 200
+
+    assert client.get(f"/api/plans/{plan_id}").status_code == 404
+    assert scalar("SELECT count(*) FROM week_plan") == 0
+    assert scalar("SELECT count(*) FROM workout_plan") == 0
+    assert client.get(f"/api/workouts/{workout_id}").status_code == 200
+
+
+@pytest.mark.parametrize("path", [
+    "/api/analysers/999",
+    "/api/analysers/annotations/999",
+    "/api/exercises/999",
+    "/api/workouts/999",
+    "/api/plans/999",
+    "/api/plans/weeks/999",
+])
+def test_delete_missing_returns_404(client, path):
+    assert client.delete(path).status_code == 404
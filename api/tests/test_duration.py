@@ -0,0 +1,35 @@
+"""Przeliczanie zapisanych szacunków czasu (`services.duration.recompute`)."""
+import database
+from conftest import create_exercise, scalar
+from services.duration import recompute
+
+
+def _workout(client, exercise_id: int, sections: int) -> int:
+    body = {"title": "Obwód", "sections": [
+        {"name": f"Sekcja {i}", "position": i, "exercises": [
+            {"ex_id": exercise_id, "sets": 3, "quantity": 10, "unit": "ILOŚĆ", "rest": 60, "position": 1},
+            {"ex_id": exercise_id, "sets": 2, "duration": 45, "unit": "CZAS", "rest": 30, "position": 2},
+        ]} for i in range(1, sections + 1)
+    ]}
+    response = client.post("/api/workouts/", json=body)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_recompute_restores_estimates_of_many_workouts(client):
+    exercise_id = create_exercise(client)
+    workout_ids = [_workout(client, exercise_id, sections) for sections in (1, 2, 3)]
+    expected = {
+        "workouts": scalar("SELECT group_concat(estimated_duration) FROM workouts"),
+        "workout_section": scalar("SELECT group_concat(estimated_duration) FROM workout_section"),
+    }
+    with database.engine.begin() as conn:
+        for table in expected:
+            conn.exec_driver_sql(f"UPDATE {table} SET estimated_duration = NULL")
+
+    with database.SessionLocal() as db:
+        recompute(db, workout_ids)
+        db.commit()
+
+    for table, values in expected.items():
+        assert scalar(f"SELECT group_concat(estimated_duration) FROM {table}") == values, table
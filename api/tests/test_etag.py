@@ -0,0 +1,37 @@
+"""Warunkowe GET-y: ETag z wersji agregatu i 304 na pasujące `If-None-Match`."""
+from conftest import create_exercise
+
+
+def test_not_modified_until_the_aggregate_changes(client):
+    plan_id = client.post("/api/plans/", json={"name": "Sezon", "event_date": "2026-12-01"}).json()["id"]
+    path = f"/api/plans/{plan_id}"
+    etag = client.get(path).headers["ETag"]
+    assert etag == f'W/"plan-{plan_id}-1"'
+
+    not_modified = client.get(path, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+    assert not_modified.content == b""
+
+    # Zapis wiersza podrzędnego podbija wersję planu
+    assert client.post("/api/plans/weeks", json={"position": 1, "plan_id": plan_id}).status_code == 201
+    changed = client.get(path, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] == f'W/"plan-{plan_id}-2"'
+
+
+def test_if_none_match_lists_and_wildcard(client):
+    exercise_id = create_exercise(client)
+    path = f"/api/exercises/{exercise_id}"
+    etag = client.get(path).headers["ETag"]
+
+    assert client.get(path, headers={"If-None-Match": f'W/"inny", {etag.removeprefix("W/")}'}).status_code == 304
+    assert client.get(path, headers={"If-None-Match": "*"}).status_code == 304
+    assert client.get(path, headers={"If-None-Match": 'W/"inny"'}).status_code == 200
+
+
+def test_missing_resource_has_no_etag(client):
+    response = client.get("/api/plans/999", headers={"If-None-Match": "*"})
+
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
@@ -0,0 +1,121 @@
+"""Nagłówek `Idempotency-Key`: odtwarzanie odpowiedzi, czekanie na żądanie w toku i przejmowanie porzuconych kluczy."""
+import datetime
+import json
+import threading
+
+from sqlalchemy import insert
+
+import database
+from conftest import scalar
+from services import idempotency
+
+PATH = "/api/exercises/"
+BODY = json.dumps({"name": "Martwy ciąg", "tag_ids": []}).encode()
+
+
+def _post(client, key: str, body: bytes = BODY):
+    return client.post(PATH, content=body, headers={"Content-Type": "application/json", "Idempotency-Key": key})
+
+
+def _claimed(key: str, lease_seconds: float):
+    """Klucz zajęty przez żądanie w toku (jak po `_claim` w innym procesie)."""
+    now = datetime.datetime.utcnow()
+    with database.engine.begin() as conn:
+        conn.execute(insert(idempotency.table).values(
+            key=key,
+            request_hash=idempotency.request_hash({"method": "POST", "path": PATH, "query_string": b""}, BODY),
+            created_at=now,
+            lease_until=now + datetime.timedelta(seconds=lease_seconds),
+            expires_at=now + datetime.timedelta(seconds=idempotency.TTL),
+        ))
+
+
+def test_replay_returns_stored_response(client):
+    first = _post(client, "klucz-1")
+    second = _post(client, "klucz-1")
+
+    assert first.status_code == second.status_code == 201
+    assert second.json() == first.json()
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert scalar("SELECT count(*) FROM exercises") == 1
+
+
+def test_same_key_different_body_is_rejected(client):
+    assert _post(client, "klucz-1").status_code == 201
+
+    response = _post(client, "klucz-1", json.dumps({"name": "Inne", "tag_ids": []}).encode())
+
+    assert response.status_code == 422
+    assert scalar("SELECT count(*) FROM exercises") == 1
+
+
+def test_server_error_releases_key(client, monkeypatch):
+    monkeypatch.setattr("api.exercise.Exercise", None)
+    assert _post(client, "klucz-1").status_code == 500
+    assert scalar("SELECT count(*) FROM idempotency_key") == 0
+
+    monkeypatch.undo()
+    assert _post(client, "klucz-1").status_code == 201
+
+
+def test_waits_for_request_in_progress(client):
+    _claimed("klucz-1", lease_seconds=60)
+    stored = json.dumps({"id": 42, "name": "Martwy ciąg"}).encode()
+    finish = threading.Timer(0.3, idempotency._store, ("klucz-1", 201, [["content-type", "application/json"]], stored))
+    finish.start()
+    try:
+        response = _post(client, "klucz-1")
+    finally:
+        finish.join()
+
+    assert response.status_code == 201
+    assert response.headers["Idempotent-Replayed"] == "true"
+    assert response.json()["id"] == 42
+    # Drugie żądanie nie wykonało się samo
+    assert scalar("SELECT count(*) FROM exercises") == 0
+
+
+def test_gives_up_waiting_with_409(client, monkeypatch):
+    monkeypatch.setattr(idempotency, "WAIT_TIMEOUT", 0.2)
+    _claimed("klucz-1", lease_seconds=60)
+
+    response = _post(client, "klucz-1")
+
+    assert response.status_code == 409
+    assert scalar("SELECT count(*) FROM exercises") == 0
+
+
+def test_expired_lease_is_taken_over(client):
+    # Proces, który zajął klucz, zginął i przestał odnawiać dzierżawę
+    _claimed("klucz-1", lease_seconds=-1)
+
+    response = _post(client, "klucz-1")
+
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response.headers
+    assert scalar("SELECT count(*) FROM exercises") == 1
+    assert scalar("SELECT status FROM idempotency_key WHERE key = 'klucz-1'") == 201
+
+
+def test_replay_gets_cors_headers_of_its_own_origin(client):
+    headers = {"Content-Type": "application/json", "Idempotency-Key": "klucz-1", "Cookie": "sesja=1"}
+    first = client.post(PATH, content=BODY, headers={**headers, "Origin": "https://a.example"})
+    second = client.post(PATH, content=BODY, headers={**headers, "Origin": "https://b.example"})
+
+    assert first.headers["Access-Control-Allow-Origin"] == "https://a.example"
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.headers["Access-Control-Allow-Origin"] == "https://b.example"
+    stored = dict(json.loads(scalar("SELECT headers FROM idempotency_key WHERE key = 'klucz-1'")))
+    assert set(stored) == {"content-type"}
+
+
+def test_multipart_request_is_not_buffered_or_replayed(client):
+    def upload():
+        return client.post(PATH, files={"file": ("film.mp4", b"\0" * 1024)}, headers={"Idempotency-Key": "klucz-1"})
+
+    first, second = upload(), upload()
+
+    assert first.status_code == second.status_code == 422
+    assert "Idempotent-Replayed" not in second.headers
+    assert scalar("SELECT count(*) FROM idempotency_key") == 0
@@ -0,0 +1,31 @@
+"""Limit rekordów na sekundę (`SamplingFilter`): klucz to miejsce w kodzie, stare okna znikają."""
+import logging
+
+from services import logs
+
+
+def _record(message: str, lineno: int = 10) -> logging.LogRecord:
+    return logging.LogRecord("api.analyser", logging.INFO, "api/analyser.py", lineno, message, (), None)
+
+
+def test_interpolated_messages_from_one_line_share_a_window():
+    sampling = logs.SamplingFilter(rate_limit=3)
+
+    passed = [sampling.filter(_record(f"Sprawdzanie pliku: /uploads/{i}.mp4")) for i in range(10)]
+
+    assert passed == [True] * 3 + [False] * 7
+    assert list(sampling.windows) == [("api.analyser", "api/analyser.py", 10)]
+    assert sampling.filter(_record("Inna linia", lineno=11))
+
+
+def test_stale_windows_are_pruned():
+    sampling = logs.SamplingFilter(rate_limit=3)
+    for lineno in range(100):
+        sampling.filter(_record("Komunikat", lineno))
+    for window in sampling.windows.values():
+        window[0] -= logs.WINDOW_TTL
+    sampling.last_prune -= logs.WINDOW_TTL
+
+    sampling.filter(_record("Komunikat", lineno=500))
+
+    assert list(sampling.windows) == [("api.analyser", "api/analyser.py", 500)]
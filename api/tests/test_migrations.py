@@ -0,0 +1,133 @@
+"""Migracje schematu: nowa baza, baza przejęta z modelu bazowego (legacy) i przepisywanie definicji SQLite."""
+import pytest
+from sqlalchemy import inspect, text
+
+import database
+from models.base import Base
+from utils.migrate import current_version, latest_version, load_migrations, upgrade
+
+# Tabela w postaci z modelu bazowego: klucz obcy crop_id wskazywał exercises.crop_id
+LEGACY_CROPPED_VIDEO = """
+CREATE TABLE cropped_video (
+    id INTEGER NOT NULL,
+    anno_id INTEGER NOT NULL,
+    video_url VARCHAR(255) NOT NULL,
+    crop_id INTEGER NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(anno_id) REFERENCES annotation_analyser (id),
+    FOREIGN KEY(crop_id) REFERENCES exercises (crop_id)
+)
+"""
+
+LEGACY_ROWS = """
+INSERT INTO exercises (id, name) VALUES (1, 'a'), (2, 'b'), (3, 'c');
+INSERT INTO tags (id, name) VALUES (1, 't');
+INSERT INTO exercise_tags (tag_id, ex_id) VALUES (1, 1), (1, 2);
+INSERT INTO analyser (id, video_url, name) VALUES (1, '/uploads/v.mp4', 'analizator');
+INSERT INTO annotation_analyser (id, analyser_id, time_from, title, color, saved) VALUES
+    (1, 1, '00:00:01.000000', 'x', 'red', 1),
+    (2, 1, '00:00:05.000000', 'y', 'red', 1),
+    (3, 1, '00:00:09.000000', 'z', 'red', 0);
+INSERT INTO cropped_video (id, anno_id, video_url, crop_id) VALUES
+    (1, 1, '/uploads/c1.mp4', 1),
+    (2, 2, '/uploads/c2.mp4', 2),
+    (3, 3, '/uploads/c3.mp4', 99);
+"""
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = database.create_database_engine(f"sqlite:///{tmp_path}/migrate.db")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def legacy_engine(engine):
+    """Baza utworzona przez `create_all` modelu bazowego, z danymi - bez tabeli `schema_version`."""
+    with engine.connect() as conn:
+        # Bez transakcji i z wyłączonymi kluczami obcymi - jak stara aplikacja przy tworzeniu bazy
+        conn.exec_driver_sql("PRAGMA foreign_keys = OFF")
+        conn.exec_driver_sql(LEGACY_CROPPED_VIDEO)
+        load_migrations()[0].metadata.create_all(conn, checkfirst=True)
+        for statement in LEGACY_ROWS.split(";"):
+            if statement.strip():
+                conn.exec_driver_sql(statement)
+        conn.commit()
+        conn.exec_driver_sql("PRAGMA foreign_keys = ON")
+    return engine
+
+
+def _foreign_keys(conn, table_name):
+    return {
+        fk["constrained_columns"][0]: (fk["referred_table"], fk["referred_columns"][0], fk["options"].get("ondelete"))
+        for fk in inspect(conn).get_foreign_keys(table_name)
+    }
+
+
+def test_fresh_database_matches_models(engine):
+    assert upgrade(engine) == latest_version()
+
+    with engine.connect() as conn:
+        assert current_version(conn) == latest_version()
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            assert {c["name"] for c in inspector.get_columns(table.name)} == {c.name for c in table.columns}, table.name
+            assert {i["name"] for i in inspector.get_indexes(table.name)} == {i.name for i in table.indexes}, table.name
+
+
+def test_upgrade_is_idempotent(engine):
+    upgrade(engine)
+    assert upgrade(engine) == latest_version()
+
+
+def test_legacy_database_is_repointed_and_cascades(legacy_engine):
+    upgrade(legacy_engine)
+
+    with legacy_engine.connect() as conn:
+        assert _foreign_keys(conn, "cropped_video") == {
+            "anno_id": ("annotation_analyser", "id", "CASCADE"),
+            "crop_id": ("exercises", "id", "CASCADE"),
+        }
+        assert _foreign_keys(conn, "annotation_analyser") == {"analyser_id": ("analyser", "id", "CASCADE")}
+        assert conn.exec_driver_sql("PRAGMA foreign_key_check").all() == []
+        assert conn.exec_driver_sql("PRAGMA integrity_check").scalar() == "ok"
+        # Przycięte wideo wskazujące nieistniejące ćwiczenie jest usuwane; reszta danych zostaje
+        assert conn.exec_driver_sql("SELECT id FROM cropped_video ORDER BY id").scalars().all() == [1, 2]
+        assert conn.exec_driver_sql("SELECT count(*) FROM annotation_analyser").scalar() == 3
+        assert conn.exec_driver_sql("SELECT count(*) FROM exercise_tags").scalar() == 2
+
+    # Kaskady działają także w połączeniu, które wykonało migrację (schemat przeładowany)
+    with legacy_engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM exercises WHERE id = 1")
+        conn.exec_driver_sql("DELETE FROM analyser WHERE id = 1")
+    with legacy_engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM exercise_tags WHERE ex_id = 1").scalar() == 0
+        assert conn.exec_driver_sql("SELECT count(*) FROM annotation_analyser").scalar() == 0
+        assert conn.exec_driver_sql("SELECT count(*) FROM cropped_video").scalar() == 0
+
+
+def test_upgrade_keeps_rows_and_indexes(legacy_engine):
+    upgrade(legacy_engine, 8)
+    with legacy_engine.connect() as conn:
+        indexes = {name: {i["name"] for i in inspect(conn).get_indexes(name)} for name in ("annotation_analyser", "cropped_video")}
+
+    upgrade(legacy_engine)
+
+    with legacy_engine.connect() as conn:
+        assert {name: {i["name"] for i in inspect(conn).get_indexes(name)} for name in indexes} == indexes
+        ranges = conn.exec_driver_sql("SELECT id, start_ms, end_ms FROM annotation_analyser ORDER BY id").all()
+    assert ranges == [(1, 1000, 1000), (2, 5000, 5000), (3, 9000, 9000)]
+
+
+def test_sqlite_ids_are_not_reused_after_upgrade(legacy_engine):
+    upgrade(legacy_engine)
+
+    with legacy_engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM annotation_analyser WHERE id = 3")
+        conn.exec_driver_sql(
+            "INSERT INTO annotation_analyser (analyser_id, time_from, title, color, saved) "
+            "VALUES (1, '00:00:02.000000', 'nowa', 'red', 0)"
+        )
+    with legacy_engine.connect() as conn:
+        assert conn.execute(text("SELECT max(id) FROM annotation_analyser")).scalar() == 4
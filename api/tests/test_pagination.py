@@ -0,0 +1,72 @@
+"""Stronicowanie list po kursorze (`limit`, `cursor`, X-Next-Cursor)."""
+import pytest
+
+from conftest import create_exercise
+from utils import pagination
+from utils.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, decode_cursor, encode_cursor
+
+
+def _walk(client, path: str, limit: int, **params):
+    """Przechodzi listę stronami; zwraca id w kolejności i rozmiary stron."""
+    ids, sizes, cursor = [], [], None
+    while True:
+        query = {**params, "limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(path, params=query)
+        assert response.status_code == 200, response.text
+        page = [item["id"] for item in response.json()]
+        ids += page
+        sizes.append(len(page))
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return ids, sizes
+
+
+def test_cursor_encodes_last_id():
+    assert decode_cursor(encode_cursor(12345)) == 12345
+
+
+@pytest.mark.parametrize("cursor", ["nie-kursor", encode_cursor(1)[:-2] + "!!", encode_cursor(True)])
+def test_invalid_cursor_is_rejected(client, cursor):
+    assert client.get("/api/exercises/", params={"cursor": cursor}).status_code == 400
+
+
+def test_pages_cover_list_once_in_order(client):
+    created = [create_exercise(client, f"Ćwiczenie {i}") for i in range(7)]
+
+    ids, sizes = _walk(client, "/api/exercises/", limit=3)
+
+    assert ids == sorted(created)
+    assert sizes == [3, 3, 1]
+
+
+def test_pages_with_tag_filter(client):
+    tag = client.post("/api/tags/", json={"name": "nogi"})
+    assert tag.status_code == 201
+    tag_id = client.get("/api/tags/").json()[0]["id"]
+    tagged = [create_exercise(client, f"Z tagiem {i}", [tag_id]) for i in range(5)]
+    create_exercise(client, "Bez tagu")
+
+    ids, _ = _walk(client, "/api/exercises/", limit=2, tags_any=tag_id)
+
+    assert ids == sorted(tagged)
+
+
+def test_request_without_cursor_or_limit_returns_whole_list(client, monkeypatch):
+    monkeypatch.setattr(pagination, "DEFAULT_LIMIT", 2)
+    created = [create_exercise(client, f"Ćwiczenie {i}") for i in range(5)]
+
+    response = client.get("/api/exercises/", params={"with_total": True})
+
+    assert [item["id"] for item in response.json()] == created
+    assert NEXT_CURSOR_HEADER not in response.headers
+    assert response.headers[TOTAL_COUNT_HEADER] == "5"
+
+
+def test_cursor_without_limit_uses_default_page(client, monkeypatch):
+    monkeypatch.setattr(pagination, "DEFAULT_LIMIT", 2)
+    created = [create_exercise(client, f"Ćwiczenie {i}") for i in range(5)]
+
+    response = client.get("/api/exercises/", params={"cursor": encode_cursor(created[0])})
+
+    assert [item["id"] for item in response.json()] == created[1:3]
+    assert decode_cursor(response.headers[NEXT_CURSOR_HEADER]) == created[2]
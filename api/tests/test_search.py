@@ -0,0 +1,77 @@
+"""Wyszukiwanie ćwiczeń: ranking, strony po kursorze (score, id) i facety tagów."""
+from conftest import create_exercise
+from utils.pagination import NEXT_CURSOR_HEADER, encode_cursor
+
+
+def _tag(client, name: str) -> int:
+    assert client.post("/api/tags/", json={"name": name}).status_code == 201
+    return next(tag["id"] for tag in client.get("/api/tags/").json() if tag["name"] == name)
+
+
+def _walk(client, limit: int, **params):
+    """Przechodzi wyniki stronami; zwraca trafienia w kolejności i odpowiedzi stron."""
+    items, pages, cursor = [], [], None
+    while True:
+        query = {**params, "limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/exercises/search", params=query)
+        assert response.status_code == 200, response.text
+        items += response.json()["items"]
+        pages.append(response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return items, pages
+
+
+def test_every_token_must_match_and_name_ranks_higher(client):
+    in_name = create_exercise(client, "Przysiad bułgarski")
+    client.post("/api/exercises/", json={"name": "Wykrok", "instructions": "jak przysiad, ale bułgarski"})
+    create_exercise(client, "Przysiad ze sztangą")
+
+    items = client.get("/api/exercises/search", params={"q": "przysiad bulgarski"}).json()["items"]
+
+    assert len(items) == 2
+    assert items[0]["id"] == in_name
+    assert items[0]["score"] > items[1]["score"]
+
+
+def test_pages_cover_ranking_once_in_order(client):
+    # Ten sam tekst daje równe score - kolejność stron rozstrzyga id
+    created = [create_exercise(client, "Pompka") for _ in range(5)]
+    created += [create_exercise(client, f"Pompka pompka {i}") for i in range(3)]
+
+    whole = client.get("/api/exercises/search", params={"q": "pompka", "limit": 100}).json()["items"]
+    items, pages = _walk(client, limit=3, q="pompka")
+
+    assert [item["id"] for item in items] == [item["id"] for item in whole]
+    assert sorted(item["id"] for item in items) == sorted(created)
+    assert [len(page["items"]) for page in pages] == [3, 3, 2]
+    assert all(page["total"] == 8 for page in pages)
+
+
+def test_browsing_without_phrase_pages_by_id(client):
+    created = [create_exercise(client, f"Ćwiczenie {i}") for i in range(5)]
+
+    items, _ = _walk(client, limit=2)
+
+    assert [item["id"] for item in items] == created
+
+
+def test_facets_count_all_matches_within_tag_filter(client):
+    legs, core = _tag(client, "nogi"), _tag(client, "brzuch")
+    for i in range(4):
+        create_exercise(client, f"Deska {i}", [legs, core] if i % 2 else [core])
+    create_exercise(client, "Deska bez tagów")
+    create_exercise(client, "Przysiad", [legs])
+
+    body = client.get("/api/exercises/search", params={"q": "deska", "tags_any": core, "limit": 1}).json()
+
+    assert body["total"] == 4
+    assert {facet["name"]: facet["count"] for facet in body["facets"]} == {"brzuch": 4, "nogi": 2}
+
+
+def test_phrase_search_rejects_cursor_without_score(client):
+    create_exercise(client)
+
+    response = client.get("/api/exercises/search", params={"q": "przysiad", "cursor": encode_cursor(1)})
+
+    assert response.status_code == 400
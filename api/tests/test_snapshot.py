@@ -0,0 +1,61 @@
+"""Snapshoty treningów: zgodność treści z `WorkoutResponse` i odczyt w batchu."""
+import database
+from conftest import create_exercise, scalar
+from models.workout import Workout
+from schemas.workout import WorkoutResponse
+
+
+def _workout_body(exercise_id: int, title: str = "Nogi") -> dict:
+    return {"title": title, "duration": 45, "sections": [
+        {"name": "Rozgrzewka", "position": 1, "exercises": [
+            {"ex_id": exercise_id, "sets": 1, "duration": 300, "unit": "CZAS", "rest": 0, "position": 1},
+        ]},
+        {"name": "Główna", "position": 2, "exercises": [
+            {"ex_id": exercise_id, "sets": 4, "quantity": 8, "unit": "ILOŚĆ", "rest": 90, "position": 1},
+            {"ex_id": exercise_id, "sets": 3, "quantity": 12, "unit": "ILOŚĆ", "rest": 60, "position": 2},
+        ]},
+    ]}
+
+
+def _from_tables(workout_id: int) -> dict:
+    """Odpowiedź zbudowana przez `response_model` z obiektów ORM - wzorzec dla snapshotu."""
+    with database.SessionLocal() as db:
+        workout = db.get(Workout, workout_id)
+        return WorkoutResponse.model_validate(workout).model_dump(mode="json")
+
+
+def test_create_update_and_read_return_workout_response(client):
+    exercise_id = create_exercise(client, "Przysiad")
+
+    created = client.post("/api/workouts/", json=_workout_body(exercise_id))
+    assert created.status_code == 201, created.text
+    workout_id = created.json()["id"]
+    assert WorkoutResponse.model_validate_json(created.content).model_dump(mode="json") == _from_tables(workout_id)
+
+    updated = client.put(f"/api/workouts/{workout_id}", json=_workout_body(exercise_id, "Nogi 2"))
+    assert updated.status_code == 200, updated.text
+    assert WorkoutResponse.model_validate_json(updated.content).model_dump(mode="json") == _from_tables(workout_id)
+
+    read = client.get(f"/api/workouts/{workout_id}")
+    assert read.json() == updated.json()
+
+
+def test_missing_snapshot_read_in_batch_is_not_written(client):
+    exercise_id = create_exercise(client, "Przysiad")
+    workout_id = client.post("/api/workouts/", json=_workout_body(exercise_id)).json()["id"]
+    with database.engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM workout_snapshot")
+
+    response = client.post("/api/batch", json={"atomic": True, "operations": [
+        {"method": "POST", "path": "/api/plans/", "body": {"name": "Sezon", "event_date": "2026-12-01"}},
+        {"method": "GET", "path": f"/api/workouts/{workout_id}"},
+    ]})
+
+    result = response.json()
+    assert result["committed"] is True
+    assert result["results"][1]["body"] == _from_tables(workout_id)
+    assert scalar("SELECT count(*) FROM plan") == 1
+    # Odczyt w batchu tylko złożył snapshot; zapisuje go dopiero odczyt poza batchem
+    assert scalar("SELECT count(*) FROM workout_snapshot") == 0
+    assert client.get(f"/api/workouts/{workout_id}").json() == _from_tables(workout_id)
+    assert scalar("SELECT count(*) FROM workout_snapshot") == 1
@@ -0,0 +1,60 @@
+"""Obciążenie treningowe planów: sumy tygodni i planów oraz kolumnowe rozbicie na tagi."""
+from conftest import create_exercise
+
+
+def _setup(client):
+    for name in ("Nogi", "Core"):
+        client.post("/api/tags/", json={"name": name})
+    tags = {tag["name"]: tag["id"] for tag in client.get("/api/tags/").json()}
+    squat = create_exercise(client, "Przysiad", [tags["Nogi"]])
+    plank = create_exercise(client, "Deska", [tags["Nogi"], tags["Core"]])
+    workout = client.post("/api/workouts/", json={"title": "Trening A", "sections": [{
+        "name": "Główna", "position": 1, "exercises": [
+            {"ex_id": squat, "sets": 3, "quantity": 10, "unit": "ILOŚĆ", "rest": 60, "position": 1},
+            {"ex_id": plank, "sets": 2, "duration": 45, "unit": "CZAS", "rest": 30, "position": 2},
+        ],
+    }]}).json()
+    plan_id = client.post("/api/plans/", json={"name": "Sezon", "event_date": "2026-12-01"}).json()["id"]
+    weeks = [client.post("/api/plans/weeks", json={"position": i, "plan_id": plan_id}).json()["id"] for i in (1, 2)]
+    for day in ("Monday", "Thursday"):
+        client.post("/api/plans/workouts", json={"plan_id": plan_id, "week_id": weeks[0], "day_of_week": day, "work_id": workout["id"]})
+    return plan_id, weeks, tags
+
+
+def test_week_and_plan_totals(client):
+    plan_id, weeks, _ = _setup(client)
+    # Plan bez tygodni też jest w zestawieniu
+    empty_id = client.post("/api/plans/", json={"name": "Pusty", "event_date": "2026-12-01"}).json()["id"]
+
+    loads = client.get("/api/plans/load").json()
+
+    assert [load["plan_id"] for load in loads] == [plan_id, empty_id]
+    plan, empty = loads
+    first, second = plan["weeks"]
+    assert (first["week_id"], first["workouts"], first["tags"]) == (weeks[0], 2, None)
+    assert {key: first[key] for key in ("sets", "reps", "work_seconds", "rest_seconds", "exercises")} == {
+        "sets": 10, "reps": 60, "work_seconds": 180, "rest_seconds": 480, "exercises": 4,
+    }
+    assert (second["workouts"], second["sets"]) == (0, 0)
+    assert (plan["sets"], plan["exercises"]) == (10, 4)
+    assert (empty["weeks"], empty["sets"]) == ([], 0)
+
+
+def test_plan_load_has_columnar_tags(client):
+    plan_id, _, tags = _setup(client)
+
+    load = client.get(f"/api/plans/{plan_id}/load").json()
+
+    first, second = load["weeks"]
+    assert first["tags"] == {
+        "tag_id": [tags["Nogi"], tags["Core"]],
+        "name": ["Nogi", "Core"],
+        "sets": [10, 4],
+        "reps": [60, 0],
+        "work_seconds": [180, 180],
+        "rest_seconds": [480, 120],
+        "exercises": [4, 2],
+    }
+    assert second["tags"]["tag_id"] == []
+    assert client.get(f"/api/plans/{plan_id}/load", params={"tags": False}).json()["weeks"][0]["tags"] is None
+    assert client.get("/api/plans/999/load").status_code == 404
@@ -0,0 +1,172 @@
+"""Ładowanie dużych syntetycznych zbiorów danych (do profilowania).
+
+Uruchamiane z katalogu `api`, bez pytań o dane:
+
+    python -m utils.bulk_load --scale xlarge [--factor 2] [--seed 1] [--database-url URL]
+                              [--method auto|insert|infile] [--batch-size 5000] [--no-snapshots]
+
+Dane pochodzą z `utils/synthetic.py` (skale small/medium/large/xlarge,
+`--factor` mnoży liczbę rekordów; xlarge to ok. 3 mln ćwiczeń treningów
+i 1 mln adnotacji). Baza musi być pusta - schemat jest tworzony/aktualizowany
+migracjami. Domyślnie ładowana jest baza z `database.py`.
+
+Metody ładowania:
+- `insert` - wielowierszowe INSERT-y partiami (executemany; PyMySQL i
+  SQLAlchemy składają je w `INSERT ... VALUES (...), (...)`), commit po partii,
+- `infile` (tylko MySQL) - wiersze są strumieniowo zapisywane do plików CSV
+  (po jednym na tabelę) i ładowane `LOAD DATA LOCAL INFILE`; serwer musi
+  mieć włączone `local_infile`.
+`auto` wybiera `infile` dla MySQL, w pozostałych przypadkach `insert`.
+Na MySQL na czas ładowania wyłączane są w sesji sprawdzenia kluczy obcych
+i unikalności (dane są spójne z konstrukcji).
+
+Na końcu przebudowywane są snapshoty treningów (`--no-snapshots` pomija
+ten krok - zbudują się przy pierwszych odczytach).
+"""
+import argparse
+import datetime
+import enum
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, TextIO, Tuple
+
+from sqlalchemy import Table, create_engine, text
+from sqlalchemy.engine import Connection
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from utils import synthetic
+from utils.migrate import upgrade
+
+PROGRESS_INTERVAL = 5.0
+
+
+class Progress:
+    """Wypisuje co kilka sekund liczbę przetworzonych wierszy i tempo."""
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+        self.start = self.last = time.perf_counter()
+
+    def add(self, table: str, rows: int):
+        self.counts[table] = self.counts.get(table, 0) + rows
+        now = time.perf_counter()
+        if now - self.last >= PROGRESS_INTERVAL:
+            self.last = now
+            print(f"  {self.total:,} wierszy ({self.total / self.elapsed:,.0f}/s)", flush=True)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+
+def csv_field(value) -> str:
+    """Pole w formacie LOAD DATA: NULL bez cudzysłowów, napisy w cudzysłowach, enum jako nazwa (jak zapisuje SQLAlchemy)."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, enum.Enum):
+        value = value.name
+    elif isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
+
+
+def load_insert(conn: Connection, scale: synthetic.Scale, seed: int, batch_size: int, progress: Progress):
+    for table, rows in synthetic.generate(scale, seed, batch_size):
+        conn.execute(table.insert(), rows)
+        conn.commit()
+        progress.add(table.name, len(rows))
+
+
+def load_infile(conn: Connection, scale: synthetic.Scale, seed: int, batch_size: int, progress: Progress):
+    with tempfile.TemporaryDirectory(prefix="trainhub-load-") as workdir:
+        # Tabela -> (plik, kolumny); kolejność pierwszego pojawienia się = rodzice przed dziećmi
+        files: Dict[Table, Tuple[TextIO, List[str]]] = {}
+        try:
+            for table, rows in synthetic.generate(scale, seed, batch_size):
+                if table not in files:
+                    handle = open(os.path.join(workdir, f"{table.name}.csv"), "w", encoding="utf-8", newline="")
+                    files[table] = (handle, list(rows[0]))
+                handle, columns = files[table]
+                handle.writelines(",".join(csv_field(row[column]) for column in columns) + "\n" for row in rows)
+                progress.add(table.name, len(rows))
+        finally:
+            for handle, _ in files.values():
+                handle.close()
+
+        print(f"Zapisano pliki CSV ({progress.total:,} wierszy), ładowanie...", flush=True)
+        for table, (handle, columns) in files.items():
+            start = time.perf_counter()
+            conn.execute(text(
+                f"LOAD DATA LOCAL INFILE '{handle.name}' INTO TABLE `{table.name}` CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                "LINES TERMINATED BY '\\n' "
+                f"({', '.join(f'`{column}`' for column in columns)})"
+            ))
+            conn.commit()
+            print(f"  {table.name}: {progress.counts[table.name]:,} wierszy w {time.perf_counter() - start:.1f} s", flush=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(synthetic.SCALES), default="large")
+    parser.add_argument("--factor", type=float, default=1.0, help="mnożnik liczby rekordów skali")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", help="docelowa baza (domyślnie z database.py)")
+    parser.add_argument("--method", choices=["auto", "insert", "infile"], default="auto")
+    parser.add_argument("--batch-size", type=int, default=synthetic.BATCH_SIZE, help="wierszy w jednym INSERT/commit")
+    parser.add_argument("--no-snapshots", action="store_true", help="bez przebudowy snapshotów treningów")
+    args = parser.parse_args(argv)
+
+    database_url = args.database_url
+    if database_url is None:
+        from database import SQLALCHEMY_DATABASE_URL as database_url
+    mysql = database_url.startswith("mysql")
+    method = args.method if args.method != "auto" else ("infile" if mysql else "insert")
+    if method == "infile" and not mysql:
+        parser.error("--method infile wymaga bazy MySQL")
+
+    connect_args = {"local_infile": True} if method == "infile" else {}
+    engine = create_engine(database_url, connect_args=connect_args)
+    print(f"Schemat bazy danych jest w wersji {upgrade(engine)}.")
+    scale = synthetic.scale_by_name(args.scale, args.factor)
+    print(f"Skala {args.scale} x{args.factor}: {scale}, metoda: {method}", flush=True)
+
+    progress = Progress()
+    with engine.connect() as conn:
+        synthetic.ensure_empty(conn)
+        if mysql:
+            conn.execute(text("SET SESSION foreign_key_checks = 0, unique_checks = 0"))
+        elif engine.dialect.name == "sqlite":
+            conn.execute(text("PRAGMA synchronous = OFF"))
+        try:
+            (load_infile if method == "infile" else load_insert)(conn, scale, args.seed, args.batch_size, progress)
+        finally:
+            if mysql:
+                conn.execute(text("SET SESSION foreign_key_checks = 1, unique_checks = 1"))
+    print(f"Załadowano {progress.total:,} wierszy w {progress.elapsed:.1f} s:")
+    for table, count in progress.counts.items():
+        print(f"  {table}: {count:,}")
+
+    if not args.no_snapshots:
+        from sqlalchemy.orm import sessionmaker
+        from services.snapshot import rebuild_all
+
+        start = time.perf_counter()
+        with sessionmaker(bind=engine, autoflush=False)() as db:
+            print(f"Przebudowano snapshoty treningów: {rebuild_all(db):,} w {time.perf_counter() - start:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
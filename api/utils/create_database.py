@@ -1,10 +1,25 @@
+"""Tworzy bazę `trainhub` na serwerze MySQL i stosuje migracje schematu.
+
+Z katalogu `api`:
+
+    MYSQL_PASSWORD=... python utils/create_database.py --user root [--host localhost] [--yes]
+
+Brakujące dane logowania są pytane interaktywnie tylko przy terminalu i bez
+`--yes`; z `--yes` (CI, skrypty wdrożeniowe) skrypt nigdy nie czeka na
+wejście, a puste hasło jest przyjmowane bez potwierdzenia. Gdy baza już
+istnieje, wystarczy `DATABASE_URL=... python -m utils.migrate upgrade`.
+"""
+import argparse
+import getpass
+import os
+import sys
+from pathlib import Path
+
 import mysql.connector
-from sqlalchemy import create_engine, Enum, MetaData, Table, Column, Integer, String, Boolean, ForeignKey, Date, Text, Time
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker
-from sqlalchemy import inspect
-import enum
-import datetime
+from sqlalchemy import create_engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from utils.migrate import upgrade
 
 # Pierwsze połączenie do MySQL aby utworzyć bazę danych
 def create_database(user, password, host):
@@ -23,208 +38,6 @@ def create_database(user, password, host):
         print(f"Błąd podczas tworzenia bazy danych: {e}")
         raise
 
-# Definicje modeli SQLAlchemy
-Base = declarative_base()
-
-class DayOfWeek(str, enum.Enum):
-    MONDAY = "Monday"
-    TUESDAY = "Tuesday"
-    WEDNESDAY = "Wednesday"
-    THURSDAY = "Thursday"
-    FRIDAY = "Friday"
-    SATURDAY = "Saturday"
-    SUNDAY = "Sunday"
-
-class Exercise(Base):
-    __tablename__ = "exercises"
-
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), nullable=False)
-    instructions = Column(Text, nullable=True)
-    enrichment = Column(Text, nullable=True)
-    videoUrl = Column(String(255), nullable=True)
-    crop_id = Column(Integer, nullable=True)
-    
-    tags = relationship("Tag", secondary="exercise_tags", back_populates="exercises")
-    cropped_videos = relationship("CroppedVideo", back_populates="exercise")
-
-class Tag(Base):
-    __tablename__ = "tags"
-
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), nullable=False)
-    
-    exercises = relationship("Exercise", secondary="exercise_tags", back_populates="tags")
-
-class ExerciseTag(Base):
-    __tablename__ = "exercise_tags"
-
-    tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True)
-    ex_id = Column(Integer, ForeignKey("exercises.id"), primary_key=True)
-
-# Enumy
-class ExerciseUnit(str, enum.Enum):
-    TIME = "CZAS"
-    QUANTITY = "ILOŚĆ"
-
-# Workout (plan treningowy)
-class Workout(Base):
-    __tablename__ = "workouts"
-
-    id = Column(Integer, primary_key=True, index=True)
-    title = Column(String(255), nullable=False)
-    description = Column(Text, nullable=True)
-    created_at = Column(Date, nullable=False, default=datetime.date.today)
-    duration = Column(Integer, nullable=True)
-    
-    sections = relationship(
-        "WorkoutSection",
-        back_populates="workout",
-        cascade="all, delete-orphan"
-    )
-
-# Sekcja w treningu
-class WorkoutSection(Base):
-    __tablename__ = "workout_section"
-
-    id = Column(Integer, primary_key=True, index=True)
-    work_id = Column(Integer, ForeignKey("workouts.id", ondelete="CASCADE"), nullable=False)
-    name = Column(String(255), nullable=False)
-    position = Column(Integer, nullable=False)
-    
-    workout = relationship("Workout", back_populates="sections")
-    section_exercises = relationship(
-        "SectionExercise",
-        back_populates="section",
-        cascade="all, delete-orphan"
-    )
-    exercises = relationship(
-        "WorkoutExercise",
-        secondary="section_exercises",
-        back_populates="sections",
-        overlaps="section_exercises,workout_exercise"
-    )
-
-# Ćwiczenie w treningu
-class WorkoutExercise(Base):
-    __tablename__ = "workout_exercise"
-
-    id = Column(Integer, primary_key=True, index=True)
-    ex_id = Column(Integer, ForeignKey("exercises.id", ondelete="CASCADE"), nullable=False)
-    sets = Column(Integer, nullable=False)
-    quantity = Column(Integer, nullable=True)
-    unit = Column(Enum(ExerciseUnit), nullable=False)
-    duration = Column(Integer, nullable=True)
-    rest = Column(Integer, nullable=False)
-    position = Column(Integer, nullable=False)
-    
-    section_exercises = relationship(
-        "SectionExercise",
-        back_populates="workout_exercise",
-        cascade="all, delete-orphan"
-    )
-    sections = relationship(
-        "WorkoutSection",
-        secondary="section_exercises",
-        back_populates="exercises",
-        overlaps="section_exercises,section"
-    )
-
-# Powiązanie sekcji i ćwiczenia (wiele-do-wielu z dodatkowymi danymi)
-class SectionExercise(Base):
-    __tablename__ = "section_exercises"
-
-    section_id = Column(Integer, ForeignKey("workout_section.id", ondelete="CASCADE"), primary_key=True)
-    work_exercise_id = Column(Integer, ForeignKey("workout_exercise.id", ondelete="CASCADE"), primary_key=True)
-    position = Column(Integer, nullable=False)
-
-    section = relationship(
-        "WorkoutSection",
-        back_populates="section_exercises",
-        overlaps="exercises,sections"
-    )
-    workout_exercise = relationship(
-        "WorkoutExercise",
-        back_populates="section_exercises",
-        overlaps="sections,exercises"
-    )
-
-# NOWE MODELE DLA PLANÓW TRENINGOWYCH
-class Plan(Base):
-    __tablename__ = "plan"
-
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), nullable=False)
-    event_date = Column(Date, nullable=False)
-    
-    # Relationships
-    weeks = relationship("WeekPlan", back_populates="plan", cascade="all, delete-orphan")
-    workouts = relationship("WorkoutPlan", back_populates="plan", cascade="all, delete-orphan")
-
-class WeekPlan(Base):
-    __tablename__ = "week_plan"
-
-    id = Column(Integer, primary_key=True, index=True)
-    plan_id = Column(Integer, ForeignKey("plan.id", ondelete="CASCADE"), nullable=False)
-    position = Column(Integer, nullable=False)
-    notes = Column(Text, nullable=True)
-    
-    # Relationships
-    plan = relationship("Plan", back_populates="weeks")
-    workouts = relationship("WorkoutPlan", back_populates="week", cascade="all, delete-orphan")
-
-class WorkoutPlan(Base):
-    __tablename__ = "workout_plan"
-
-    id = Column(Integer, primary_key=True, index=True)
-    plan_id = Column(Integer, ForeignKey("plan.id", ondelete="CASCADE"), nullable=False)
-    week_id = Column(Integer, ForeignKey("week_plan.id", ondelete="CASCADE"), nullable=False)
-    name = Column(String(255), nullable=True)
-    description = Column(Text, nullable=True)
-    day_of_week = Column(Enum(DayOfWeek), nullable=False)
-    completed = Column(Boolean, nullable=False, default=False)
-    notes = Column(Text, nullable=True)
-    work_id = Column(Integer, ForeignKey("workouts.id", ondelete="SET NULL"), nullable=True)
-    
-    # Relationships
-    plan = relationship("Plan", back_populates="workouts")
-    week = relationship("WeekPlan", back_populates="workouts")
-    workout = relationship("Workout", back_populates="workout_plans")
-
-class Analyser(Base):
-    __tablename__ = "analyser"
-
-    id = Column(Integer, primary_key=True, index=True)
-    video_url = Column(String(255), nullable=False)
-    name = Column(String(255), nullable=False)
-    
-    annotations = relationship("AnnotationAnalyser", back_populates="analyser")
-
-class AnnotationAnalyser(Base):
-    __tablename__ = "annotation_analyser"
-
-    id = Column(Integer, primary_key=True, index=True)
-    analyser_id = Column(Integer, ForeignKey("analyser.id"), nullable=False)
-    time_from = Column(Time, nullable=False)
-    time_to = Column(Time, nullable=True)
-    title = Column(String(255), nullable=False)
-    description = Column(String(255), nullable=True)
-    color = Column(String(50), nullable=False)
-    saved = Column(Boolean, nullable=False, default=False)
-    
-    analyser = relationship("Analyser", back_populates="annotations")
-    cropped_videos = relationship("CroppedVideo", back_populates="annotation")
-
-class CroppedVideo(Base):
-    __tablename__ = "cropped_video"
-
-    id = Column(Integer, primary_key=True, index=True)
-    anno_id = Column(Integer, ForeignKey("annotation_analyser.id"), nullable=False)
-    video_url = Column(String(255), nullable=False)
-    crop_id = Column(Integer, ForeignKey("exercises.id"), nullable=False)
-    
-    annotation = relationship("AnnotationAnalyser", back_populates="cropped_videos")
-
 def create_tables(username, password, host):
     # Utwórz bazę danych jeśli nie istnieje
     create_database(username, password, host)
@@ -236,34 +49,45 @@ def create_tables(username, password, host):
     engine = create_engine(SQLALCHEMY_DATABASE_URL)
     
     try:
-        # Najpierw usuwamy tabele, jeśli istnieją
-        try:
-            Base.metadata.drop_all(engine)
-            print("Istniejące tabele zostały usunięte.")
-        except Exception as e:
-            print(f"Nie udało się usunąć istniejących tabel lub tabele nie istniały: {e}")
-        
-        # Teraz tworzymy tabele od nowa
-        Base.metadata.create_all(engine)
-        print("Wszystkie tabele zostały utworzone w bazie danych.")
+        # Tabele tworzą (lub aktualizują) wersjonowane migracje - istniejące dane zostają
+        version = upgrade(engine)
+        print(f"Schemat bazy danych jest w wersji {version}.")
     except Exception as e:
-        print(f"Błąd podczas tworzenia tabel: {e}")
+        print(f"Błąd podczas migracji schematu: {e}")
+        raise
 
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tworzy bazę trainhub (MySQL) i stosuje migracje schematu.")
+    parser.add_argument("--user", default=os.environ.get("MYSQL_USER"), help="użytkownik MySQL (domyślnie MYSQL_USER)")
+    parser.add_argument("--host", default=os.environ.get("MYSQL_HOST", "localhost"), help="host MySQL (domyślnie MYSQL_HOST albo localhost)")
+    parser.add_argument("--yes", action="store_true", help="bez pytań: brak danych to błąd, puste hasło jest akceptowane")
+    args = parser.parse_args(argv)
+    # Hasło tylko ze zmiennej środowiskowej - w argumentach byłoby widoczne na liście procesów
+    password = os.environ.get("MYSQL_PASSWORD")
+    interactive = not args.yes and sys.stdin.isatty()
+
+    username = args.user
+    if not username:
+        if not interactive:
+            parser.error("podaj --user albo ustaw MYSQL_USER")
+        username = input("Podaj nazwę użytkownika MySQL: ")
+    if password is None:
+        password = getpass.getpass("Podaj hasło MySQL: ") if interactive else ""
 
-if __name__ == "__main__":
-    # Podaj dane do połączenia MySQL
-    username = input("Podaj nazwę użytkownika MySQL: ")
-    password = input("Podaj hasło MySQL: ")
-    
     # Sprawdź, czy hasło nie jest puste
-    if not password:
+    if not password and interactive:
         print("UWAGA: Wprowadzono puste hasło. Czy na pewno konto MySQL nie wymaga hasła?")
         confirm = input("Kontynuować? (tak/nie): ")
         if confirm.lower() != 'tak':
             print("Przerwano działanie skryptu.")
-            exit()
-    
-    host = input("Podaj host MySQL (domyślnie localhost): ") or "localhost"
+            return 1
 
-    create_tables(username, password, host)
-    
+    try:
+        create_tables(username, password, args.host)
+    except Exception:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
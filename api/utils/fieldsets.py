@@ -0,0 +1,78 @@
+from typing import Callable, Dict, List, Optional
+
+from fastapi import HTTPException, Query
+from sqlalchemy.orm import Session
+
+SUMMARY_VIEW = "summary"
+FULL_VIEW = "full"
+
+
+class FieldParams:
+    """Wspólne parametry wyboru pól (`fields=` / `view=`) dla endpointów listujących."""
+
+    def __init__(
+        self,
+        fields: Optional[str] = Query(None, description="Zwracane pola rozdzielone przecinkami, np. id,name,tags_count"),
+        view: Optional[str] = Query(None, description="Widok listy: full (domyślny) albo summary"),
+    ):
+        self.fields = fields
+        self.view = view
+
+    @property
+    def sparse(self) -> bool:
+        return bool(self.fields) or (self.view is not None and self.view != FULL_VIEW)
+
+
+class Fieldset:
+    """Pola, które lista może zwrócić w trybie wybranych pól.
+
+    - `columns` - kolumny modelu (w SQL wybierane są tylko żądane),
+    - `counts` - liczniki dzieci jako skorelowane podzapytania (`<dzieci>_count`),
+    - `children` - dzieci dołączane osobnym zapytaniem funkcją `(db, wiersze)`,
+      ustawiającą klucz o tej samej nazwie (np. `attach_exercise_tags`).
+    `summary` to pola widoku `view=summary`; `id` jest zawsze dołączane,
+    bo po nim idzie stronicowanie.
+    """
+
+    def __init__(self, columns, counts=None, children: Optional[Dict[str, Callable]] = None, summary=()):
+        self.columns = {column.key: column for column in columns}
+        self.counts = dict(counts or {})
+        self.children = dict(children or {})
+        self.summary = tuple(summary)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.columns) + list(self.counts) + list(self.children)
+
+    def select(self, params: FieldParams) -> List[str]:
+        """Nazwy zwracanych pól; 400 przy nieznanym polu albo widoku."""
+        if params.fields:
+            names = list(dict.fromkeys(name.strip() for name in params.fields.split(",") if name.strip()))
+            unknown = [name for name in names if name not in self.columns and name not in self.counts and name not in self.children]
+            if unknown:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(self.names)}",
+                )
+        elif params.view == SUMMARY_VIEW:
+            names = list(self.summary)
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown view: {params.view}")
+        if "id" not in names:
+            names.insert(0, "id")
+        return names
+
+    def query(self, db: Session, names: List[str]):
+        """Zapytanie o same wybrane kolumny i liczniki (bez dzieci)."""
+        return db.query(*[
+            self.columns[name] if name in self.columns else self.counts[name].label(name)
+            for name in names if name not in self.children
+        ])
+
+    def dicts(self, db: Session, names: List[str], rows) -> List[dict]:
+        keys = [name for name in names if name not in self.children]
+        items = [dict(zip(keys, row)) for row in rows]
+        for name in names:
+            if name in self.children:
+                self.children[name](db, items)
+        return items
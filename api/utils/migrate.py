@@ -0,0 +1,286 @@
+"""Wersjonowane migracje schematu bazy danych.
+
+Każda migracja to moduł w katalogu `migrations/` o nazwie `vNNN_opis.py`,
+który definiuje `revision` (kolejny numer), `description` oraz funkcję
+`upgrade(conn)`. Numer ostatniej zastosowanej migracji jest zapisywany
+w tabeli `schema_version`.
+
+Użycie (z katalogu `api/`):
+
+    python -m utils.migrate upgrade     # zastosuj brakujące migracje
+    python -m utils.migrate current     # pokaż wersję schematu w bazie
+    python -m utils.migrate check       # kod wyjścia 1, jeśli schemat jest nieaktualny
+"""
+import datetime
+import importlib.util
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, inspect
+from sqlalchemy.engine import Connection, Engine
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "migrations"
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+def load_migrations():
+    """Zwraca moduły migracji posortowane po numerze rewizji."""
+    migrations = []
+    for path in sorted(MIGRATIONS_DIR.glob("v[0-9]*.py")):
+        spec = importlib.util.spec_from_file_location(f"migrations.{path.stem}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        migrations.append(module)
+
+    migrations.sort(key=lambda m: m.revision)
+    revisions = [m.revision for m in migrations]
+    if revisions != list(range(1, len(revisions) + 1)):
+        raise SchemaVersionError(f"Migration revisions must be consecutive, got {revisions}")
+    return migrations
+
+
+def latest_version() -> int:
+    return len(load_migrations())
+
+
+def current_version(conn: Connection) -> int:
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    row = conn.execute(schema_version.select().order_by(schema_version.c.version.desc()).limit(1)).first()
+    return row.version if row else 0
+
+
+def upgrade(engine: Engine, target: int = None) -> int:
+    """Stosuje kolejno brakujące migracje, każdą w osobnej transakcji."""
+    with engine.begin() as conn:
+        schema_version.create(conn, checkfirst=True)
+        version = current_version(conn)
+
+    for migration in load_migrations():
+        if migration.revision <= version:
+            continue
+        if target is not None and migration.revision > target:
+            break
+        with engine.begin() as conn:
+            migration.upgrade(conn)
+            conn.execute(schema_version.insert().values(
+                version=migration.revision,
+                description=migration.description,
+                applied_at=datetime.datetime.utcnow(),
+            ))
+        version = migration.revision
+        print(f"Zastosowano migrację {migration.revision:03d}: {migration.description}")
+    return version
+
+
+def check_schema_version(engine: Engine) -> int:
+    """Sprawdza przy starcie aplikacji, czy baza ma aktualny schemat.
+
+    Nie tworzy ani nie refleksuje tabel - odczytuje jeden wiersz z
+    `schema_version` i porównuje go z najnowszą migracją.
+    """
+    with engine.connect() as conn:
+        version = current_version(conn)
+    expected = latest_version()
+    if version != expected:
+        raise SchemaVersionError(
+            f"Database schema is at version {version}, expected {expected}. "
+            f"Run `python -m utils.migrate upgrade` from the api directory."
+        )
+    return version
+
+
+# Pomocnicze funkcje dla migracji
+def create_index(conn: Connection, name: str, table_name: str, columns, unique: bool = False):
+    """Tworzy indeks, jeśli jeszcze nie istnieje (np. w bazie utworzonej ręcznie)."""
+    existing = {index["name"] for index in inspect(conn).get_indexes(table_name)}
+    if name in existing:
+        return
+    table = Table(table_name, MetaData(), autoload_with=conn)
+    Index(name, *[table.c[column] for column in columns], unique=unique).create(conn)
+
+
+def add_column(conn: Connection, table_name: str, column: Column):
+    """Dodaje kolumnę do istniejącej tabeli, jeśli jeszcze jej nie ma."""
+    if column.name in {c["name"] for c in inspect(conn).get_columns(table_name)}:
+        return
+    ddl = f"ALTER TABLE {table_name} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}"
+    if column.server_default is not None:
+        ddl += f" DEFAULT {column.server_default.arg}"
+    if not column.nullable:
+        ddl += " NOT NULL"
+    conn.exec_driver_sql(ddl)
+
+
+def set_foreign_keys(conn: Connection, table_name: str, references: Dict[str, Tuple[str, Optional[str]]]):
+    """Ustawia cel i akcję ON DELETE kluczy obcych wskazanych kolumn.
+
+    `references` to np. {"crop_id": ("exercises.id", "CASCADE")}; akcja None
+    zostawia bieżącą. Przy zmianie celu wiersze wskazujące nieistniejący
+    wiersz nowej tabeli są usuwane (nowy klucz by ich nie przyjął). MySQL
+    zmienia klucz przez DROP/ADD FOREIGN KEY (z tą samą nazwą); SQLite nie ma
+    ALTER dla ograniczeń, więc zmieniana jest zapisana definicja tabeli.
+    """
+    changed = {}
+    for fk in inspect(conn).get_foreign_keys(table_name):
+        columns = fk["constrained_columns"]
+        if len(columns) != 1 or columns[0] not in references:
+            continue
+        column = columns[0]
+        target, ondelete = references[column]
+        referred_table, referred_column = target.split(".")
+        current = fk["options"].get("ondelete")
+        ondelete = ondelete or current
+        repoint = (fk["referred_table"], fk["referred_columns"]) != (referred_table, [referred_column])
+        if not repoint and (current or "").upper() == (ondelete or "").upper():
+            continue
+        changed[column] = (fk["name"], referred_table, referred_column, ondelete, repoint)
+    if not changed:
+        return
+    if conn.dialect.name == "sqlite":
+        # Stary cel bywa nieunikalny ("foreign key mismatch" przy każdym DML), więc sieroty dopiero po zmianie
+        _set_sqlite_foreign_keys(conn, table_name, changed)
+        for column, (_, referred_table, referred_column, _, repoint) in changed.items():
+            if repoint:
+                _delete_orphans(conn, table_name, column, referred_table, referred_column)
+        return
+    drop = "DROP FOREIGN KEY" if conn.dialect.name == "mysql" else "DROP CONSTRAINT"
+    for column, (name, referred_table, referred_column, ondelete, repoint) in changed.items():
+        conn.exec_driver_sql(f"ALTER TABLE {table_name} {drop} {name}")
+        if repoint:
+            _delete_orphans(conn, table_name, column, referred_table, referred_column)
+        conn.exec_driver_sql(
+            f"ALTER TABLE {table_name} ADD CONSTRAINT {name} FOREIGN KEY ({column}) "
+            f"REFERENCES {referred_table} ({referred_column})" + (f" ON DELETE {ondelete}" if ondelete else "")
+        )
+
+
+def _delete_orphans(conn: Connection, table_name: str, column: str, referred_table: str, referred_column: str):
+    orphans = conn.exec_driver_sql(
+        f"DELETE FROM {table_name} WHERE {column} IS NOT NULL "
+        f"AND {column} NOT IN (SELECT {referred_column} FROM {referred_table})"
+    ).rowcount
+    if orphans:
+        print(f"Usunięte wiersze {table_name} bez odpowiednika w {referred_table}.{referred_column}: {orphans}")
+
+
+def set_sqlite_autoincrement(conn: Connection, table_name: str, column: str = "id"):
+    """Włącza AUTOINCREMENT klucza głównego tabeli SQLite (na innych silnikach nic nie robi).
+
+    Bez AUTOINCREMENT SQLite nadaje po usunięciu ostatniego wiersza jego id
+    ponownie, a id są częścią kluczy ETag, cache i indeksów w pamięci.
+    Klucz `INTEGER PRIMARY KEY` to w obu wariantach alias rowid, więc
+    wystarcza zmiana zapisanej definicji; licznik w `sqlite_sequence` startuje
+    od bieżącego maksimum.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    sql = _sqlite_definition(conn, table_name)
+    if re.search(r"\bAUTOINCREMENT\b", sql, flags=re.IGNORECASE):
+        return
+    quoted = r"[\"`\[]?" + re.escape(column) + r"[\"`\]]?"
+    new_sql, found = re.subn(
+        r"(\(\s*" + quoted + r"\s+INTEGER\s+NOT\s+NULL)", r"\1 PRIMARY KEY AUTOINCREMENT", sql, count=1, flags=re.IGNORECASE
+    )
+    new_sql, removed = re.subn(r",\s*PRIMARY\s+KEY\s*\(\s*" + quoted + r"\s*\)", "", new_sql, flags=re.IGNORECASE)
+    if not (found and removed):
+        raise SchemaVersionError(f"Primary key {column} of {table_name} is not a single INTEGER NOT NULL column")
+
+    # `sqlite_sequence` powstaje razem z pierwszą tabelą AUTOINCREMENT - zmiana definicji jej nie tworzy
+    conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS _autoincrement_seed (id INTEGER PRIMARY KEY AUTOINCREMENT)")
+    conn.exec_driver_sql("DROP TABLE _autoincrement_seed")
+    _write_sqlite_definition(conn, table_name, new_sql)
+    conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = ?", (table_name,))
+    conn.exec_driver_sql(
+        f"INSERT INTO sqlite_sequence (name, seq) SELECT ?, COALESCE(MAX({column}), 0) FROM \"{table_name}\"", (table_name,)
+    )
+
+
+def _set_sqlite_foreign_keys(conn: Connection, table_name: str, changed: Dict[str, tuple]):
+    """Podmienia klauzule REFERENCES w zapisanej definicji tabeli (`writable_schema`)."""
+    sql = _sqlite_definition(conn, table_name)
+
+    def replace(match):
+        column = match.group(1).strip('"`[]')
+        if column not in changed:
+            return match.group(0)
+        pending.discard(column)
+        _, referred_table, referred_column, ondelete, _ = changed[column]
+        return f"FOREIGN KEY({match.group(1)}) REFERENCES {referred_table} ({referred_column})" + (
+            f" ON DELETE {ondelete}" if ondelete else ""
+        )
+
+    pending = set(changed)
+    pattern = r"FOREIGN KEY\s*\(\s*([\w\"`\[\]]+)\s*\)\s*REFERENCES\s+[\w\"`\[\]]+\s*\([^)]*\)(?:\s+ON\s+DELETE\s+(?:SET\s+NULL|SET\s+DEFAULT|NO\s+ACTION|\w+))?"
+    new_sql = re.sub(pattern, replace, sql, flags=re.IGNORECASE)
+    if pending:
+        raise SchemaVersionError(f"Foreign keys {sorted(pending)} not found in the definition of {table_name}")
+    _write_sqlite_definition(conn, table_name, new_sql)
+
+
+def _sqlite_definition(conn: Connection, table_name: str) -> str:
+    return conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)
+    ).scalar()
+
+
+def _write_sqlite_definition(conn: Connection, table_name: str, sql: str):
+    """Zapisuje nową definicję tabeli wprost w `sqlite_master` (`writable_schema`).
+
+    Tylko dla zmian, które nie zmieniają formatu danych na dysku (cel i akcja
+    klucza obcego, AUTOINCREMENT) - wtedy wystarcza zmiana tekstu CREATE TABLE
+    i podbicie `schema_version` (procedura z dokumentacji SQLite). Przebudowa
+    tabeli wymagałaby wyłączenia `foreign_keys`, czego nie da się zrobić
+    wewnątrz transakcji migracji.
+    """
+    version = conn.exec_driver_sql("PRAGMA schema_version").scalar()
+    conn.exec_driver_sql("PRAGMA writable_schema = ON")
+    try:
+        conn.exec_driver_sql(
+            "UPDATE sqlite_master SET sql = ? WHERE type = 'table' AND name = ?", (sql, table_name)
+        )
+        conn.exec_driver_sql(f"PRAGMA schema_version = {version + 1}")
+    finally:
+        # RESET (zamiast OFF) przeładowuje schemat także w tym połączeniu
+        conn.exec_driver_sql("PRAGMA writable_schema = RESET")
+
+
+def main(argv):
+    from database import engine
+
+    command = argv[1] if len(argv) > 1 else "upgrade"
+    if command == "upgrade":
+        target = int(argv[2]) if len(argv) > 2 else None
+        version = upgrade(engine, target)
+        print(f"Wersja schematu: {version}")
+    elif command == "current":
+        with engine.connect() as conn:
+            print(f"Wersja schematu: {current_version(conn)} (najnowsza: {latest_version()})")
+    elif command == "check":
+        try:
+            check_schema_version(engine)
+        except SchemaVersionError as e:
+            print(str(e))
+            return 1
+        print("Schemat bazy danych jest aktualny")
+    else:
+        print(f"Nieznana komenda: {command}. Dostępne: upgrade [wersja], current, check")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
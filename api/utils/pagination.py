@@ -0,0 +1,130 @@
+import base64
+import json
+from typing import Callable, Optional, Tuple
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import func, text
+from sqlalchemy.orm import Query as OrmQuery, Session
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def encode_cursor(last_id: int, score: Optional[float] = None) -> str:
+    """Zamienia klucz ostatniego zwróconego wiersza na nieprzezroczysty kursor.
+
+    `score` jest dla list rankingowych (wyszukiwanie), gdzie kluczem strony
+    jest para (score, id).
+    """
+    payload = {"id": last_id} if score is None else {"id": last_id, "score": score}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _payload(cursor: str) -> dict:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def decode_ranked_cursor(cursor: str) -> Tuple[float, int]:
+    """(score, id) z kursora listy rankingowej."""
+    try:
+        payload = _payload(cursor)
+        score, last_id = payload["score"], payload["id"]
+        if isinstance(score, bool) or not isinstance(score, (int, float)):
+            raise ValueError("score must be a number")
+        if isinstance(last_id, bool) or not isinstance(last_id, int):
+            raise ValueError("id must be an integer")
+        return float(score), last_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        payload = _payload(cursor)
+        last_id = payload["id"]
+        # bool jest podklasą int - {"id": true} nie jest kursorem
+        if isinstance(last_id, bool) or not isinstance(last_id, int):
+            raise ValueError("id must be an integer")
+        return last_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+class PageParams:
+    """Wspólne parametry stronicowania (keyset) dla endpointów listujących."""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Kursor zwrócony w nagłówku X-Next-Cursor"),
+        limit: Optional[int] = Query(
+            None, ge=1, le=MAX_LIMIT, description=f"Rozmiar strony (z samym kursorem: {DEFAULT_LIMIT})"
+        ),
+        with_total: bool = Query(False, description="Dołącz (szacunkową) liczbę wierszy w X-Total-Count"),
+    ):
+        self.cursor = cursor
+        self.after_id = decode_cursor(cursor) if cursor else None
+        # Bez `cursor` i `limit` lista jest zwracana w całości (jak przed stronicowaniem)
+        if limit is None and cursor:
+            limit = DEFAULT_LIMIT
+        self.limit = limit
+        self.with_total = with_total
+
+    @property
+    def fetch_limit(self) -> Optional[int]:
+        """Ile wierszy pobrać - o jeden więcej niż strona, żeby wiedzieć, czy jest następna."""
+        return self.limit + 1 if self.limit is not None else None
+
+
+def estimate_count(db: Session, model) -> int:
+    """Szybka, przybliżona liczba wierszy tabeli.
+
+    Na MySQL czyta statystyki InnoDB z information_schema zamiast skanować
+    tabelę przez COUNT(*); na pozostałych silnikach liczy dokładnie.
+    """
+    table_name = model.__table__.name
+    if db.bind.dialect.name == "mysql":
+        estimate = db.execute(
+            text(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name"
+            ),
+            {"table_name": table_name},
+        ).scalar()
+        if estimate is not None:
+            return int(estimate)
+    return db.query(func.count()).select_from(model).scalar()
+
+
+def paginate(
+    query: OrmQuery,
+    key_column,
+    page: PageParams,
+    response: Response,
+    count: Optional[Callable[[], int]] = None,
+):
+    """Zwraca jedną stronę wyników posortowanych po kolumnie klucza.
+
+    `key_column` musi być unikalna i zaindeksowana (zwykle klucz główny), żeby
+    kolejność była stabilna, a pominięcie poprzednich stron sprowadzało się
+    do przeszukania indeksu zamiast OFFSET-u. Bez `limit` (i kursora) zwraca
+    wszystkie wiersze. `count` jest wywoływane tylko
+    wtedy, gdy klient poprosił o `with_total`.
+    """
+    if page.after_id is not None:
+        query = query.filter(key_column > page.after_id)
+    query = query.order_by(key_column)
+    rows = (query.limit(page.fetch_limit) if page.limit is not None else query).all()
+
+    if page.limit is not None and len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(rows[-1], key_column.key))
+
+    if page.with_total and count is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(count())
+
+    return rows
@@ -0,0 +1,248 @@
+"""Generator syntetycznych danych (powtarzalny dla danego ziarna).
+
+Wiersze są generowane strumieniowo, partiami, w kolejności kluczy obcych
+(rodzic przed dziećmi) i z jawnymi id od 1, więc ładowanie wymaga pustej
+bazy, a dzieci nie muszą czekać na id nadane przez bazę. Szacowany czas
+treningów i sekcji jest liczony od razu (services/duration.py).
+
+Rozkłady: popularność tagów i ćwiczeń jest potęgowa (kilka bardzo częstych,
+długi ogon), treningi w planach są losowane z całej puli, adnotacje
+analizatorów rozłożone na nagraniu co kilka sekund.
+"""
+import datetime
+import itertools
+import random
+from dataclasses import dataclass, replace
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy import Table, func, select
+from sqlalchemy.engine import Connection
+
+from models.analyser import Analyser, AnnotationAnalyser, CroppedVideo, annotation_range
+from models.exercise import Exercise
+from models.plan import DayOfWeek, Plan, WeekPlan, WorkoutPlan
+from models.tag import ExerciseTag, Tag
+from models.workout import ExerciseUnit, SectionExercise, Workout, WorkoutExercise, WorkoutSection
+from services.duration import section_seconds, workout_seconds
+
+BATCH_SIZE = 5000
+# Stała data odniesienia - ten sam seed daje te same dane niezależnie od dnia uruchomienia
+BASE_DATE = datetime.date(2025, 1, 1)
+
+
+@dataclass(frozen=True)
+class Scale:
+    tags: int
+    exercises: int
+    workouts: int
+    plans: int
+    analysers: int
+    sections_per_workout: int = 3
+    exercises_per_section: int = 5
+    weeks_per_plan: int = 4
+    workouts_per_week: int = 3
+    annotations_per_analyser: int = 20
+    cropped_videos_per_annotation: float = 0.5
+
+
+SCALES: Dict[str, Scale] = {
+    "small": Scale(tags=20, exercises=200, workouts=100, plans=20, analysers=10),
+    "medium": Scale(tags=40, exercises=2_000, workouts=1_000, plans=200, analysers=100, annotations_per_analyser=50),
+    "large": Scale(tags=80, exercises=20_000, workouts=10_000, plans=1_000, analysers=500, annotations_per_analyser=100),
+    # Do profilowania: ~3 mln ćwiczeń treningów, ~1 mln adnotacji
+    "xlarge": Scale(
+        tags=150, exercises=50_000, workouts=200_000, plans=5_000, analysers=2_000, annotations_per_analyser=500,
+    ),
+}
+
+COLORS = ["#ef4444", "#f59e0b", "#10b981", "#3b82f6", "#8b5cf6"]
+WORDS = ["przysiad", "martwy", "ciąg", "wiosłowanie", "wykrok", "pompka", "podciąganie", "deska", "skip", "sprint"]
+
+
+def scale_by_name(name: str, factor: float = 1.0) -> Scale:
+    """Preset skali, opcjonalnie przemnożony (liczby rekordów głównych)."""
+    scale = SCALES[name]
+    if factor == 1.0:
+        return scale
+    return replace(
+        scale,
+        exercises=max(1, int(scale.exercises * factor)),
+        workouts=max(1, int(scale.workouts * factor)),
+        plans=max(1, int(scale.plans * factor)),
+        analysers=max(1, int(scale.analysers * factor)),
+    )
+
+
+def _zipf_weights(count: int) -> List[float]:
+    return [1.0 / rank for rank in range(1, count + 1)]
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+class _Batches:
+    """Zbiera wiersze per tabela i oddaje pełne partie."""
+
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self.rows: Dict[Table, List[dict]] = {}
+
+    def add(self, table: Table, row: dict):
+        self.rows.setdefault(table, []).append(row)
+
+    def full(self) -> bool:
+        return any(len(rows) >= self.batch_size for rows in self.rows.values())
+
+
+def generate(scale: Scale, seed: int = 1, batch_size: int = BATCH_SIZE) -> Iterator[Tuple[Table, List[dict]]]:
+    """Partie wierszy `(tabela, [wiersze])` w kolejności pozwalającej wstawiać je po kolei."""
+    rng = random.Random(seed)
+
+    yield Tag.__table__, [{"id": i, "name": f"tag {i}"} for i in range(1, scale.tags + 1)]
+
+    # Ćwiczenia z tagami (1-4, popularne tagi częściej)
+    tag_ids = list(range(1, scale.tags + 1))
+    tag_weights = _zipf_weights(scale.tags)
+    batches = _Batches(batch_size)
+    for ex_id in range(1, scale.exercises + 1):
+        batches.add(Exercise.__table__, {
+            "id": ex_id, "name": f"{_text(rng, 2).capitalize()} {ex_id}",
+            "instructions": _text(rng, rng.randint(10, 80)), "enrichment": None,
+            "videoUrl": None, "crop_id": None, "version": 1,
+        })
+        for tag_id in set(rng.choices(tag_ids, weights=tag_weights, k=rng.randint(1, 4))):
+            batches.add(ExerciseTag.__table__, {"tag_id": tag_id, "ex_id": ex_id})
+        if batches.full():
+            yield from _ordered(batches, [Exercise, ExerciseTag])
+    yield from _ordered(batches, [Exercise, ExerciseTag])
+
+    # Treningi: sekcje -> ćwiczenia treningu -> powiązania (popularne ćwiczenia częściej)
+    exercise_ids = list(range(1, scale.exercises + 1))
+    cumulative = list(itertools.accumulate(_zipf_weights(scale.exercises)))
+    section_id = workout_exercise_id = 0
+    for work_id in range(1, scale.workouts + 1):
+        section_totals = []
+        sections = []
+        for position in range(scale.sections_per_workout):
+            section_id += 1
+            exercises = []
+            for ex_position in range(scale.exercises_per_section):
+                workout_exercise_id += 1
+                if rng.random() < 0.7:
+                    unit, quantity, duration = ExerciseUnit.QUANTITY, rng.randint(5, 15), None
+                else:
+                    unit, quantity, duration = ExerciseUnit.TIME, None, rng.choice([20, 30, 45, 60])
+                row = {
+                    "id": workout_exercise_id, "ex_id": rng.choices(exercise_ids, cum_weights=cumulative)[0],
+                    "sets": rng.randint(1, 5), "quantity": quantity, "unit": unit, "duration": duration,
+                    "rest": rng.choice([30, 60, 90]), "position": ex_position,
+                }
+                exercises.append(row)
+                batches.add(SectionExercise.__table__, {
+                    "section_id": section_id, "work_exercise_id": workout_exercise_id, "position": ex_position,
+                })
+            seconds = section_seconds(_Row(row) for row in exercises)
+            section_totals.append(seconds)
+            sections.append({
+                "id": section_id, "work_id": work_id, "name": f"Sekcja {position + 1}",
+                "position": position, "estimated_duration": seconds,
+            })
+            for row in exercises:
+                batches.add(WorkoutExercise.__table__, row)
+        batches.add(Workout.__table__, {
+            "id": work_id, "title": f"Trening {work_id}", "description": _text(rng, 12),
+            "created_at": BASE_DATE - datetime.timedelta(days=rng.randint(0, 365)), "duration": rng.choice([45, 60, 90]),
+            "estimated_duration": workout_seconds(section_totals), "version": 1,
+        })
+        for section in sections:
+            batches.add(WorkoutSection.__table__, section)
+        if batches.full():
+            yield from _ordered(batches, [Workout, WorkoutSection, WorkoutExercise, SectionExercise])
+    yield from _ordered(batches, [Workout, WorkoutSection, WorkoutExercise, SectionExercise])
+
+    # Plany: tygodnie z treningami w losowe dni
+    days = list(DayOfWeek)
+    week_id = workout_plan_id = 0
+    for plan_id in range(1, scale.plans + 1):
+        batches.add(Plan.__table__, {
+            "id": plan_id, "name": f"Plan {plan_id}", "is_template": False, "version": 1,
+            "event_date": BASE_DATE + datetime.timedelta(days=rng.randint(0, 365)),
+        })
+        for position in range(scale.weeks_per_plan):
+            week_id += 1
+            batches.add(WeekPlan.__table__, {"id": week_id, "plan_id": plan_id, "position": position, "notes": None})
+            for day in rng.sample(days, min(scale.workouts_per_week, len(days))):
+                workout_plan_id += 1
+                batches.add(WorkoutPlan.__table__, {
+                    "id": workout_plan_id, "plan_id": plan_id, "week_id": week_id, "name": None, "description": None,
+                    "day_of_week": day, "completed": rng.random() < 0.3, "notes": None,
+                    "work_id": rng.randint(1, scale.workouts) if scale.workouts else None,
+                })
+        if batches.full():
+            yield from _ordered(batches, [Plan, WeekPlan, WorkoutPlan])
+    yield from _ordered(batches, [Plan, WeekPlan, WorkoutPlan])
+
+    # Analizatory: adnotacje co kilka sekund nagrania, część z przyciętym wideo
+    annotation_id = cropped_id = 0
+    for analyser_id in range(1, scale.analysers + 1):
+        batches.add(Analyser.__table__, {
+            "id": analyser_id, "name": f"Analiza {analyser_id}", "video_url": f"/uploads/video_{analyser_id}.mp4", "version": 1,
+        })
+        second = 0
+        for _ in range(scale.annotations_per_analyser):
+            annotation_id += 1
+            second += rng.randint(2, 15)
+            length = rng.randint(2, 20)
+            time_from, time_to = _time(second), _time(second + length)
+            start_ms, end_ms = annotation_range(time_from, time_to)
+            batches.add(AnnotationAnalyser.__table__, {
+                "id": annotation_id, "analyser_id": analyser_id, "time_from": time_from,
+                "time_to": time_to, "start_ms": start_ms, "end_ms": end_ms, "title": _text(rng, 2),
+                "description": None, "color": rng.choice(COLORS), "saved": False,
+            })
+            if scale.exercises and rng.random() < scale.cropped_videos_per_annotation:
+                cropped_id += 1
+                batches.add(CroppedVideo.__table__, {
+                    "id": cropped_id, "anno_id": annotation_id, "video_url": f"/uploads/crop_{cropped_id}.mp4",
+                    "crop_id": rng.randint(1, scale.exercises),
+                })
+        if batches.full():
+            yield from _ordered(batches, [Analyser, AnnotationAnalyser, CroppedVideo])
+    yield from _ordered(batches, [Analyser, AnnotationAnalyser, CroppedVideo])
+
+
+class _Row:
+    """Słownik wiersza jako obiekt z atrybutami (dla `section_seconds`)."""
+
+    def __init__(self, fields: dict):
+        self.__dict__.update(fields)
+
+
+def _time(seconds: int) -> datetime.time:
+    seconds = min(seconds, 24 * 3600 - 1)
+    return datetime.time(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+def _ordered(batches: _Batches, models) -> Iterator[Tuple[Table, List[dict]]]:
+    rows = batches.rows
+    batches.rows = {}
+    for model in models:
+        if rows.get(model.__table__):
+            yield model.__table__, rows[model.__table__]
+
+
+def ensure_empty(conn: Connection):
+    for model in (Exercise, Workout, Plan, Analyser):
+        if conn.execute(select(func.count()).select_from(model.__table__)).scalar():
+            raise RuntimeError("Baza nie jest pusta - generator nadaje jawne id od 1")
+
+
+def load(conn: Connection, scale: Scale, seed: int = 1, batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """Wstawia dane wielowierszowymi INSERT-ami (executemany); zwraca liczbę wierszy per tabela."""
+    ensure_empty(conn)
+    counts: Dict[str, int] = {}
+    for table, rows in generate(scale, seed, batch_size):
+        conn.execute(table.insert(), rows)
+        counts[table.name] = counts.get(table.name, 0) + len(rows)
+    return counts